@@ -0,0 +1,40 @@
+"""Compare the LLVM generated with and without common subexpression elimination.
+
+Counts the instructions emitted for the fixed-point Mandelbrot kernel and, when
+`llc` and `gcc` are on the PATH, times the compiled programs.
+
+Usage: python benchmarks/bench_cse.py
+"""
+
+import tempfile
+from pathlib import Path
+
+from native import can_compile, count_instructions, run_time
+from programs import MANDEL_KERNEL
+
+from wabbit import llvm
+from wabbit.llvm import generate_llvm
+from wabbit.passes import default_pass_manager
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        source = workdir / 'kernel.wb'
+        source.write_text(MANDEL_KERNEL)
+        prog = default_pass_manager().run(source, stop_after='simplify')
+        outputs = set()
+        for cse in (False, True):
+            llvm._n = 0
+            code = generate_llvm(prog, cse)
+            line = f'cse={cse!s:<5}: {count_instructions(code)} instructions'
+            if can_compile():
+                seconds, output = run_time(code, workdir)
+                outputs.add(output)
+                line += f', {seconds:.3f} s'
+            print(line)
+        assert len(outputs) <= 1
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Compare per-node dispatch through handler tables with `isinstance` ladders.
+
+Usage: python benchmarks/bench_dispatch.py [N_FUNCS]
+"""
+
+import sys
+import timeit
+
+from programs import generate_program
+
+from wabbit.model import *
+from wabbit.parse import parse_source
+from wabbit.traverse import Visitor, walk
+
+
+class LadderVisitor(Visitor):
+    # Tests in the order the original passes used
+
+    def leave(self, node, children: list) -> int:
+        if isinstance(node, Program):
+            return 0
+        elif isinstance(node, Print):
+            return 1
+        elif isinstance(node, Variable):
+            return 2
+        elif isinstance(node, Declaration):
+            return 3
+        elif isinstance(node, Assignment):
+            return 4
+        elif isinstance(node, If):
+            return 5
+        elif isinstance(node, While):
+            return 6
+        elif isinstance(node, Func):
+            return 7
+        elif isinstance(node, Return):
+            return 8
+        elif isinstance(node, Name):
+            return 9
+        elif isinstance(node, Number):
+            return 10
+        elif isinstance(node, MathOp):
+            return 11
+        elif isinstance(node, Call):
+            return 12
+        elif isinstance(node, Relation):
+            return 13
+        else:
+            raise RuntimeError(f"Can't handle {node}")
+
+
+class TableVisitor(Visitor):
+    pass
+
+
+for i, node_type in enumerate(
+    [Program, Print, Variable, Declaration, Assignment, If, While, Func, Return]
+    + [Name, Integer, Float, Add, Sub, Mul, Div, Call, Eq, Lt, Gt]
+):
+    setattr(TableVisitor, f'leave_{node_type.__name__}', lambda self, node, c, i=i: i)
+
+
+class Collector(Visitor):
+    def __init__(self):
+        self.nodes = []
+
+    def leave_object(self, node, children: list) -> None:
+        self.nodes.append(node)
+
+
+def main() -> None:
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    prog = parse_source(generate_program(n_funcs))
+    collector = Collector()
+    walk(prog, collector)
+    nodes = collector.nodes
+    print(f'{len(nodes)} nodes')
+    for visitor in (LadderVisitor(), TableVisitor()):
+        leave = visitor.leave
+        best = min(timeit.repeat(lambda: [leave(node, []) for node in nodes], number=1))
+        name = type(visitor).__name__
+        print(f'{name:>13}: {best / len(nodes) * 1e9:.0f} ns/node')
+
+
+if __name__ == '__main__':
+    main()
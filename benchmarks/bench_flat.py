@@ -0,0 +1,40 @@
+"""Compare passes over the flat array representation with the tree passes.
+
+Usage: python benchmarks/bench_flat.py [N_FUNCS]
+"""
+
+import sys
+import timeit
+import tracemalloc
+
+from programs import generate_program
+
+from wabbit.flat import flatten, unflatten
+from wabbit.foldconstants import fold_flat, fold_program
+from wabbit.parse import parse_source
+
+
+def measure(label: str, func) -> None:
+    best = min(timeit.repeat(func, number=1, repeat=3))
+    tracemalloc.start()
+    result = func()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    print(f'{label:>16}: {best:.3f} s, {size / 1e6:.2f} MB')
+
+
+def main() -> None:
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    prog = parse_source(generate_program(n_funcs))
+    flat = flatten(prog)
+    print(f'{len(flat)} nodes')
+    measure('parse (tree)', lambda: parse_source(generate_program(n_funcs)))
+    measure('flatten', lambda: flatten(prog))
+    measure('unflatten', lambda: unflatten(flat))
+    measure('fold_program', lambda: fold_program(prog))
+    measure('fold_flat', lambda: fold_flat(flat))
+
+
+if __name__ == '__main__':
+    main()
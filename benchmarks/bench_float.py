@@ -0,0 +1,43 @@
+"""Compare the fixed-point and floating-point Mandelbrot kernels.
+
+Counts the instructions emitted for the i32 kernel, the double one and the
+double one with fast-math flags and, when `llc` and `gcc` are on the PATH,
+times the compiled programs.
+
+Usage: python benchmarks/bench_float.py
+"""
+
+import tempfile
+from pathlib import Path
+
+from native import can_compile, count_instructions, run_time
+from programs import FLOAT_MANDEL_KERNEL, MANDEL_KERNEL
+
+from wabbit import llvm
+from wabbit.llvm import generate_llvm
+from wabbit.passes import default_pass_manager
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        runs = [
+            ('fixed-point', MANDEL_KERNEL, False),
+            ('float', FLOAT_MANDEL_KERNEL, False),
+            ('float, fast', FLOAT_MANDEL_KERNEL, True),
+        ]
+        for label, kernel, fast_math in runs:
+            source = workdir / 'kernel.wb'
+            source.write_text(kernel)
+            prog = default_pass_manager().run(source, stop_after='infer')
+            llvm._n = 0
+            code = generate_llvm(prog, fast_math=fast_math)
+            line = f'{label:<12}: {count_instructions(code)} instructions'
+            if can_compile():
+                seconds, output = run_time(code, workdir)
+                line += f', {seconds:.3f} s, {output.strip()}'
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
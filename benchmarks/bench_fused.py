@@ -0,0 +1,38 @@
+"""Compare the fused middle end with running its four passes in turn.
+
+Usage: python benchmarks/bench_fused.py [N_FUNCS]
+"""
+
+import sys
+import timeit
+import tracemalloc
+
+from programs import generate_program
+
+from wabbit.deinit import deinit_program
+from wabbit.foldconstants import fold_program
+from wabbit.fused import fused_middle_end
+from wabbit.parse import parse_source
+from wabbit.resolve import resolve_scopes
+from wabbit.unscript import unscript_toplevel
+
+
+def sequential(prog):
+    return unscript_toplevel(resolve_scopes(deinit_program(fold_program(prog))))
+
+
+def main() -> None:
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    prog = parse_source(generate_program(n_funcs))
+    assert fused_middle_end(prog) == sequential(prog)
+    for func in (sequential, fused_middle_end):
+        best = min(timeit.repeat(lambda: func(prog), number=1, repeat=3))
+        tracemalloc.start()
+        func(prog)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'{func.__name__:>16}: {best:.3f} s, peak {peak / 1e6:.2f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Compare the LLVM generated with and without inlining small functions.
+
+Counts the calls left in the integer square root kernel and, when `llc` and
+`gcc` are on the PATH, times the compiled programs.
+
+Usage: python benchmarks/bench_inline.py
+"""
+
+import tempfile
+from pathlib import Path
+
+from native import can_compile, count_instructions, run_time
+from programs import ISQRT_KERNEL
+
+from wabbit import llvm
+from wabbit.inline import inline_calls
+from wabbit.licm import move_loop_invariants
+from wabbit.llvm import generate_llvm
+from wabbit.passes import default_pass_manager
+from wabbit.propagate import propagate_constants
+from wabbit.simplify import simplify_program
+
+
+def optimize(prog):
+    # The passes after inlining
+    return move_loop_invariants(simplify_program(propagate_constants(prog)))
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        source = workdir / 'kernel.wb'
+        source.write_text(ISQRT_KERNEL)
+        prog = default_pass_manager().run(source, stop_after='unscript')
+        outputs = set()
+        for inline, version in [(False, prog), (True, inline_calls(prog))]:
+            llvm._n = 0
+            code = generate_llvm(optimize(version))
+            calls = sum(' = call ' in line for line in code.splitlines())
+            line = (
+                f'inline={inline!s:<5}: {count_instructions(code)} instructions, '
+                f'{calls} calls'
+            )
+            if can_compile():
+                seconds, output = run_time(code, workdir)
+                outputs.add(output)
+                line += f', {seconds:.3f} s'
+            print(line)
+        assert len(outputs) <= 1
+
+
+if __name__ == '__main__':
+    main()
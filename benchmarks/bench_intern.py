@@ -0,0 +1,39 @@
+"""Measure pure passes over interned trees with and without a memo.
+
+Usage: python benchmarks/bench_intern.py [N_FUNCS]
+"""
+
+import sys
+import timeit
+
+from programs import generate_program
+
+from wabbit.foldconstants import fold_program
+from wabbit.format import format_program
+from wabbit.intern import Interner, Memo, intern_tree
+from wabbit.parse import parse_source
+
+
+def main() -> None:
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    prog = parse_source(generate_program(n_funcs))
+    interner = Interner()
+    best = min(timeit.repeat(lambda: intern_tree(prog), number=1, repeat=3))
+    interned = intern_tree(prog, interner)
+    print(f'     intern: {best:.3f} s, {len(interner.table)} distinct nodes')
+
+    for label, func in (('fold', fold_program), ('format', format_program)):
+        best = min(timeit.repeat(lambda: func(prog), number=1, repeat=3))
+        print(f'{label:>11}: {best:.3f} s')
+        memos = []
+
+        def memoized():
+            memos.append(Memo())
+            func(interned, memos[-1])
+
+        best = min(timeit.repeat(memoized, number=1, repeat=3))
+        print(f'{label + "+memo":>11}: {best:.3f} s, {memos[-1].hit_rate:.0%} hits')
+
+
+if __name__ == '__main__':
+    main()
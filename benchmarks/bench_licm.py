@@ -0,0 +1,43 @@
+"""Compare the LLVM generated with and without loop-invariant code motion.
+
+Counts the instructions emitted for the looping kernels, which hoisting
+increases, and times the compiled programs when `llc` and `gcc` are on the
+PATH.
+
+Usage: python benchmarks/bench_licm.py
+"""
+
+import tempfile
+from pathlib import Path
+
+from native import can_compile, count_instructions, run_time
+from programs import GRID_KERNEL, MANDEL_KERNEL
+
+from wabbit import llvm
+from wabbit.licm import move_loop_invariants
+from wabbit.llvm import generate_llvm
+from wabbit.passes import default_pass_manager
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        for label, kernel in [('mandel', MANDEL_KERNEL), ('grid', GRID_KERNEL)]:
+            source = workdir / 'kernel.wb'
+            source.write_text(kernel)
+            prog = default_pass_manager().run(source, stop_after='simplify')
+            outputs = set()
+            for licm, version in [(False, prog), (True, move_loop_invariants(prog))]:
+                llvm._n = 0
+                code = generate_llvm(version)
+                line = f'{label:>6} licm={licm!s:<5}: {count_instructions(code)} instructions'
+                if can_compile():
+                    seconds, output = run_time(code, workdir)
+                    outputs.add(output)
+                    line += f', {seconds:.3f} s'
+                print(line)
+            assert len(outputs) <= 1
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Compare the LLVM generated with and without memoizing pure recursive functions.
+
+Times the recursive Fibonacci kernel for fib(30) to fib(40), compiled with
+`llc` and `gcc`, which need to be on the PATH.
+
+Usage: python benchmarks/bench_memo.py
+"""
+
+import tempfile
+from pathlib import Path
+
+from native import can_compile, count_instructions, run_time
+from programs import FIB_KERNEL
+
+from wabbit import llvm
+from wabbit.llvm import generate_llvm
+from wabbit.passes import default_pass_manager
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        source = workdir / 'kernel.wb'
+        source.write_text(FIB_KERNEL)
+        prog = default_pass_manager().run(source, stop_after='licm')
+        outputs = set()
+        for memo in (False, True):
+            llvm._n = 0
+            code = generate_llvm(prog, memo=memo)
+            line = f'memo={memo!s:<5}: {count_instructions(code)} instructions'
+            if can_compile():
+                seconds, output = run_time(code, workdir)
+                outputs.add(output)
+                line += f', {seconds:.3f} s'
+            print(line)
+        assert len(outputs) <= 1
+
+
+if __name__ == '__main__':
+    main()
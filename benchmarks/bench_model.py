@@ -0,0 +1,80 @@
+"""Compare slotted AST nodes with the original `__dict__`-based dataclasses.
+
+Usage: python benchmarks/bench_model.py [N_FUNCS]
+"""
+
+import dataclasses
+import sys
+import timeit
+import tracemalloc
+
+from programs import generate_program
+
+from wabbit import model
+from wabbit.parse import parse_source
+
+NODE_TYPES = [
+    obj
+    for obj in vars(model).values()
+    if isinstance(obj, type) and dataclasses.is_dataclass(obj)
+]
+
+
+def dict_based(node_type: type) -> type:
+    # Same fields as `node_type`, but a plain dataclass with a `__dict__`
+    namespace = {'__annotations__': {}}
+    for field in dataclasses.fields(node_type):
+        namespace['__annotations__'][field.name] = field.type
+        if field.default is not dataclasses.MISSING:
+            namespace[field.name] = field.default
+    return dataclasses.dataclass(type(node_type.__name__, (), namespace))
+
+
+def copy_tree(node, node_types: dict):
+    # Rebuild `node` with each node type replaced by `node_types[type]`
+    if isinstance(node, list):
+        return [copy_tree(child, node_types) for child in node]
+    if type(node) not in node_types:
+        return node
+    return node_types[type(node)](
+        *[
+            copy_tree(getattr(node, f.name), node_types)
+            for f in dataclasses.fields(node)
+        ]
+    )
+
+
+def count_nodes(node) -> int:
+    if isinstance(node, list):
+        return sum(count_nodes(child) for child in node)
+    if not dataclasses.is_dataclass(node):
+        return 0
+    return 1 + sum(count_nodes(getattr(node, f.name)) for f in dataclasses.fields(node))
+
+
+def main() -> None:
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    program = parse_source(generate_program(n_funcs))
+    n_nodes = count_nodes(program)
+    print(f'{n_nodes} nodes')
+    cases = [
+        ('__dict__', {t: dict_based(t) for t in NODE_TYPES}),
+        ('__slots__', {t: t for t in NODE_TYPES}),
+    ]
+    for label, node_types in cases:
+        tracemalloc.start()
+        tree = copy_tree(program, node_types)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del tree
+        best = min(
+            timeit.repeat(lambda: copy_tree(program, node_types), number=1, repeat=3)
+        )
+        print(
+            f'{label:>9}: {size / n_nodes:.1f} bytes/node, '
+            f'{n_nodes / best / 1e6:.2f} M nodes/s allocated'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Compare the parser with the original expression and statement parsing.
+
+Usage: python benchmarks/bench_parser.py [N_STATEMENTS]
+"""
+
+import sys
+import timeit
+
+from wabbit.model import Expression
+from wabbit.parse import MATH_NODES, Parser
+from wabbit.tokenizer import tokenize
+
+# Mandel-style kernel; the original parser needs every binary operation
+# wrapped in parentheses, the new one accepts the flat form too
+NESTED = 'xtemp = ((((x*x) - (y*y)) + x0) * ((2.0*x)*y)) + (((x*x) + (y*y)) / 4.0);\n'
+FLAT = 'xtemp = (x*x - y*y + x0) * (2.0*x*y) + (x*x + y*y) / 4.0;\n'
+
+
+DECLARATIONS = 'var a = 1; var b int; var c = a; var d float; b = c;\n'
+
+
+class LegacyParser(Parser):
+    def start_statement(self):
+        if self.peek('VAR'):
+            # Scan ahead to the end of the statement looking for `=`
+            has_assignment = False
+            i = 1
+            while self.fill(i + 1):
+                curr_token = self.lookahead[i]
+                i += 1
+                if curr_token.toktype == 'SEMI':
+                    break
+                elif curr_token.toktype == 'ASSIGN':
+                    has_assignment = True
+                    break
+            if has_assignment:
+                return self.parse_variable()
+            return self.parse_declaration()
+        for toktype in ('PRINT', 'NAME', 'IF', 'WHILE', 'FUNC', 'RETURN'):
+            if self.peek(toktype):
+                return self.statement_parsers[toktype]()
+        raise SyntaxError(
+            f'Expected a statement; current token is {self.current_token}'
+        )
+
+    def parse_expression(self) -> Expression:
+        term1 = self.parse_term()
+        for math_tok, math_node in MATH_NODES.items():
+            if self.peek(math_tok):
+                self.expect(math_tok)
+                term2 = self.parse_term()
+                return math_node(term1, term2)
+        return term1
+
+    def parse_term(self) -> Expression:
+        if self.peek('LPAREN'):
+            self.expect('LPAREN')
+            expr = self.parse_expression()
+            self.expect('RPAREN')
+            return expr
+        return super().parse_term()
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    cases = [
+        ('legacy, nested', LegacyParser, NESTED),
+        ('stack, nested', Parser, NESTED),
+        ('stack, flat', Parser, FLAT),
+        ('legacy, decls', LegacyParser, DECLARATIONS),
+        ('table, decls', Parser, DECLARATIONS),
+    ]
+    for label, parser, line in cases:
+        tokens = tokenize(line * n)
+        best = min(
+            timeit.repeat(lambda: parser(tokens).parse_statements(), number=1, repeat=3)
+        )
+        print(f'{label:>17}: {best:.3f} s ({len(tokens)} tokens)')
+
+    chain = ' + '.join(['x'] * 100000)
+    tokens = tokenize(f'y = {chain};')
+    best = min(timeit.repeat(lambda: Parser(tokens).parse_statements(), number=1))
+    print(f'100000-term chain: {best:.3f} s')
+
+
+if __name__ == '__main__':
+    main()
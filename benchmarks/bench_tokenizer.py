@@ -0,0 +1,65 @@
+"""Compare the single-pass tokenizer with the original three-pass one.
+
+Usage: python benchmarks/bench_tokenizer.py [N_FUNCS]
+"""
+
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+from programs import generate_program
+
+from wabbit.tokenizer import (
+    iter_file_tokens,
+    iter_tokens,
+    tokenize,
+    tokenize_compact,
+    tokenize_legacy,
+)
+
+
+def read_and_lex(fname: str) -> None:
+    with open(fname) as f:
+        for _ in iter_tokens(f.read()):
+            pass
+
+
+def mmap_and_lex(fname: str) -> None:
+    for _ in iter_file_tokens(fname):
+        pass
+
+
+def main() -> None:
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    source = generate_program(n_funcs)
+    assert tokenize(source) == tokenize_legacy(source)
+    print(f'Source size: {len(source) / 1e6:.2f} MB')
+    for func in (tokenize_legacy, tokenize, tokenize_compact):
+        best = min(timeit.repeat(lambda: func(source), number=1, repeat=3))
+        print(f'{func.__name__:>16}: {best:.3f} s')
+
+    for func in (tokenize, tokenize_compact):
+        tracemalloc.start()
+        tokens = func(source)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'{func.__name__:>16}: {size / len(tokens):.1f} bytes/token')
+
+    with tempfile.NamedTemporaryFile('w', suffix='.wb', delete=False) as f:
+        f.write(source)
+    try:
+        for func in (read_and_lex, mmap_and_lex):
+            best = min(timeit.repeat(lambda: func(f.name), number=1, repeat=3))
+            tracemalloc.start()
+            func(f.name)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f'{func.__name__:>16}: {best:.3f} s, peak {peak / 1e6:.2f} MB')
+    finally:
+        os.remove(f.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+# Compiling generated LLVM to native programs, for the benchmark scripts
+
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+RUNTIME = Path(__file__).parent.parent / 'test_programs' / 'runtime.c'
+
+
+def can_compile() -> bool:
+    return bool(shutil.which('llc') and shutil.which('gcc'))
+
+
+def count_instructions(code: str) -> int:
+    return sum(1 for line in code.splitlines() if line.startswith('%'))
+
+
+def run_time(code: str, workdir: Path) -> tuple[float, str]:
+    """Best time of three runs of `code` compiled with llc, and its output."""
+    (workdir / 'prog.ll').write_text(code)
+    subprocess.run(['llc', 'prog.ll', '-o', 'prog.s'], cwd=workdir, check=True)
+    subprocess.run(
+        ['gcc', 'prog.s', str(RUNTIME), '-o', 'prog'], cwd=workdir, check=True
+    )
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [workdir / 'prog'], capture_output=True, text=True, check=True
+        )
+        best = min(best, time.perf_counter() - start)
+    return best, result.stdout
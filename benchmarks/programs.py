@@ -0,0 +1,211 @@
+# Synthetic Wabbit sources used by the benchmark scripts
+
+FUNC_TEMPLATE = """\
+// Generated helper number {i}
+func f{i}(n int) int {{
+    var acc = 0;
+    var k int;
+    k = 0;
+    while k < n {{
+        if k == {i} {{
+            acc = acc + (k * 3);
+        }} else {{
+            acc = acc - (k / 2);
+        }}
+        k = k + 1;
+    }}
+    return acc;
+}}
+var r{i} = f{i}({i} + 10);
+print r{i};
+"""
+
+
+def generate_program(n_funcs: int) -> str:
+    return ''.join(FUNC_TEMPLATE.format(i=i) for i in range(n_funcs))
+
+
+# Escape-time Mandelbrot kernel in fixed point (1024 = 1.0), in the style of
+# test_programs/mandel.wb
+MANDEL_KERNEL = """\
+var cx = 0;
+var cy = 0;
+func escape(limit int) int {
+    var x = 0;
+    var y = 0;
+    var xtemp = 0;
+    var n = 0;
+    while n < limit {
+        xtemp = (x * x) / 1024 - (y * y) / 1024 + cx;
+        y = (2 * x * y) / 1024 + cy;
+        x = xtemp;
+        n = n + 1;
+        if (x * x) / 1024 + (y * y) / 1024 > 4096 {
+            return n;
+        } else {
+        }
+    }
+    return limit;
+}
+var total = 0;
+cy = 0 - 1536;
+while cy < 1536 {
+    cx = 0 - 2048;
+    while cx < 1024 {
+        total = total + escape(500);
+        cx = cx + 4;
+    }
+    cy = cy + 8;
+}
+print total;
+"""
+
+# MANDEL_KERNEL in floating point, closer to test_programs/mandel.wb
+FLOAT_MANDEL_KERNEL = """\
+var cx = 0.0;
+var cy = 0.0;
+func escape(limit int) int {
+    var x = 0.0;
+    var y = 0.0;
+    var xtemp = 0.0;
+    var n = 0;
+    while n < limit {
+        xtemp = x * x - y * y + cx;
+        y = 2.0 * x * y + cy;
+        x = xtemp;
+        n = n + 1;
+        if x * x + y * y > 4.0 {
+            return n;
+        } else {
+        }
+    }
+    return limit;
+}
+var total = 0;
+cy = 0.0 - 1.5;
+while cy < 1.5 {
+    cx = 0.0 - 2.0;
+    while cx < 1.0 {
+        total = total + escape(500);
+        cx = cx + 0.00390625;
+    }
+    cy = cy + 0.0078125;
+}
+print total;
+"""
+
+# Nested loops recomputing mandel.wb-style `(xmax - xmin) / width` steps
+GRID_KERNEL = """\
+var xmin = 0 - 2048;
+var xmax = 1024;
+var ymin = 0 - 1536;
+var ymax = 1536;
+func grid(steps int) int {
+    var total = 0;
+    var row = 0;
+    var col int;
+    while row < steps {
+        col = 0;
+        while col < steps {
+            total = total + xmin + col * ((xmax - xmin) / steps) + ymin + row * ((ymax - ymin) / steps);
+            col = col + 1;
+        }
+        row = row + 1;
+    }
+    return total;
+}
+print grid(3000);
+"""
+
+# Integer square roots by Newton's method, calling a small `iabs` like
+# test_programs/sqrt.wb calls `fabs`
+ISQRT_KERNEL = """\
+func iabs(x int) int {
+    if x < 0 {
+        return 0 - x;
+    } else {
+        return x;
+    }
+}
+func isqrt(n int) int {
+    var guess = n;
+    var next = 0;
+    var done = 0;
+    while done == 0 {
+        next = (guess + n / guess) / 2;
+        if iabs(next - guess) < 2 {
+            done = 1;
+        } else {
+            guess = next;
+        }
+    }
+    return guess;
+}
+var total = 0;
+var n = 1;
+while n < 3000000 {
+    total = total + isqrt(n);
+    n = n + 1;
+}
+print total;
+"""
+
+# Recursive helpers whose recursive calls are in tail position, or added to or
+# multiplied by another value; recursing 20000 deep fits the default stack
+RECURSION_KERNEL = """\
+func gcd(n int) int {
+    var a = n / 65536;
+    var b = n - a * 65536;
+    if b == 0 {
+        return a;
+    } else {
+        return gcd(b * 65536 + (a - (a / b) * b));
+    }
+}
+func sum(n int) int {
+    if n < 1 {
+        return 0;
+    } else {
+    }
+    return n + sum(n - 1);
+}
+func fact(n int) int {
+    if n < 2 {
+        return 1;
+    } else {
+        return fact(n - 1) * n;
+    }
+}
+var total = 0;
+var i = 0;
+while i < 2000 {
+    total = total + sum(20000) + fact(i) + gcd(i * 65536 + 1071);
+    i = i + 1;
+}
+print total;
+"""
+
+# test_programs/fib.wb for n from 30 to 40, in the syntax the parser takes
+FIB_KERNEL = """\
+func fib(n int) int {
+    if n < 2 {
+        return 1;
+    } else {
+        return fib(n-1) + fib(n-2);
+    }
+    return 0;
+}
+
+var LAST = 41;
+
+func run(first int) int {
+    var n = first;
+    while n < LAST {
+        print fib(n);
+        n = n + 1;
+    }
+    return 0;
+}
+
+var done = run(30);
+"""
@@ -7,7 +7,7 @@ setuptools.setup(
     description='Python implementation of the Wabbit language',
     packages=setuptools.find_packages(),
     entry_points={'console_scripts': ['wabbit=wabbit.main:main']},
-    python_requires='>=3.8',
+    python_requires='>=3.11',
     extras_require={
         'dev': ['coverage', 'ipython', 'mypy', 'pre-commit', 'pytest', 'ruff'],
     },
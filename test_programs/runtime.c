@@ -3,4 +3,9 @@
 int _print_int(int x) {
     printf("Out: %i\n", x);
     return 0;
-}
\ No newline at end of file
+}
+
+int _print_float(double x) {
+    printf("Out: %f\n", x);
+    return 0;
+}
@@ -0,0 +1,124 @@
+import pytest
+
+from wabbit.evaluate import *
+from wabbit.foldconstants import fold_program
+from wabbit.format import format_program
+from wabbit.parse import parse_source
+from wabbit.passes import default_pass_manager
+
+# Newton's method as in test_programs/sqrt.wb, in the syntax the parser takes
+SQRT = """
+func fabs(x float) float {
+    if x < 0.0 {
+        return 0.0 - x;
+    } else {
+        return x;
+    }
+}
+func sqrt(x float) float {
+    var guess = 1.0;
+    var nextguess = 0.0;
+    var done = 0;
+    if x == 0.0 {
+        return 0.0;
+    } else {
+    }
+    while done == 0 {
+        nextguess = (guess + (x / guess)) / 2.0;
+        if (fabs(nextguess - guess) / guess) < 0.00000001 {
+            done = 1;
+        } else {
+            guess = nextguess;
+        }
+    }
+    return guess;
+}
+"""
+
+
+def evaluate(source: str, call: str, **budget) -> Number | None:
+    prog = parse_source(source)
+    interpreter = Interpreter(pure_functions(prog), **budget)
+    call = fold_program(parse_source(f'print {call};')).statements[0].value
+    return interpreter.evaluate_call(call)
+
+
+def test_pure_functions():
+    source = """
+    var g = 1;
+    func double(x int) int { return x * 2; }
+    func quad(x int) int { return double(double(x)); }
+    func shadow(x int) int {
+        if x > 0 { var g = x; return g; } else { return g; }
+    }
+    func noisy(x int) int { print x; return x; }
+    func caller(x int) int { return noisy(x) + double(x); }
+    func unknown(x int) int { return missing(x); }
+    """
+    assert sorted(pure_functions(parse_source(source))) == ['double', 'quad']
+
+
+def test_interpreter():
+    assert evaluate(SQRT, 'sqrt(100.0)').value == pytest.approx(10.0)
+    assert evaluate(SQRT, 'sqrt(0.0)') == Float(0.0)
+    source = """
+    func fib(n int) int {
+        if n < 2 { return 1; } else { return fib(n - 1) + fib(n - 2); }
+    }
+    func half(x int) int { return x / 2; }
+    func none(x int) int { if x > 0 { return x; } else { } }
+    """
+    assert evaluate(source, 'fib(10)') == Integer(89)
+    # Division truncates towards zero, as in the generated code
+    assert evaluate(source, 'half(0 - 7)') == Integer(-3)
+    # Falling off the end returns 0
+    assert evaluate(source, 'none(0 - 1)') == Integer(0)
+
+
+def test_gives_up():
+    source = """
+    func fib(n int) int {
+        if n < 2 { return 1; } else { return fib(n - 1) + fib(n - 2); }
+    }
+    func loop(x int) int { while x > 0 { x = x + 1; } return x; }
+    func inverse(x int) int { return 100 / x; }
+    func unset(x int) int { var y int; return y; }
+    func twice(x float) float { return x * 2.0; }
+    """
+    assert evaluate(source, 'fib(20)', max_steps=1000) is None
+    assert evaluate(source, 'fib(200)', max_depth=50) is None
+    # Running out of steps, and wrapping around i32
+    assert evaluate(source, 'loop(1)') is None
+    assert evaluate(source, 'loop(2147483000)') is None
+    assert evaluate(source, 'inverse(0)') is None
+    assert evaluate(source, 'unset(1)') is None
+    assert evaluate(source, 'twice(1)') is None
+
+
+def test_folding():
+    source = SQRT + 'var LAST = sqrt(100.0); print sqrt(LAST);'
+    last, printed = format_program(fold_program(parse_source(source))).splitlines()[-2:]
+    assert last.startswith('var LAST = 10.0000')
+    assert printed == 'print sqrt(LAST);'
+
+
+def test_pipeline(tmp_path):
+    # Calls whose argument only becomes constant once propagated are run too
+    path = tmp_path / 'prog.wb'
+    path.write_text(
+        """
+        func fib(n int) int {
+            if n < 2 { return 1; } else { return fib(n - 1) + fib(n - 2); }
+        }
+        func show(n int) int { print fib(n); return 0; }
+        var n = 3;
+        print fib(n + 1);
+        print show(n);
+        """
+    )
+    prog = default_pass_manager().run(path, stop_after='propagate')
+    lines = [line.strip() for line in format_program(prog).splitlines()]
+    assert 'print 5;' in lines
+    # Functions that print are kept, and so are calls in them
+    assert 'print fib(local[n]);' in lines
+    assert 'print show(3);' in lines
@@ -0,0 +1,67 @@
+from wabbit import llvm
+from wabbit.deinit import deinit_program
+from wabbit.flat import *
+from wabbit.foldconstants import fold_flat, fold_program
+from wabbit.llvm import generate_expression, generate_flat_expression
+from wabbit.model import *
+from wabbit.parse import parse_source
+from wabbit.resolve import resolve_scopes
+from wabbit.unscript import unscript_toplevel
+
+SOURCE = """
+var n = 2 * 5;
+var x float;
+func f(k int) int {
+    var acc = 0;
+    while k > 0 {
+        if k == 3 { acc = acc + (k * 3); } else { acc = acc - k / 2; }
+        k = k - 1;
+    }
+    return acc;
+}
+x = 1.5 + 2.0;
+print f(n + 1) - 4 * 3;
+"""
+
+
+def test_round_trip():
+    prog = parse_source(SOURCE)
+    assert unflatten(flatten(prog)) == prog
+    prog = unscript_toplevel(resolve_scopes(deinit_program(prog)))
+    assert unflatten(flatten(prog)) == prog
+    assert unflatten(flatten(Add(Name('x'), Integer(1)))) == Add(Name('x'), Integer(1))
+
+
+def test_fold():
+    prog = parse_source(SOURCE)
+    assert unflatten(fold_flat(flatten(prog))) == fold_program(prog)
+    prog = parse_source('print 1 / (2 - 2);')
+    assert unflatten(fold_flat(flatten(prog))) == fold_program(prog)
+
+
+def test_fold_in_place():
+    prog = parse_source('print (1 + 2) * x; while 1 < 2 * 3 { print 2 * 3; }')
+    flat = flatten(prog)
+    folded = fold_flat(flat)
+    # The input is left alone, and the folded operands are no longer reachable
+    assert unflatten(flat) == prog
+    assert len(folded) == len(flat)
+    assert sum(folded.live()) < len(flat)
+    assert unflatten(folded) == fold_program(prog)
+
+
+def test_generate_expression():
+    expr = Add(
+        Mul(GlobalName('x'), Integer(2)),
+        Call(GlobalName('f'), Sub(LocalName('y'), Integer(1))),
+    )
+    llvm._n = 0
+    expected = generate_expression(expr)
+    llvm._n = 0
+    assert generate_flat_expression(flatten(expr)) == expected
+
+    llvm._n = 0
+    expected = generate_expression(Lt(Integer(1), GlobalName('x')))
+    llvm._n = 0
+    flat = fold_flat(flatten(Lt(Add(Integer(0), Integer(1)), GlobalName('x'))))
+    assert generate_flat_expression(flat) == expected
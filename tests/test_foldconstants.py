@@ -1,5 +1,6 @@
 from wabbit.foldconstants import *
 from wabbit.model import *
+from wabbit.traverse import walk
 
 
 class TestFoldExpressionAdd:
@@ -95,6 +96,12 @@ class TestFoldExpressionMixedAll:
         expected = Div(Integer(7), Name('x'))
         assert fold_expression(expr) == expected
 
+    def test_division_by_zero(self):
+        # 1 / (2 - 2) -> 1 / 0, left to fail at run time
+        expr = Div(Integer(1), Sub(Integer(2), Integer(2)))
+        expected = Div(Integer(1), Integer(0))
+        assert fold_expression(expr) == expected
+
 
 class TestFoldExpressionFuncCall:
     def test_integer_literals(self):
@@ -375,7 +382,7 @@ def test_func():
     #     var p = 12;
     #     return r;
     # }
-    # var result = square(4) + 12;
+    # var result = 28;
     # print 300;
     expected = Program(
         [
@@ -388,11 +395,62 @@ def test_func():
                     Return(Name('r')),
                 ],
             ),
-            Variable(
-                Name('result'), Add(Call(Name('square'), Integer(4)), Integer(12))
-            ),
+            Variable(Name('result'), Integer(28)),
             Print(Integer(300)),
         ]
     )
 
     assert fold_program(prog) == expected
+
+
+class TestFoldBranches:
+    def test_if_taken(self):
+        # if 1 + 1 == 2 { print 1; } else { print 2; } print 3;
+        # -> print 1; print 3;
+        prog = Program(
+            [
+                If(
+                    Eq(Add(Integer(1), Integer(1)), Integer(2)),
+                    [Print(Integer(1))],
+                    [Print(Integer(2))],
+                ),
+                Print(Integer(3)),
+            ]
+        )
+        folder = ConstantFolder()
+        assert walk(prog, folder) == Program([Print(Integer(1)), Print(Integer(3))])
+        # If, relation and its operands, dead Print and its value
+        assert folder.eliminated == 6
+
+    def test_if_not_taken(self):
+        # if 2 < 1 { print 1; } else { print x; } -> print x;
+        stmt = If(Lt(Integer(2), Integer(1)), [Print(Integer(1))], [Print(Name('x'))])
+        assert fold_statements([stmt]) == [Print(Name('x'))]
+
+    def test_if_taken_with_declarations(self):
+        # if 1 > 0 { var x = 1; } else { print 2; }
+        # -> if 1 > 0 { var x = 1; } else { }
+        stmt = If(
+            Gt(Integer(1), Integer(0)),
+            [Variable(Name('x'), Integer(1))],
+            [Print(Integer(2))],
+        )
+        expected = If(Gt(Integer(1), Integer(0)), [Variable(Name('x'), Integer(1))], [])
+        assert fold_statement(stmt) == expected
+
+    def test_while(self):
+        # while 3 < 2 * 1 { print 1; } -> (nothing)
+        loop = While(Lt(Integer(3), Mul(Integer(2), Integer(1))), [Print(Integer(1))])
+        folder = ConstantFolder()
+        assert walk(Program([loop]), folder) == Program([])
+        assert folder.eliminated == 6
+
+        # while 1 < 2 * 3 { print x; } -> while 1 < 6 { print x; }
+        loop = While(Lt(Integer(1), Mul(Integer(2), Integer(3))), [Print(Name('x'))])
+        assert fold_statement(loop) == While(
+            Lt(Integer(1), Integer(6)), [Print(Name('x'))]
+        )
+
+        # Loops that may run are kept
+        loop = While(Lt(Name('n'), Integer(3)), [Print(Name('n'))])
+        assert fold_statement(loop) is loop
@@ -77,6 +77,13 @@ print result;"""
     assert format_program(program) == expected
 
 
+def test_precedence():
+    expr = Mul(Add(Name('x'), Integer(1)), Sub(Name('y'), Div(Integer(4), Integer(2))))
+    assert format_expression(expr) == '(x + 1) * (y - 4 / 2)'
+    expr = Sub(Sub(Name('x'), Name('y')), Sub(Name('z'), Integer(1)))
+    assert format_expression(expr) == 'x - y - (z - 1)'
+
+
 class TestRelation:
     def test_lt(self):
         relation = Lt(Name('x'), Integer(3))
@@ -0,0 +1,51 @@
+import pathlib
+
+import pytest
+
+from wabbit.deinit import deinit_program
+from wabbit.foldconstants import fold_program
+from wabbit.fused import fused_middle_end
+from wabbit.parse import parse_file, parse_source
+from wabbit.resolve import resolve_scopes
+from wabbit.unscript import unscript_toplevel
+
+TEST_PROGRAMS = pathlib.Path(__file__).parent.parent / 'test_programs'
+
+SOURCES = [
+    'var x = 2 * 3; print x + (1 + 1);',
+    # A local shadowing a global, used in its own initializer
+    'var x = 1; func f(a int) int { var x = x + a; return x * (2 + 3); } print f(x);',
+    'var y = 0; while y < 2 * 3 { var z = 4 / 2; y = y + z; }',
+    # Constant branches and loops
+    'var x = 1; if 1 < 2 { print x; } else { print 0; } while 2 < 1 { var z = 0; }',
+    'if 1 == 1 { var z = 2; print z; } else { } func f(a int) int { if 2 > 1 '
+    '{ return a; } else { var b = a; return b; } }',
+    'var n = 1; if n == 1 + 0 { var m = n; print m; } else { print n * (3 - 1); }',
+]
+
+
+def sequential(prog):
+    return unscript_toplevel(resolve_scopes(deinit_program(fold_program(prog))))
+
+
+@pytest.mark.parametrize(
+    'path', sorted(TEST_PROGRAMS.glob('*.wb')), ids=lambda path: path.name
+)
+def test_programs(path):
+    try:
+        prog = parse_file(path)
+    except (SyntaxError, TypeError):
+        pytest.skip('Not supported by the parser')
+    assert fused_middle_end(prog) == sequential(prog)
+
+
+@pytest.mark.parametrize('source', SOURCES)
+def test_sources(source):
+    prog = parse_source(source)
+    assert fused_middle_end(prog) == sequential(prog)
+
+
+def test_redeclaration():
+    prog = parse_source('var x = 1; var x = 2;')
+    with pytest.raises(RuntimeError, match="'x' is already defined"):
+        fused_middle_end(prog)
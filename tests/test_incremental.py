@@ -0,0 +1,60 @@
+import pytest
+
+from wabbit.incremental import *
+from wabbit.model import *
+from wabbit.parse import parse_source
+
+SOURCE = """var x = 3;
+func f(a int) int {
+    return a * 2;
+}
+print f(x);
+"""
+
+
+def edit(parsed: ParsedSource, old: str, new: str) -> ParsedSource:
+    offset = parsed.source.index(old)
+    return apply_edit(parsed, offset, len(old), new)
+
+
+def test_reuses_untouched_statements():
+    parsed = parse_incremental(SOURCE)
+    old = parsed.program.statements
+
+    updated = edit(parsed, 'a * 2', 'a * 20')
+    assert updated.program == parse_source(updated.source)
+    new = updated.program.statements
+    assert new[0] is old[0]
+    assert new[1] is not old[1]
+    assert new[2] is old[2]
+    assert list(updated.tokens) == list(tokenize_compact(updated.source))
+
+
+def test_merge_and_split_statements():
+    parsed = parse_incremental(SOURCE)
+
+    # Removing a semicolon merges two statements into a syntax error
+    with pytest.raises(SyntaxError):
+        edit(parsed, '3;', '3')
+
+    # Inserting a statement adds one without touching its neighbours
+    offset = SOURCE.index('print f(x);')
+    updated = apply_edit(parsed, offset, 0, 'print 1; ')
+    assert updated.program == parse_source(updated.source)
+    assert len(updated.program.statements) == 4
+    assert updated.program.statements[3] is parsed.program.statements[2]
+
+
+def test_comment_edits():
+    parsed = parse_incremental(SOURCE)
+
+    # Commenting out a line removes its tokens
+    updated = edit(parsed, 'print f(x);', '// print f(x);')
+    assert updated.program == parse_source(updated.source)
+    assert len(updated.program.statements) == 2
+
+    # Uncommenting it brings them back
+    updated = edit(updated, '// ', '')
+    assert updated.source == SOURCE
+    assert updated.program == parse_incremental(SOURCE).program
+    assert updated.stmt_ends == parse_incremental(SOURCE).stmt_ends
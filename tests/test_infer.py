@@ -0,0 +1,76 @@
+import pytest
+
+from wabbit.deinit import deinit_program
+from wabbit.infer import *
+from wabbit.parse import parse_source
+from wabbit.resolve import resolve_scopes
+from wabbit.unscript import unscript_toplevel
+
+
+def infer(source: str | Program) -> Program:
+    if isinstance(source, str):
+        source = parse_source(source)
+    return infer_types(unscript_toplevel(resolve_scopes(deinit_program(source))))
+
+
+def functions(prog: Program) -> dict[str, Func]:
+    return {
+        stmt.name.identifier: stmt for stmt in prog.statements if isinstance(stmt, Func)
+    }
+
+
+def test_declarations_and_returns():
+    source = """
+    var scale = 0.5;
+    func area(side float) float { return side * side * scale; }
+    func count(n int) int { var total = 0; return total + n; }
+    print area(3.0);
+    """
+    prog = infer(source)
+    funcs = functions(prog)
+    assert funcs['area'].return_type is Type.FLOAT
+    assert funcs['count'].return_type is Type.INTEGER
+    assert funcs['count'].body[0] == LocalVar(Name('total', Type.INTEGER))
+    assert GlobalVar(Name('scale', Type.FLOAT)) in prog.statements
+
+
+def test_learnt_later():
+    # The global is only assigned in main, after the function reading it, and
+    # the function's return type follows from the global's
+    source = """
+    func shift(x float) float { return x + offset; }
+    func twice(x float) float { return shift(x) * 2.0; }
+    var offset = 1.5;
+    print twice(offset);
+    """
+    funcs = functions(infer(source))
+    ret = funcs['shift'].body[0]
+    assert ret.value.right == GlobalName('offset', Type.FLOAT)
+    assert funcs['twice'].return_type is Type.FLOAT
+
+
+def test_parameter_from_argument():
+    # Untyped parameters take the type of the arguments, or are integers if
+    # nothing says otherwise
+    source = """
+    func half(x int) int { return x / 2.0; }
+    func unused(x int) int { return x; }
+    print half(3.0);
+    """
+    prog = parse_source(source)
+    for func in prog.statements[:2]:
+        func.param.type = func.return_type = Type.UNSPECIFIED
+    funcs = functions(infer(prog))
+    assert funcs['half'].param.type is Type.FLOAT
+    assert funcs['half'].return_type is Type.FLOAT
+    assert funcs['unused'].param.type is Type.INTEGER
+    assert funcs['unused'].return_type is Type.INTEGER
+
+
+def test_mixed_types():
+    with pytest.raises(TypeError, match='Add of integer and float'):
+        infer('var x = 1; print x + 2.0;')
+    with pytest.raises(TypeError, match="'x' is integer, not float"):
+        infer('var x = 1; x = 2.0;')
+    with pytest.raises(TypeError, match='return value'):
+        infer('func f(x int) int { return 1.0; }')
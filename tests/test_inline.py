@@ -0,0 +1,193 @@
+from wabbit.deinit import deinit_program
+from wabbit.format import format_program
+from wabbit.inline import *
+from wabbit.parse import parse_source
+from wabbit.resolve import resolve_scopes
+from wabbit.unscript import unscript_toplevel
+
+ABS = """
+func abs(x int) int {
+    if x < 0 {
+        return 0 - x;
+    } else {
+        return x;
+    }
+}
+"""
+
+
+def inline(source: str, threshold: int = 40) -> Program:
+    prog = unscript_toplevel(resolve_scopes(deinit_program(parse_source(source))))
+    return inline_calls(prog, threshold)
+
+
+def func_body(source: str, fname: str = 'f', threshold: int = 40) -> list[str]:
+    # Statements of function `fname`, without indentation
+    lines = format_program(inline(source, threshold)).splitlines()
+    start = next(i for i, line in enumerate(lines) if line.startswith(f'func {fname}('))
+    end = lines.index('}', start)
+    return [line.strip() for line in lines[start + 1 : end]]
+
+
+def test_lower_returns():
+    result = LocalName('r')
+    # Statements after a return that always happens are dropped
+    stmts = [Print(Integer(1)), Return(Integer(2)), Print(Integer(3))]
+    assert lower_returns(stmts, result) == [
+        Print(Integer(1)),
+        Assignment(result, Integer(2)),
+    ]
+    # What follows a branch that always returns moves into the other branch
+    test = Lt(Name('x'), Integer(0))
+    stmts = [If(test, [Return(Integer(1))], [])]
+    assert lower_returns(stmts, result) == [
+        If(test, [Assignment(result, Integer(1))], [])
+    ]
+    assert lower_returns(stmts + [Return(Integer(2))], result) == [
+        If(test, [Assignment(result, Integer(1))], [Assignment(result, Integer(2))])
+    ]
+    # A return that may be skipped can only be the last statement otherwise
+    stmts = [If(test, [If(test, [Return(Integer(1))], [])], [])]
+    assert lower_returns(stmts + [Return(Integer(2))], result) is None
+    assert lower_returns([While(test, [Return(Integer(1))])], result) is None
+
+
+def test_inline():
+    source = (
+        ABS
+        + """
+    func f(n int) int {
+        var m = n * 2;
+        print abs(m - 5) + 1;
+        return 0;
+    }
+    """
+    )
+    assert func_body(source) == [
+        'local abs.ret.1;',
+        'local abs.1.x;',
+        'local m;',
+        'local[m] = local[n] * 2;',
+        'local[abs.1.x] = local[m] - 5;',
+        'if local[abs.1.x] < 0 {',
+        'local[abs.ret.1] = 0 - local[abs.1.x];',
+        '} else {',
+        'local[abs.ret.1] = local[abs.1.x];',
+        '}',
+        'print local[abs.ret.1] + 1;',
+        'return 0;',
+    ]
+
+
+def test_locals_and_fall_through():
+    source = """
+    func g(x int) int {
+        var y = x + 1;
+        if y > 10 {
+            return y;
+        } else {
+        }
+    }
+    func f(n int) int {
+        return g(n) + g(n + 1);
+    }
+    """
+    body = func_body(source)
+    assert body[:6] == [
+        'local g.ret.1;',
+        'local g.1.x;',
+        'local g.1.y;',
+        'local g.ret.2;',
+        'local g.2.x;',
+        'local g.2.y;',
+    ]
+    # Falling off the end returns 0
+    assert body[7:10] == [
+        'local[g.ret.1] = 0;',
+        'local[g.1.y] = local[g.1.x] + 1;',
+        'if local[g.1.y] > 10 {',
+    ]
+    assert body[-1] == 'return local[g.ret.1] + local[g.ret.2];'
+
+
+def test_kept_calls():
+    # Functions with side effects, big ones and calls in loop tests are kept
+    source = (
+        ABS
+        + """
+    var total = 0;
+    func add(x int) int {
+        total = total + x;
+        return total;
+    }
+    func f(n int) int {
+        while abs(n) > 0 {
+            n = n - add(n);
+        }
+        return 0;
+    }
+    """
+    )
+    assert func_body(source)[:2] == [
+        'while abs(local[n]) > 0 {',
+        'local[n] = local[n] - add(local[n]);',
+    ]
+    source = ABS + 'func f(n int) int { return abs(n); }'
+    assert func_body(source, threshold=5) == ['return abs(local[n]);']
+
+
+def test_call_graph():
+    # Inlining into a function can make it a leaf, which is then inlined too
+    source = (
+        ABS
+        + """
+    func dist(x int) int {
+        return abs(x - 10);
+    }
+    func f(n int) int {
+        return dist(n);
+    }
+    """
+    )
+    assert 'abs(' not in ' '.join(func_body(source, 'dist'))
+    assert func_body(source)[:4] == [
+        'local dist.ret.2;',
+        'local dist.2.x;',
+        'local dist.2.abs.ret.1;',
+        'local dist.2.abs.1.x;',
+    ]
+    assert 'dist(' not in ' '.join(func_body(source))
+
+
+def test_evaluation_order():
+    # Calls can't move in front of a call made before them in the statement,
+    # which may change a global they read or print first
+    source = (
+        ABS
+        + """
+    var g = 0;
+    func bump(x int) int {
+        g = g + x;
+        return 0;
+    }
+    func say(x int) int {
+        print x;
+        return x;
+    }
+    func f(n int) int {
+        print bump(10) + abs(g);
+        print say(1) + abs(say(2));
+        print abs(n) + say(abs(n));
+        return 0;
+    }
+    """
+    )
+    body = func_body(source)
+    assert 'print bump(10) + abs(global[g]);' in body
+    assert 'print say(1) + abs(say(2));' in body
+    # Nor can their argument if it reads a global
+    assert func_body(ABS + 'var g = 1; func f(n int) int { return abs(g); }') == [
+        'return abs(global[g]);'
+    ]
+    # Calls before any other are still inlined, in order
+    assert body[-2] == 'print local[abs.ret.1] + say(local[abs.ret.2]);'
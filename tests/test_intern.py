@@ -0,0 +1,56 @@
+from wabbit.foldconstants import fold_program
+from wabbit.format import format_expression, format_program
+from wabbit.intern import *
+from wabbit.model import *
+from wabbit.parse import parse_source
+
+SOURCE = """
+var x = 1;
+var y = 2;
+while x * x + y * y < 4 * 1 {
+    x = x * x - y * y + (2 * 3);
+    y = x * x - y * y + (2 * 3);
+}
+"""
+
+
+def test_intern_shares_subtrees():
+    prog = intern_tree(parse_source(SOURCE))
+    loop = prog.statements[2]
+    x_squared = loop.test.left.left
+    assert x_squared == Mul(Name('x'), Name('x'))
+    assert loop.statements[0].value.left.left is x_squared
+    assert loop.statements[0].value == loop.statements[1].value
+    assert loop.statements[0].value is loop.statements[1].value
+    # Different types of node or name stay apart
+    assert intern_tree(Add(Integer(1), Float(1.0))).right is not Integer(1)
+    names = intern_tree(Add(GlobalName('x'), LocalName('x')))
+    assert names.left is not names.right
+
+
+def test_memo():
+    prog = parse_source(SOURCE)
+    interned = intern_tree(prog)
+    memo = Memo()
+    assert fold_program(interned, memo) == fold_program(prog)
+    assert memo.hits > 0
+    # Every statement is known the second time round
+    hits = memo.hits
+    fold_program(interned, memo)
+    assert memo.hits == hits + len(prog.statements)
+
+    memo = Memo()
+    assert format_program(interned, memo) == format_program(prog)
+    expr = interned.statements[2].statements[0].value
+    assert memo.get(expr) == format_expression(expr)
+
+
+def test_memo_is_bounded():
+    memo = Memo(maxsize=2)
+    nodes = [Integer(i) for i in range(3)]
+    for node in nodes:
+        memo.put(node, node.value)
+    assert len(memo) == 2
+    assert memo.get(nodes[0]) is MISSING
+    assert memo.get(nodes[2]) == 2
+    assert memo.hit_rate == 0.5
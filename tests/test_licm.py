@@ -0,0 +1,164 @@
+from wabbit.deinit import deinit_program
+from wabbit.foldconstants import fold_program
+from wabbit.format import format_program
+from wabbit.licm import *
+from wabbit.llvm import generate_llvm
+from wabbit.parse import parse_source
+from wabbit.resolve import resolve_scopes
+from wabbit.unscript import unscript_toplevel
+
+
+def move(source: str) -> Program:
+    prog = parse_source(source)
+    prog = unscript_toplevel(resolve_scopes(deinit_program(fold_program(prog))))
+    return move_loop_invariants(prog)
+
+
+def func_body(source: str, fname: str = 'f') -> list[str]:
+    # Statements of function `fname`, without indentation
+    lines = format_program(move(source)).splitlines()
+    start = lines.index(f'func {fname}(n) {{')
+    end = lines.index('}', start)
+    return [line.strip() for line in lines[start + 1 : end]]
+
+
+def test_hoist():
+    source = """
+    var g = 10;
+    func f(n int) int {
+        var i = 0;
+        while i < n + 1 {
+            print i * (n * g + 2) + (n * g + 2);
+            i = i + 1;
+        }
+        return 0;
+    }
+    """
+    assert func_body(source) == [
+        'local inv.1;',
+        'local inv.2;',
+        'local i;',
+        'local[i] = 0;',
+        'local[inv.1] = local[n] + 1;',
+        'local[inv.2] = local[n] * global[g] + 2;',
+        'while local[i] < local[inv.1] {',
+        'print local[i] * local[inv.2] + local[inv.2];',
+        'local[i] = local[i] + 1;',
+        '}',
+        'return 0;',
+    ]
+
+
+def test_variant():
+    source = """
+    func f(n int) int {
+        var i = 0;
+        while i < 3 {
+            var k = n * 2;
+            print k * 3 + i * 4;
+            n = n - 1;
+            i = i + 1;
+        }
+        return 0;
+    }
+    """
+    assert 'local inv.1;' not in func_body(source)
+
+
+def test_calls():
+    source = """
+    var g = 10;
+    var h = 20;
+    func set(n int) int { g = n; return 0; }
+    func f(n int) int {
+        while n < 3 {
+            print set(g * 2) + h * 2;
+            n = n + 1;
+        }
+        return 0;
+    }
+    """
+    body = func_body(source)
+    assert body[:2] == ['local inv.1;', 'local[inv.1] = global[h] * 2;']
+    assert 'print set(global[g] * 2) + local[inv.1];' in body
+    # Unknown functions may assign any global
+    body = func_body(source.replace('set(g * 2)', 'get(g * 2)'))
+    assert 'local inv.1;' not in body
+
+
+def test_division():
+    # Division by a variable is only hoisted if the loop runs
+    source = """
+    func f(n int) int {
+        var i = 0;
+        while i < 10 {
+            print i * (100 / n) + 100 / 4;
+            i = i + 1;
+        }
+        return 0;
+    }
+    """
+    assert func_body(source)[3:8] == [
+        'if local[i] < 10 {',
+        'local[inv.1] = 100 / local[n];',
+        '} else {',
+        '',
+        '}',
+    ]
+    # Calls in the test can't be repeated
+    body = func_body(source.replace('i < 10', 'g(i) < 10'))
+    assert 'local inv.1;' not in body
+    # Nor if it only runs in a branch or after a return, as with n == 0 that
+    # would divide by zero where the loop doesn't
+    source = """
+    func f(n int) int {
+        var x = 10;
+        var i = 0;
+        while i < 3 {
+            if n == 0 { print 0; } else { print x / n; }
+            i = i + 1;
+        }
+        while i < 6 {
+            if i == 4 { return 0; } else { }
+            print x / n;
+            i = i + 1;
+        }
+        return 0;
+    }
+    print f(0);
+    """
+    assert 'local inv.1;' not in func_body(source)
+
+
+def test_nested():
+    source = """
+    func f(n int) int {
+        var i = 0;
+        var j int;
+        while i < 10 {
+            j = 0;
+            while j < 10 {
+                print (n * n) * j + i * (n + 1);
+                j = j + 1;
+            }
+            i = i + 1;
+        }
+        return 0;
+    }
+    """
+    body = func_body(source)
+    # n * n moves out of both loops, i * (n + 1) out of the inner one
+    assert body[6:11] == [
+        'local[inv.1] = local[n] * local[n];',
+        'local[inv.3] = local[n] + 1;',
+        'while local[i] < 10 {',
+        'local[j] = 0;',
+        'local[inv.2] = local[i] * local[inv.3];',
+    ]
+
+
+def test_codegen():
+    code = generate_llvm(move('var n = 3; var i = 0; while i < n * n { i = i + 1; }'))
+    # The temporary is allocated once, outside the loop
+    assert code.index('%inv.1 = alloca i32') < code.index('br label')
+    assert code.count('mul i32') == 1
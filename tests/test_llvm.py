@@ -0,0 +1,150 @@
+from wabbit import llvm
+from wabbit.deinit import deinit_program
+from wabbit.flat import flatten
+from wabbit.infer import infer_types
+from wabbit.llvm import *
+from wabbit.parse import parse_source
+from wabbit.resolve import resolve_scopes
+from wabbit.unscript import unscript_toplevel
+
+
+def instructions(code: str) -> list[str]:
+    # Opcodes of the instructions in `code`, without the names they define
+    return [line.split()[2] for line in code.splitlines() if line.startswith('%')]
+
+
+def main_code(source: str, cse: bool = True) -> str:
+    prog = unscript_toplevel(resolve_scopes(deinit_program(parse_source(source))))
+    code = generate_llvm(prog, cse)
+    start = code.index('define i32 @main')
+    # Skip the parameter's alloca
+    start = code.index('\n', code.index('alloca', start))
+    return code[start : code.index('}', start)]
+
+
+def test_repeated_expression():
+    # (x * y + 1) * (x * y + 1)
+    product = Add(Mul(GlobalName('x'), GlobalName('y')), Integer(1))
+    expr = Mul(product, product)
+    code, _ = generate_expression(expr)
+    assert instructions(code) == ['load', 'load', 'mul', 'add', 'mul']
+    # Operands of commutative operations may come in either order
+    expr = Sub(
+        Mul(GlobalName('x'), GlobalName('y')), Mul(GlobalName('y'), GlobalName('x'))
+    )
+    code, _ = generate_expression(expr)
+    assert instructions(code) == ['load', 'load', 'mul', 'sub']
+    llvm._n = 0
+    expected = generate_expression(expr)
+    llvm._n = 0
+    assert generate_flat_expression(flatten(expr)) == expected
+
+
+def test_without_cse():
+    code = main_code('var x = 2; print x * x + x * x;', cse=False)
+    assert instructions(code) == ['load', 'load', 'mul', 'load', 'load', 'mul', 'add']
+
+
+def test_assignments():
+    # Stored values are used without loading them back
+    code = main_code('var x = 2; var y = x * x; print y + x * x;')
+    assert instructions(code) == ['mul', 'add']
+    code = main_code('var x = 2; x = x + 1; print x;')
+    assert instructions(code) == ['add']
+
+
+def test_calls():
+    # Calls may assign globals, but not the caller's locals
+    source = """
+    var g = 1;
+    func f(n int) int {
+        g = n;
+        return n * n;
+    }
+    func h(n int) int {
+        var m = g;
+        print f(m) + g + n * m;
+        return n * m;
+    }
+    """
+    prog = unscript_toplevel(resolve_scopes(deinit_program(parse_source(source))))
+    llvm._n = 0
+    code = generate_llvm(prog)
+    start = code.index('define i32 @h')
+    h = code[start : code.index('}', start)]
+    assert instructions(h) == [
+        'alloca',
+        'alloca',
+        'load',
+        'call',
+        'load',
+        'add',
+        'mul',
+        'add',
+    ]
+    # n * m is still known when returning
+    assert 'ret i32 %.8' in h
+
+
+def test_blocks():
+    # Values don't carry over into the branches of an `If`, or past it
+    code = main_code('var x = 2; if x * 3 > 0 { print x * 3; } else { } print x * 3;')
+    assert instructions(code) == ['mul', 'icmp', 'load', 'mul', 'load', 'mul']
+    # A loop's test is evaluated in a block of its own
+    code = main_code('var n = 0; while n < 3 { n = n + 1; }')
+    assert instructions(code) == ['load', 'icmp', 'load', 'add']
+
+
+def test_memo():
+    source = """
+    var calls = 0;
+    func fib(n int) int {
+        if n < 2 { return 1; } else { return fib(n - 1) + fib(n - 2); }
+    }
+    func square(x int) int { return x * x; }
+    func count(n int) int {
+        calls = calls + 1;
+        if n < 1 { return 0; } else { return count(n - 1); }
+    }
+    print fib(30) + square(3) + count(5);
+    """
+    prog = unscript_toplevel(resolve_scopes(deinit_program(parse_source(source))))
+    assert 'memo' not in generate_llvm(prog)
+    code = generate_llvm(prog, memo=True)
+    # Only pure recursive functions are memoized; calls, including the
+    # recursive ones, go through the table
+    assert code.count('.memo.filled = global') == 1
+    assert 'define i32 @fib.body(' in code
+    assert 'define i32 @fib(i32 %arg)' in code
+    body = code[code.index('@fib.body(') : code.index('define i32 @fib(')]
+    assert body.count('call i32 (i32) @fib(') == 2
+    assert 'call i32 (i32) @fib.body(i32 %arg)' in code
+    assert 'define i32 @square(' in code
+    assert 'define i32 @count(' in code
+
+
+def test_floats():
+    source = """
+    var x = 2.5;
+    func half(y float) float { return y / 2.0; }
+    print half(x) + 1.0;
+    if x < 3.0 { print 1; } else { }
+    """
+    prog = unscript_toplevel(resolve_scopes(deinit_program(parse_source(source))))
+    prog = infer_types(prog)
+    llvm._n = 0
+    code = generate_llvm(prog)
+    assert '@x = global double 0.0' in code
+    assert 'define double @half(double %.1)' in code
+    # Constants are written as the bits of the double
+    assert 'store double 0x4004000000000000, double* @x' in code
+    assert 'fdiv double %.1, 0x4000000000000000' in code
+    assert 'call i32 (double) @_print_float(double' in code
+    assert 'call i32 (i32) @_print_int(i32 1)' in code
+    assert 'fcmp olt double' in code
+    assert 'declare i32 @_print_float(double %x)' in code
+    llvm._n = 0
+    code = generate_llvm(prog, fast_math=True)
+    assert 'fdiv fast double' in code
+    assert 'fadd fast double' in code
+    assert 'fcmp fast olt double' in code
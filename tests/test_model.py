@@ -0,0 +1,20 @@
+import pytest
+
+from wabbit.model import *
+
+
+def test_slots():
+    for node in (Name('x'), GlobalName('x'), LocalVar(Name('x')), Integer(1)):
+        assert not hasattr(node, '__dict__')
+    with pytest.raises(AttributeError):
+        Integer(1).type = Type.INTEGER
+
+
+def test_equality():
+    assert Add(Name('x'), Integer(1)) == Add(Name('x'), Integer(1))
+    assert Add(Name('x'), Integer(1)) != Sub(Name('x'), Integer(1))
+    # Scope-resolved names only equal names of the same kind
+    assert GlobalName('x') == GlobalName('x')
+    assert GlobalName('x') != LocalName('x')
+    assert GlobalName('x') != Name('x')
+    assert isinstance(GlobalName('x'), Expression)
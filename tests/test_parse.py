@@ -1,5 +1,8 @@
+import sys
+
 import pytest
 
+from wabbit.format import format_expression
 from wabbit.model import *
 from wabbit.parse import *
 from wabbit.tokenizer import *
@@ -18,6 +21,49 @@ def test_declaration():
         parse_statement('var x;')
 
 
+def test_var_lookahead():
+    consumed = []
+    dispatched = []
+
+    def stream():
+        rhs = ' + '.join(['1'] * 100)
+        for tok in iter_tokens(f'var x = {rhs}; var y int;'):
+            consumed.append(tok)
+            yield tok
+
+    p = Parser(stream())
+    parse_variable = p.parse_variable
+
+    def record_variable():
+        dispatched.append(len(consumed))
+        return parse_variable()
+
+    p.parse_variable = record_variable
+    assert isinstance(p.parse_var(), Variable)
+    # Deciding between `Variable` and `Declaration` only needs `var x =`
+    assert dispatched == [3]
+
+
+def test_deep_nesting():
+    limit = sys.getrecursionlimit()
+    expr = parse_source('print ' + '(' * limit + '1' + ')' * limit + ';')
+    assert expr == Program([Print(Integer(1))])
+
+    source = 'while x < 1 { ' * limit + 'print f((x));' + ' }' * limit
+    stmt = parse_source(source).statements[0]
+    for _ in range(limit - 1):
+        stmt = stmt.statements[0]
+    assert stmt.statements == [Print(Call(Name('f'), Name('x')))]
+
+    with pytest.raises(SyntaxError, match='Expected RPAREN'):
+        parse_source('print ((1);')
+
+
+def test_unknown_statement():
+    with pytest.raises(SyntaxError, match='Expected a statement'):
+        parse_statement('else { }')
+
+
 def test_func():
     assert parse_statement('func f(a int) int { }') == Func(
         Name('f'), Name('a', Type.INTEGER), [], Type.INTEGER
@@ -132,6 +178,35 @@ class TestMathExpression:
         assert actual == expected
 
 
+class TestPrecedence:
+    def test_mul_binds_tighter(self):
+        actual = Parser(tokenize('1 + 2 * 3 - 4 / x')).parse_expression()
+        expected = Sub(
+            Add(Integer(1), Mul(Integer(2), Integer(3))),
+            Div(Integer(4), Name('x')),
+        )
+        assert actual == expected
+
+    def test_left_associative(self):
+        actual = Parser(tokenize('1 - 2 - 3')).parse_expression()
+        assert actual == Sub(Sub(Integer(1), Integer(2)), Integer(3))
+        actual = Parser(tokenize('8 / 4 * 2')).parse_expression()
+        assert actual == Mul(Div(Integer(8), Integer(4)), Integer(2))
+
+    def test_long_chain(self):
+        source = ' + '.join(['x'] * 5000)
+        actual = Parser(tokenize(source)).parse_expression()
+        for _ in range(4999):
+            assert actual.right == Name('x')
+            actual = actual.left
+        assert actual == Name('x')
+
+    def test_round_trip_through_format(self):
+        source = '(x + 1) * (y - 4 / 2) - (z - 1)'
+        expr = Parser(tokenize(source)).parse_expression()
+        assert Parser(tokenize(format_expression(expr))).parse_expression() == expr
+
+
 class TestRelation:
     def test_lt(self):
         source = '1 < 2'
@@ -150,3 +225,44 @@ class TestRelation:
         actual = Parser(tokenize(source)).parse_relation()
         expected = Eq(Integer(1), Integer(2))
         assert actual == expected
+
+    def test_expressions(self):
+        source = 'x * x + y * y > 4'
+        actual = Parser(tokenize(source)).parse_relation()
+        expected = Gt(
+            Add(Mul(Name('x'), Name('x')), Mul(Name('y'), Name('y'))), Integer(4)
+        )
+        assert actual == expected
+
+    def test_missing_operator(self):
+        with pytest.raises(SyntaxError, match='Expected a relation'):
+            Parser(tokenize('x + 1 { }')).parse_relation()
+
+
+def test_streaming():
+    source = 'var x = 1; var y int; while x < 3 { x = x + 1; }'
+    consumed = []
+
+    def stream():
+        for tok in iter_tokens(source):
+            consumed.append(tok)
+            yield tok
+
+    p = Parser(stream())
+    assert p.parse_statement() == Variable(Name('x', Type.INTEGER), Integer(1))
+    # Only the tokens of the first statement (plus lookahead) have been pulled
+    assert len(consumed) < len(tokenize(source))
+    assert p.parse_statements() == [
+        Declaration(Name('y', Type.INTEGER)),
+        While(
+            Lt(Name('x'), Integer(3)),
+            [Assignment(Name('x'), Add(Name('x'), Integer(1)))],
+        ),
+    ]
+    assert p.eof()
+    assert parse_source(source) == parse_tokens(tokenize(source))
+
+
+def test_unexpected_eof():
+    with pytest.raises(SyntaxError, match='Unexpected end of input'):
+        parse_source('print 1')
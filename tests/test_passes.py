@@ -0,0 +1,69 @@
+import json
+
+from wabbit.model import *
+from wabbit.passes import *
+
+SOURCE = 'var x = 1 + 2;\nprint x * 3;\n'
+
+
+def test_pipeline(tmp_path):
+    path = tmp_path / 'prog.wb'
+    path.write_text(SOURCE)
+    manager = default_pass_manager(trace_memory=True)
+    assert manager.names == [
+        'tokenize',
+        'parse',
+        'fold',
+        'deinit',
+        'resolve',
+        'unscript',
+        'tailcall',
+        'inline',
+        'propagate',
+        'simplify',
+        'licm',
+        'infer',
+        'llvm',
+    ]
+    code = manager.run(path)
+    assert code.startswith('@x = global i32 0')
+    assert [r.name for r in manager.results] == manager.names
+    for r in manager.results:
+        assert r.wall_time >= 0 and r.cpu_time >= 0
+        assert r.peak_memory > 0
+    sizes = {r.name: r.size for r in manager.results}
+    assert sizes['tokenize'] == 12
+    # Tokens are lexed as the parser reads them
+    tokens = manager.run(path, stop_after='tokenize')
+    assert isinstance(tokens, TokenStream)
+    assert manager.results[-1].size is None
+    assert len(list(tokens)) == tokens.count == 12
+    # Program, Variable, Name and Add with two Integers; folding drops two nodes
+    assert sizes['parse'] - sizes['fold'] == 2
+
+
+def test_stop_after(tmp_path):
+    path = tmp_path / 'prog.wb'
+    path.write_text(SOURCE)
+    manager = default_pass_manager(fused=True)
+    prog = manager.run(path, stop_after='fused')
+    assert isinstance(prog, Program)
+    assert [r.name for r in manager.results] == ['tokenize', 'parse', 'fused']
+    assert manager.results[-1].peak_memory is None
+    assert prog == default_pass_manager().run(path, stop_after='unscript')
+
+
+def test_reports():
+    results = [PassResult('parse', 0.5, 0.25, None, 10)]
+    assert json.loads(format_results_json(results)) == [
+        {
+            'name': 'parse',
+            'wall_time': 0.5,
+            'cpu_time': 0.25,
+            'peak_memory': None,
+            'size': 10,
+        }
+    ]
+    table = format_results_table(results).splitlines()
+    assert table[1].split() == ['parse', '500.00', '250.00', '-', '10']
+    assert table[-1].split() == ['total', '500.00', '250.00']
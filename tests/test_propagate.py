@@ -0,0 +1,118 @@
+from wabbit.deinit import deinit_program
+from wabbit.foldconstants import fold_program
+from wabbit.format import format_program
+from wabbit.llvm import generate_llvm
+from wabbit.parse import parse_source
+from wabbit.propagate import *
+from wabbit.resolve import resolve_scopes
+from wabbit.unscript import unscript_toplevel
+
+
+def propagate(source: str) -> str:
+    prog = parse_source(source)
+    prog = unscript_toplevel(resolve_scopes(deinit_program(fold_program(prog))))
+    return format_program(propagate_constants(prog))
+
+
+def main_body(source: str) -> list[str]:
+    # Statements of `main`, without indentation
+    lines = propagate(source).splitlines()
+    start = lines.index('func main(_) {')
+    return [line.strip() for line in lines[start + 1 : -1]]
+
+
+def test_straight_line():
+    assert main_body('var x = 3; var y = x * 2; print y + x;') == [
+        'global[x] = 3;',
+        'global[y] = 6;',
+        'print 9;',
+    ]
+    # Reassignment with an unknown value
+    assert main_body('var x = 3; x = f(x); print x;')[-1] == 'print global[x];'
+
+
+def test_loop():
+    body = main_body('var LAST = 30; var n = 0; while n < LAST { n = n + 1; }')
+    assert body[2:] == ['while global[n] < 30 {', 'global[n] = global[n] + 1;', '}']
+    # Nothing assigned in the loop is known after it, or in its test
+    body = main_body('var n = 0; while n < 3 { n = 4; } print n;')
+    assert body[1] == 'while global[n] < 3 {'
+    assert body[-1] == 'print global[n];'
+    # Loops that never run are dropped
+    assert main_body('var n = 5; while n < 3 { n = n + 1; } print n;') == [
+        'global[n] = 5;',
+        'print 5;',
+    ]
+
+
+def test_branches():
+    source = """
+    func f(a int) int {
+        var x = 1;
+        var y = 2;
+        if a < 0 { x = 5; y = 3; } else { x = 5; }
+        return x + y;
+    }
+    """
+    assert '    return 5 + local[y];' in propagate(source).splitlines()
+    # Constant tests pick a branch
+    assert main_body('var x = 1; if x == 1 { print 2; } else { print 3; }') == [
+        'global[x] = 1;',
+        'print 2;',
+    ]
+    # A branch declaring variables keeps its `if`, which folding leaves as it is
+    source = 'var g = 1; if g == 1 { var q = 2; print q; } else { print 3; }'
+    assert main_body(source) == [
+        'global[g] = 1;',
+        'if 1 == 1 {',
+        'local q;',
+        'local[q] = 2;',
+        'print 2;',
+        '} else {',
+        '',
+        '}',
+    ]
+    # Division by a known zero in a branch that's dropped isn't folded
+    source = """
+    var y = 0;
+    var x = 10;
+    if y == 0 { print 0; } else { print x / y; }
+    """
+    assert main_body(source)[-1] == 'print 0;'
+
+
+def test_calls():
+    source = """
+    var g = 1;
+    var h = 2;
+    func set(a int) int { g = a; return 0; }
+    func indirect(a int) int { return set(a); }
+    func get(a int) int { return g + h; }
+    print get(0);
+    print g + h;
+    print indirect(5) + h;
+    print g;
+    """
+    assert modified_globals(parse_source(source)) == {
+        'set': set(),
+        'indirect': set(),
+        'get': set(),
+    }
+    body = main_body(source)
+    # Functions don't know the globals' values on entry
+    assert 'return global[g] + global[h];' in propagate(source)
+    assert body[2:] == [
+        'print get(0);',
+        'print 3;',
+        'print indirect(5) + 2;',
+        'print global[g];',
+    ]
+    # Calls to unknown functions may assign any global
+    assert main_body('var g = 1; print f(0); print g;')[-1] == 'print global[g];'
+
+
+def test_codegen():
+    prog = parse_source('var LAST = 3; var n = 0; while n < LAST { n = n + 1; }')
+    prog = unscript_toplevel(resolve_scopes(deinit_program(fold_program(prog))))
+    code = generate_llvm(propagate_constants(prog))
+    assert 'load i32, i32* @LAST' not in code
@@ -0,0 +1,169 @@
+from wabbit.format import format_program
+from wabbit.llvm import generate_expression
+from wabbit.model import *
+from wabbit.parse import parse_source
+from wabbit.simplify import *
+
+
+class TestSimplifyIdentities:
+    def test_add_zero(self):
+        # x + 0 -> x
+        expr = Add(Name('x'), Integer(0))
+        expected = Name('x')
+        assert simplify_expression(expr) == expected
+
+    def test_zero_add(self):
+        # 0 + x -> x
+        expr = Add(Integer(0), Name('x'))
+        expected = Name('x')
+        assert simplify_expression(expr) == expected
+
+    def test_mul_one(self):
+        # 1 * (x + y) -> x + y
+        expr = Mul(Integer(1), Add(Name('x'), Name('y')))
+        expected = Add(Name('x'), Name('y'))
+        assert simplify_expression(expr) == expected
+
+    def test_sub_and_div(self):
+        # (x - 0) / 1 -> x
+        expr = Div(Sub(Name('x'), Integer(0)), Integer(1))
+        expected = Name('x')
+        assert simplify_expression(expr) == expected
+
+    def test_folded_identity(self):
+        # x * (3 - 2) -> x
+        expr = Mul(Name('x'), Sub(Integer(3), Integer(2)))
+        expected = Name('x')
+        assert simplify_expression(expr) == expected
+
+    def test_constant_moves_right(self):
+        # 3 * x -> x * 3
+        expr = Mul(Integer(3), Name('x'))
+        expected = Mul(Name('x'), Integer(3))
+        assert simplify_expression(expr) == expected
+
+    def test_not_commutative(self):
+        # 0 - x -> 0 - x
+        expr = Sub(Integer(0), Name('x'))
+        expected = Sub(Integer(0), Name('x'))
+        assert simplify_expression(expr) == expected
+
+
+class TestSimplifyIntegers:
+    def test_mul_zero(self):
+        # (x + 1) * 0 -> 0
+        expr = Mul(Add(Name('x'), Integer(1)), Integer(0))
+        expected = Integer(0)
+        assert simplify_expression(expr) == expected
+
+    def test_mul_zero_with_call(self):
+        # f(x) * 0 -> f(x) * 0, since the call must still happen
+        expr = Mul(Call(Name('f'), Name('x')), Integer(0))
+        expected = Mul(Call(Name('f'), Name('x')), Integer(0))
+        assert simplify_expression(expr) == expected
+
+    def test_sub_self(self):
+        # (x + 1) - (x + 1) -> 0
+        expr = Sub(Add(Name('x'), Integer(1)), Add(Name('x'), Integer(1)))
+        expected = Integer(0)
+        assert simplify_expression(expr) == expected
+
+    def test_sub_self_untyped(self):
+        # x - x -> x - x, since x might be a float
+        expr = Sub(Name('x'), Name('x'))
+        expected = Sub(Name('x'), Name('x'))
+        assert simplify_expression(expr) == expected
+
+    def test_reassociate_add(self):
+        # (x + 1) + 2 -> x + 3
+        expr = Add(Add(Name('x'), Integer(1)), Integer(2))
+        expected = Add(Name('x'), Integer(3))
+        assert simplify_expression(expr) == expected
+
+    def test_reassociate_sub(self):
+        # (x + 1) - 3 -> x - 2
+        expr = Sub(Add(Name('x'), Integer(1)), Integer(3))
+        expected = Sub(Name('x'), Integer(2))
+        assert simplify_expression(expr) == expected
+
+    def test_reassociate_cancel(self):
+        # 2 + (x - 2) -> x
+        expr = Add(Integer(2), Sub(Name('x'), Integer(2)))
+        expected = Name('x')
+        assert simplify_expression(expr) == expected
+
+    def test_reassociate_mul(self):
+        # 2 * (3 * x) -> x * 6
+        expr = Mul(Integer(2), Mul(Integer(3), Name('x')))
+        expected = Mul(Name('x'), Integer(6))
+        assert simplify_expression(expr) == expected
+
+
+class TestSimplifyFloats:
+    def test_add_zero(self):
+        # x + 0.0 -> x + 0.0, since -0.0 + 0.0 is 0.0
+        expr = Add(Name('x'), Float(0.0))
+        expected = Add(Name('x'), Float(0.0))
+        assert simplify_expression(expr) == expected
+
+    def test_sub_zero(self):
+        # x - 0.0 -> x, but x - -0.0 is kept
+        assert simplify_expression(Sub(Name('x'), Float(0.0))) == Name('x')
+        expr = Sub(Name('x'), Float(-0.0))
+        assert simplify_expression(expr) == Sub(Name('x'), Float(-0.0))
+
+    def test_mul_zero(self):
+        # x * 0.0 -> x * 0.0, since x could be infinite
+        expr = Mul(Name('x'), Float(0.0))
+        expected = Mul(Name('x'), Float(0.0))
+        assert simplify_expression(expr) == expected
+
+    def test_no_reassociation(self):
+        # (x + 0.1) + 0.2 -> (x + 0.1) + 0.2
+        expr = Add(Add(Name('x'), Float(0.1)), Float(0.2))
+        expected = Add(Add(Name('x'), Float(0.1)), Float(0.2))
+        assert simplify_expression(expr) == expected
+
+    def test_div_power_of_two(self):
+        # x / 4.0 -> x * 0.25, but x / 3.0 is kept
+        expr = Div(Name('x'), Float(4.0))
+        assert simplify_expression(expr) == Mul(Name('x'), Float(0.25))
+        expr = Div(Name('x'), Float(3.0))
+        assert simplify_expression(expr) == Div(Name('x'), Float(3.0))
+
+
+def test_declared_types():
+    source = """
+    var a int;
+    var b float;
+    print a - a;
+    print b - b;
+    func f(x float) float {
+        var a float;
+        print a - a;
+        return x - x;
+    }
+    print f(b) - f(b);
+    print a - a;
+    """
+    assert format_program(simplify_program(parse_source(source))).splitlines() == [
+        'var a;',
+        'var b;',
+        'print 0;',
+        'print b - b;',
+        'func f(x) {',
+        '    var a;',
+        '    print a - a;',
+        '    return x - x;',
+        '}',
+        'print f(b) - f(b);',
+        'print 0;',
+    ]
+
+
+def test_shift():
+    # Multiplying by a power of two is a shift
+    code, var = generate_expression(Mul(GlobalName('x'), Integer(8)))
+    assert code.splitlines()[-1] == f'{var} = shl i32 {code.split()[0]}, 3'
+    code, var = generate_expression(Mul(GlobalName('x'), Integer(6)))
+    assert code.splitlines()[-1].endswith(' = mul i32 ' + code.split()[0] + ', 6')
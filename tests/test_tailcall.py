@@ -0,0 +1,134 @@
+from wabbit.deinit import deinit_program
+from wabbit.format import format_program
+from wabbit.parse import parse_source
+from wabbit.resolve import resolve_scopes
+from wabbit.tailcall import *
+from wabbit.unscript import unscript_toplevel
+
+
+def eliminate(source: str) -> Program:
+    prog = unscript_toplevel(resolve_scopes(deinit_program(parse_source(source))))
+    return eliminate_tail_calls(prog)
+
+
+def func_body(source: str, fname: str = 'f') -> list[str]:
+    # Statements of function `fname`, without indentation
+    lines = format_program(eliminate(source)).splitlines()
+    start = lines.index(f'func {fname}(n) {{')
+    end = lines.index('}', start)
+    return [line.strip() for line in lines[start + 1 : end]]
+
+
+def test_tail_call():
+    source = """
+    func f(n int) int {
+        var half = n / 2;
+        if n < 2 {
+            return n;
+        } else {
+            return f(half);
+        }
+    }
+    """
+    assert func_body(source) == [
+        'local tail.result;',
+        'local tail.again;',
+        'local half;',
+        'local[tail.again] = 1;',
+        'while local[tail.again] == 1 {',
+        'local[half] = local[n] / 2;',
+        'if local[n] < 2 {',
+        'local[tail.result] = local[n];',
+        'local[tail.again] = 0;',
+        '} else {',
+        'local[n] = local[half];',
+        '}',
+        '}',
+        'return local[tail.result];',
+    ]
+
+
+def test_accumulator():
+    # What follows a branch that returns belongs to the other one
+    source = """
+    func f(n int) int {
+        if n < 1 {
+            return 1;
+        } else {
+        }
+        return f(n - 1) * n;
+    }
+    """
+    assert func_body(source)[3:] == [
+        'local[tail.again] = 1;',
+        'local[tail.acc] = 1;',
+        'while local[tail.again] == 1 {',
+        'if local[n] < 1 {',
+        'local[tail.result] = local[tail.acc] * 1;',
+        'local[tail.again] = 0;',
+        '} else {',
+        'local[tail.acc] = local[tail.acc] * local[n];',
+        'local[n] = local[n] - 1;',
+        '}',
+        '}',
+        'return local[tail.result];',
+    ]
+
+
+def test_kept():
+    # Recursion that isn't linear, whose operand the call may change or on
+    # floats is kept
+    source = """
+    func f(n int) int {
+        if n < 2 {
+            return 1;
+        } else {
+            return f(n - 1) + f(n - 2);
+        }
+    }
+    """
+    assert func_body(source) == [
+        'if local[n] < 2 {',
+        'return 1;',
+        '} else {',
+        'return f(local[n] - 1) + f(local[n] - 2);',
+        '}',
+    ]
+    source = 'var g = 0; func f(n int) int { return f(n - 1) + g; }'
+    assert func_body(source) == ['return f(local[n] - 1) + global[g];']
+    source = 'func f(n float) float { return n * f(n - 1.0); }'
+    assert func_body(source) == ['return local[n] * f(local[n] - 1.0);']
+
+
+def test_mixed():
+    # Plain tail calls leave the accumulator as it is
+    source = """
+    func f(n int) int {
+        if n < 0 {
+            return f(0 - n);
+        } else {
+            if n < 2 {
+                return n;
+            } else {
+                return n + f(n - 1);
+            }
+        }
+    }
+    """
+    assert func_body(source)[6:9] == [
+        'if local[n] < 0 {',
+        'local[n] = 0 - local[n];',
+        '} else {',
+    ]
+    # With different operations, only plain tail calls loop
+    source = source.replace('return n + f', 'return n * f').replace(
+        'return n;', 'return n + f(n - 2);'
+    )
+    body = func_body(source)
+    assert 'local tail.acc;' not in body
+    assert body[4:7] == [
+        'if local[n] < 0 {',
+        'local[n] = 0 - local[n];',
+        '} else {',
+    ]
+    assert 'local[tail.result] = local[n] * f(local[n] - 1);' in body
@@ -1,4 +1,13 @@
-from wabbit.tokenizer import Token, tokenize
+import pytest
+
+from wabbit.tokenizer import (
+    Token,
+    iter_buffer_tokens,
+    iter_file_tokens,
+    tokenize,
+    tokenize_compact,
+    tokenize_legacy,
+)
 
 
 def test_signs():
@@ -237,3 +246,68 @@ def test_variable():
         Token('RPAREN', ')'),
         Token('SEMI', ';'),
     ]
+
+
+def test_matches_legacy_tokenizer():
+    sources = [
+        'var x = (12 + 45.67); // trailing comment',
+        'func foo(x int) int {\n\treturn x * 2;\n}\nprint foo(3);',
+        'while n < 10 { if n == 5 { print n; } else { n = n + 1; } }',
+        'x1 = y2/3//comment\n/4',
+    ]
+    for source in sources:
+        assert tokenize(source) == tokenize_legacy(source)
+
+
+def test_errors():
+    with pytest.raises(SyntaxError, match="Invalid syntax with '.'"):
+        tokenize('x.5')
+    with pytest.raises(SyntaxError, match="Can't have letter 'a' follow number"):
+        tokenize('12abc')
+    with pytest.raises(SyntaxError, match="Unrecognized '!' at position 2"):
+        tokenize('x != y')
+
+
+def test_compact():
+    source = 'var x = 12;\n// comment\nprint f(x) == 3.5;'
+    tokens = tokenize_compact(source)
+    assert len(tokens) == 13
+    assert list(tokens) == tokenize(source)
+    assert tokens.toktype(1) == 'NAME'
+    assert tokens.value(1) == 'x'
+    assert tokens[11] == Token('FLOAT', '3.5')
+    assert tokens.position(0) == (1, 1)
+    assert tokens.position(5) == (3, 1)
+    assert tokens.position(11) == (3, 15)
+
+    with pytest.raises(SyntaxError, match="Unrecognized '!' at position 2"):
+        tokenize_compact('x != y')
+
+
+def test_buffer():
+    sources = [
+        'var x = 12; // café\nprint x;',
+        'var café = 1.5;',
+        '// é\nx = y',
+    ]
+    for source in sources:
+        assert list(iter_buffer_tokens(source.encode())) == tokenize(source)
+
+    with pytest.raises(SyntaxError, match="Unrecognized '!' at position 5"):
+        list(iter_buffer_tokens('// é\n!'.encode()))
+    with pytest.raises(SyntaxError, match="Can't have letter 'é' follow number"):
+        list(iter_buffer_tokens('12é'.encode()))
+
+
+def test_file(tmp_path):
+    path = tmp_path / 'prog.wb'
+    path.write_text('var x = 3;\nprint x; // done')
+    assert list(iter_file_tokens(path)) == tokenize(path.read_text())
+
+    # Windows line endings
+    path.write_bytes(b'var x = 3;\r\nprint x; // done\r\nprint 1.5;\r\n')
+    assert list(iter_file_tokens(path)) == tokenize('var x = 3; print x; print 1.5;')
+    assert tokenize(path.read_bytes().decode()) == list(iter_file_tokens(path))
+
+    path.write_text('')
+    assert list(iter_file_tokens(path)) == []
@@ -0,0 +1,105 @@
+import sys
+
+import pytest
+
+from wabbit.deinit import deinit_program
+from wabbit.foldconstants import ConstantFolder, fold_expression, fold_program
+from wabbit.format import format_expression
+from wabbit.llvm import generate_llvm
+from wabbit.model import *
+from wabbit.resolve import resolve_scopes
+from wabbit.traverse import *
+from wabbit.unscript import unscript_toplevel
+
+DEPTH = sys.getrecursionlimit() * 2
+
+
+class NameCounter(Visitor):
+    def leave(self, node, children: list) -> int:
+        if isinstance(node, Name):
+            return 1
+        return sum(sum(c) if isinstance(c, list) else c for c in children)
+
+
+def test_visitor_order():
+    # x = 1; while x < y { print x; }
+    prog = Program(
+        [
+            Assignment(Name('x'), Integer(1)),
+            While(Lt(Name('x'), Name('y')), [Print(Name('x'))]),
+        ]
+    )
+    assert walk(prog, NameCounter()) == 4
+
+
+def test_transformer_splices_tuples():
+    class Duplicate(Transformer):
+        def leave(self, node, children: list):
+            if isinstance(node, Print):
+                return (node, node)
+            return self.rebuild(node, children)
+
+    prog = Program([If(Eq(Name('x'), Integer(1)), [Print(Name('x'))], [])])
+    expected = Program(
+        [If(Eq(Name('x'), Integer(1)), [Print(Name('x')), Print(Name('x'))], [])]
+    )
+    assert walk(prog, Duplicate()) == expected
+
+
+def test_deep_expression():
+    # 1 + (1 + (1 + ...))
+    expr = Integer(1)
+    for _ in range(DEPTH):
+        expr = Add(Integer(1), expr)
+    assert fold_expression(expr) == Integer(DEPTH + 1)
+    assert walk(expr, NameCounter()) == 0
+    assert len(format_expression(expr)) == 6 * DEPTH - 1
+
+
+def test_deep_blocks():
+    # while x < 1 { while x < 1 { ... print x + 1; } }
+    body = [Print(Add(Name('x'), Integer(1)))]
+    for _ in range(DEPTH):
+        body = [While(Lt(Name('x'), Integer(1)), body)]
+    prog = Program([Variable(Name('x'), Mul(Integer(2), Integer(3)))] + body)
+
+    prog = fold_program(prog)
+    assert prog.statements[0] == Variable(Name('x'), Integer(6))
+    prog = unscript_toplevel(resolve_scopes(deinit_program(prog)))
+    assert generate_llvm(prog).count('br label') == 2 * DEPTH
+
+
+def test_transformer_reuses_unchanged_nodes():
+    # print x + 1; while x < 2 { print 2 * 3; } print x;
+    untouched = Print(Add(Name('x'), Integer(1)))
+    loop = While(Lt(Name('x'), Integer(2)), [Print(Mul(Integer(2), Integer(3)))])
+    prog = Program([untouched, loop, Print(Name('x'))])
+
+    folder = ConstantFolder()
+    folded = walk(prog, folder)
+    assert folded.statements[0] is untouched
+    assert folded.statements[1].test is loop.test
+    assert folded.statements[2] is prog.statements[2]
+    # The folded constant plus the Print, While and Program above it
+    assert folder.allocations == 4
+
+    folder = ConstantFolder()
+    assert walk(folded, folder) is folded
+    assert folder.allocations == 0
+
+
+def test_handlers_follow_mro():
+    class Kinds(Visitor):
+        def leave_Name(self, node, children: list) -> str:
+            return 'name'
+
+        def leave_LocalName(self, node, children: list) -> str:
+            return 'local'
+
+        def leave_Add(self, node, children: list) -> list:
+            return children
+
+    kinds = Kinds()
+    assert walk(Add(GlobalName('x'), LocalName('y')), kinds) == ['name', 'local']
+    with pytest.raises(RuntimeError, match="Kinds can't handle Integer"):
+        walk(Integer(1), kinds)
@@ -1,9 +1,24 @@
 from wabbit.format import *
 from wabbit.model import *
+from wabbit.traverse import *
+
+
+class Deinitializer(Transformer):
+    # Only blocks can contain `Variable`s
+    fields = {
+        Statement: (),
+        If: ('consequence', 'alternative'),
+        While: ('statements',),
+        Func: ('body',),
+    }
+
+    def leave_Variable(self, node, children: list):
+        self.allocations += 2
+        return (Declaration(node.name), Assignment(node.name, node.value))
 
 
 def deinit_program(prog: Program) -> Program:
-    return Program(deinit_statements(prog.statements))
+    return walk(prog, Deinitializer())
 
 
 def deinit_statements(stmts: Statements) -> Statements:
@@ -18,24 +33,4 @@ def deinit_statements(stmts: Statements) -> Statements:
 
 
 def deinit_statement(stmt: Statement) -> Statements:
-    if isinstance(stmt, Variable):
-        return (Declaration(stmt.name), Assignment(stmt.name, stmt.value))
-    elif isinstance(stmt, If):
-        return If(
-            stmt.test,
-            deinit_statements(stmt.consequence),
-            deinit_statements(stmt.alternative),
-        )
-    elif isinstance(stmt, While):
-        return While(
-            stmt.test,
-            deinit_statements(stmt.statements),
-        )
-    elif isinstance(stmt, Func):
-        return Func(
-            stmt.name,
-            stmt.param,
-            deinit_statements(stmt.body),
-        )
-    else:
-        return stmt
+    return walk(stmt, Deinitializer())
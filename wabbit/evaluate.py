@@ -0,0 +1,222 @@
+from wabbit.model import *
+from wabbit.traverse import *
+
+# Range of the i32 values generated code computes with
+INT_MIN = -(2**31)
+INT_MAX = 2**31 - 1
+
+PYTHON_TYPES = {Type.INTEGER: int, Type.FLOAT: float}
+
+
+def divide(left: int | float, right: int | float) -> int | float:
+    # Division as in the generated code: towards zero for integers
+    if type(left) is float:
+        return left / right
+    quotient = abs(left) // abs(right)
+    return -quotient if (left < 0) != (right < 0) else quotient
+
+
+class FunctionEffects(Visitor):
+    # Whether a function prints or uses a variable it doesn't declare, and the
+    # functions it calls; works on programs before and after scope resolution
+    fields = {Func: ('body',), Call: ('arg',), Variable: ('value',), Declaration: ()}
+
+    def __init__(self, param: str):
+        self.scopes = [{param}]  # Variables declared in each enclosing block
+        self.prints = False
+        self.outside = False
+        self.calls = set()
+
+    def enter_block(self, node, field: str) -> None:
+        if isinstance(node, If | While):
+            self.scopes.append(set())
+
+    def leave_block(self, node, field: str) -> None:
+        if isinstance(node, If | While):
+            self.scopes.pop()
+
+    def leave_Variable(self, node, children: list) -> None:
+        self.scopes[-1].add(node.name.identifier)
+
+    leave_Declaration = leave_Variable
+
+    def leave_Name(self, node, children: list) -> None:
+        if not any(node.identifier in scope for scope in self.scopes):
+            self.outside = True
+
+    def leave_Print(self, node, children: list) -> None:
+        self.prints = True
+
+    def leave_Call(self, node, children: list) -> None:
+        self.calls.add(node.name.identifier)
+
+    def leave_object(self, node, children: list) -> None:
+        pass
+
+
+def pure_functions(prog: Program) -> dict[str, Func]:
+    """Functions whose result only depends on their argument, by name.
+
+    A function is pure if it prints nothing, only uses its parameter and its
+    own variables, and only calls pure functions.
+    """
+    funcs = {
+        stmt.name.identifier: stmt for stmt in prog.statements if isinstance(stmt, Func)
+    }
+    effects = {}
+    for fname, func in funcs.items():
+        effects[fname] = FunctionEffects(func.param.identifier)
+        walk(func, effects[fname])
+    pure = {
+        fname for fname, found in effects.items() if not (found.prints or found.outside)
+    }
+    changed = True
+    while changed:
+        changed = False
+        for fname in list(pure):
+            if not effects[fname].calls <= pure:
+                pure.remove(fname)
+                changed = True
+    return {fname: funcs[fname] for fname in pure}
+
+
+class CannotEvaluate(Exception):
+    # Raised when a call can't be run at compile time, e.g. when it runs out of
+    # steps or would divide by zero
+    pass
+
+
+class Interpreter:
+    """Runs calls to pure functions at compile time.
+
+    Integer arithmetic behaves as in the generated code, dividing towards zero,
+    except that a result out of the i32 range gives up rather than wrapping.
+    Each statement run and call made counts as a step; a call that needs more
+    than `max_steps` or nests deeper than `max_depth` gives up too, as does
+    reading a variable before assigning it or mixing integers and floats.
+    """
+
+    def __init__(self, funcs: dict[str, Func], max_steps=10000, max_depth=100):
+        self.funcs = funcs
+        self.max_steps = max_steps
+        self.max_depth = max_depth
+        self.steps = 0
+        self.depth = 0
+
+    def evaluate_call(self, call: Call) -> Number | None:
+        """Constant `call` evaluates to, None if it can't be evaluated."""
+        func = self.funcs.get(call.name.identifier)
+        if func is None or not isinstance(call.arg, Number):
+            return None
+        self.steps = 0
+        self.depth = 0
+        try:
+            value = self.call(func, call.arg.value)
+        except CannotEvaluate:
+            return None
+        return Integer(value) if type(value) is int else Float(value)
+
+    def step(self) -> None:
+        self.steps += 1
+        if self.steps > self.max_steps:
+            raise CannotEvaluate('out of steps')
+
+    def call(self, func: Func, arg: int | float) -> int | float:
+        self.step()
+        self.check_type(arg, func.param.type)
+        if self.depth == self.max_depth:
+            raise CannotEvaluate('calls nest too deep')
+        self.depth += 1
+        value = self.run(func.body, [{func.param.identifier: arg}])
+        self.depth -= 1
+        if value is None:
+            # Falling off the end returns 0
+            value = 0
+        return self.check_type(value, func.return_type)
+
+    def check_type(self, value: int | float, value_type: Type) -> int | float:
+        python_type = PYTHON_TYPES.get(value_type)
+        if python_type is not None and type(value) is not python_type:
+            raise CannotEvaluate(f'{value!r} is not {value_type.name.lower()}')
+        return value
+
+    def run(self, stmts: Statements, scopes: list[dict]) -> int | float | None:
+        # Runs a block, returning the value of the `return` it reaches, if any
+        scopes.append({})
+        for stmt in stmts:
+            self.step()
+            if isinstance(stmt, Variable):
+                scopes[-1][stmt.name.identifier] = self.value(stmt.value, scopes)
+            elif isinstance(stmt, Declaration):
+                scopes[-1][stmt.name.identifier] = None
+            elif isinstance(stmt, Assignment):
+                value = self.value(stmt.value, scopes)
+                self.lookup(stmt.name, scopes)[stmt.name.identifier] = value
+            elif isinstance(stmt, If):
+                taken = self.test(stmt.test, scopes)
+                value = self.run(
+                    stmt.consequence if taken else stmt.alternative, scopes
+                )
+                if value is not None:
+                    return value
+            elif isinstance(stmt, While):
+                while self.test(stmt.test, scopes):
+                    self.step()
+                    value = self.run(stmt.statements, scopes)
+                    if value is not None:
+                        return value
+            elif isinstance(stmt, Return):
+                return self.value(stmt.value, scopes)
+            else:
+                raise CannotEvaluate(f"can't run {stmt}")
+        scopes.pop()
+        return None
+
+    def lookup(self, name: Name, scopes: list[dict]) -> dict:
+        # Innermost scope declaring `name`
+        for scope in reversed(scopes):
+            if name.identifier in scope:
+                return scope
+        raise CannotEvaluate(f'{name.identifier!r} is not a local')
+
+    def test(self, relation: Relation, scopes: list[dict]) -> bool:
+        left = self.value(relation.left, scopes)
+        right = self.value(relation.right, scopes)
+        if type(left) is not type(right):
+            raise CannotEvaluate(f'{left!r} and {right!r} differ in type')
+        if isinstance(relation, Eq):
+            return left == right
+        elif isinstance(relation, Lt):
+            return left < right
+        return left > right
+
+    def value(self, expr: Expression, scopes: list[dict]) -> int | float:
+        if isinstance(expr, Number):
+            return expr.value
+        elif isinstance(expr, Name):
+            value = self.lookup(expr, scopes)[expr.identifier]
+            if value is None:
+                raise CannotEvaluate(f'{expr.identifier!r} has no value')
+            return value
+        elif isinstance(expr, Call):
+            func = self.funcs.get(expr.name.identifier)
+            if func is None:
+                raise CannotEvaluate(f'{expr.name.identifier!r} is not pure')
+            return self.call(func, self.value(expr.arg, scopes))
+        left = self.value(expr.left, scopes)
+        right = self.value(expr.right, scopes)
+        if type(left) is not type(right):
+            raise CannotEvaluate(f'{left!r} and {right!r} differ in type')
+        if isinstance(expr, Add):
+            value = left + right
+        elif isinstance(expr, Sub):
+            value = left - right
+        elif isinstance(expr, Mul):
+            value = left * right
+        elif not right:
+            raise CannotEvaluate('division by zero')
+        else:
+            value = divide(left, right)
+        if type(value) is int and not INT_MIN <= value <= INT_MAX:
+            raise CannotEvaluate(f'{value} overflows')
+        return value
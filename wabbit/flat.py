@@ -0,0 +1,211 @@
+from array import array
+
+from wabbit.model import *
+from wabbit.traverse import *
+
+# Node type <-> kind id stored in `FlatTree.kinds`
+NODE_KINDS = [
+    Program,
+    Print,
+    Variable,
+    Declaration,
+    GlobalVar,
+    LocalVar,
+    Assignment,
+    If,
+    While,
+    Func,
+    Return,
+    Call,
+    Name,
+    GlobalName,
+    LocalName,
+    Integer,
+    Float,
+    Add,
+    Sub,
+    Mul,
+    Div,
+    Eq,
+    Lt,
+    Gt,
+]
+KIND_IDS = {node_type: kind for kind, node_type in enumerate(NODE_KINDS)}
+NAME_KINDS = {KIND_IDS[Name], KIND_IDS[GlobalName], KIND_IDS[LocalName]}
+NUMBER_KINDS = {KIND_IDS[Integer], KIND_IDS[Float]}
+
+
+class FlatTree:
+    """A tree stored as parallel arrays indexed by node id.
+
+    Nodes are numbered in post-order, so every node's children have smaller ids
+    than the node itself and the root is the last node. Passes can therefore run
+    as a single loop over the ids instead of walking the tree. The operands of
+    each node are:
+
+    - Name, GlobalName, LocalName: a = identifier id, type = `Type` value
+    - Integer, Float: a = index into `constants`
+    - Add, Sub, Mul, Div, Eq, Lt, Gt: a = left, b = right
+    - Call, Variable, Assignment: a = name, b = value/arg
+    - Print, Return, Declaration, GlobalVar, LocalVar: a = value/name
+    - If: a = test, b = consequence block, c = alternative block
+    - While: a = test, b = block
+    - Func: a = name, b = param, c = body block, type = return type
+    - Program: a = block
+
+    Block `k` holds the node ids `items[block_starts[k]:block_ends[k]]`.
+    """
+
+    def __init__(self):
+        self.kinds = array('B')
+        self.types = array('B')
+        self.a = array('i')
+        self.b = array('i')
+        self.c = array('i')
+        self.items = array('i')
+        self.block_starts = array('i')
+        self.block_ends = array('i')
+        self.identifiers = []  # Interned identifiers
+        self.constants = []  # Values of Integer and Float nodes
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def copy(self):
+        flat = FlatTree()
+        for attr in vars(self):
+            setattr(flat, attr, getattr(self, attr)[:])
+        return flat
+
+    def add_node(self, kind: int, a=0, b=0, c=0, type=0) -> int:
+        self.kinds.append(kind)
+        self.types.append(type)
+        self.a.append(a)
+        self.b.append(b)
+        self.c.append(c)
+        return len(self.kinds) - 1
+
+    def add_block(self, node_ids: list[int]) -> int:
+        self.block_starts.append(len(self.items))
+        self.items.extend(node_ids)
+        self.block_ends.append(len(self.items))
+        return len(self.block_starts) - 1
+
+    def block(self, k: int) -> array:
+        return self.items[self.block_starts[k] : self.block_ends[k]]
+
+    def live(self) -> bytearray:
+        # Mark the nodes reachable from the root; passes that rewrite nodes in
+        # place can leave their old operands behind
+        live = bytearray(len(self.kinds))
+        if live:
+            live[-1] = 1
+        for i in range(len(live) - 1, -1, -1):
+            if not live[i]:
+                continue
+            for attr, is_block in KIND_OPERANDS[self.kinds[i]]:
+                operand = getattr(self, attr)[i]
+                if is_block:
+                    for j in self.block(operand):
+                        live[j] = 1
+                else:
+                    live[operand] = 1
+        return live
+
+
+# Operands of each node type, as (`FlatTree` attribute, model field) pairs, in
+# the same order as `CHILD_FIELDS`
+OPERAND_FIELDS = {
+    Program: (('a', 'statements'),),
+    Print: (('a', 'value'),),
+    Variable: (('a', 'name'), ('b', 'value')),
+    Declaration: (('a', 'name'),),
+    Assignment: (('a', 'name'), ('b', 'value')),
+    If: (('a', 'test'), ('b', 'consequence'), ('c', 'alternative')),
+    While: (('a', 'test'), ('b', 'statements')),
+    Func: (('a', 'name'), ('b', 'param'), ('c', 'body')),
+    Return: (('a', 'value'),),
+    Call: (('a', 'name'), ('b', 'arg')),
+    Add: (('a', 'left'), ('b', 'right')),
+    Sub: (('a', 'left'), ('b', 'right')),
+    Mul: (('a', 'left'), ('b', 'right')),
+    Div: (('a', 'left'), ('b', 'right')),
+    Eq: (('a', 'left'), ('b', 'right')),
+    Lt: (('a', 'left'), ('b', 'right')),
+    Gt: (('a', 'left'), ('b', 'right')),
+    # Leaves keep their values in `identifiers` and `constants`
+    Name: (),
+    Integer: (),
+    Float: (),
+}
+BLOCK_FIELDS = {'statements', 'consequence', 'alternative', 'body'}
+# Kind id -> (attribute, whether it holds a block) for each operand
+KIND_OPERANDS = [
+    tuple(
+        (attr, field in BLOCK_FIELDS)
+        for attr, field in lookup_fields(OPERAND_FIELDS, node_type)
+    )
+    for node_type in NODE_KINDS
+]
+
+
+class Flattener(Visitor):
+    # `leave` runs in post-order, which is exactly the order node ids are given
+    def __init__(self):
+        self.flat = FlatTree()
+        self.identifier_ids = {}
+
+    def leave(self, node, children: list) -> int:
+        flat = self.flat
+        kind = KIND_IDS[type(node)]
+        if isinstance(node, Name):
+            identifier_id = self.identifier_ids.get(node.identifier)
+            if identifier_id is None:
+                identifier_id = len(flat.identifiers)
+                flat.identifiers.append(node.identifier)
+                self.identifier_ids[node.identifier] = identifier_id
+            return flat.add_node(kind, identifier_id, type=node.type.value)
+        elif isinstance(node, Number):
+            flat.constants.append(node.value)
+            return flat.add_node(kind, len(flat.constants) - 1)
+        operands = [
+            flat.add_block(child) if isinstance(child, list) else child
+            for child in children
+        ]
+        if isinstance(node, Func):
+            return flat.add_node(kind, *operands, type=node.return_type.value)
+        return flat.add_node(kind, *operands)
+
+
+def flatten(node) -> FlatTree:
+    """Store the tree under `node` (a program, statement or expression)."""
+    flattener = Flattener()
+    walk(node, flattener)
+    return flattener.flat
+
+
+def unflatten(flat: FlatTree):
+    """Rebuild the `wabbit.model` tree stored in `flat` and return its root."""
+    nodes = [None] * len(flat)
+    live = flat.live()
+    for i, kind in enumerate(flat.kinds):
+        if not live[i]:
+            continue
+        node_type = NODE_KINDS[kind]
+        if kind in NAME_KINDS:
+            nodes[i] = node_type(flat.identifiers[flat.a[i]], Type(flat.types[i]))
+            continue
+        elif kind in NUMBER_KINDS:
+            nodes[i] = node_type(flat.constants[flat.a[i]])
+            continue
+        args = []
+        for attr, is_block in KIND_OPERANDS[kind]:
+            operand = getattr(flat, attr)[i]
+            if is_block:
+                args.append([nodes[j] for j in flat.block(operand)])
+            else:
+                args.append(nodes[operand])
+        if kind == KIND_IDS[Func]:
+            args.append(Type(flat.types[i]))
+        nodes[i] = node_type(*args)
+    return nodes[-1]
@@ -1,66 +1,145 @@
-from operator import add, floordiv, mul, sub
+from operator import add, eq, gt, lt, mul, sub
 
+from wabbit.evaluate import *
+from wabbit.flat import *
 from wabbit.format import *
+from wabbit.intern import Memo
 from wabbit.model import *
+from wabbit.traverse import *
 
-MATH_OP_OPERATORS = {Add: add, Sub: sub, Mul: mul, Div: floordiv}
+MATH_OP_OPERATORS = {Add: add, Sub: sub, Mul: mul, Div: divide}
+RELATION_OPERATORS = {Eq: eq, Lt: lt, Gt: gt}
+MATH_OP_KIND_OPERATORS = {
+    KIND_IDS[node_type]: operator for node_type, operator in MATH_OP_OPERATORS.items()
+}
 
 
-def fold_program(prog: Program) -> Program:
-    return Program(fold_statements(prog.statements))
+def divides_by_zero(node_type: type, right: int | float) -> bool:
+    # Division by zero is left for run time, where it may never happen
+    return node_type is Div and not right
 
 
-def fold_statements(stmts: Statements) -> Statements:
-    return [fold_statement(stmt) for stmt in stmts]
-
-
-def fold_statement(stmt: Statement) -> Statement:
-    if isinstance(stmt, Print):
-        return Print(fold_expression(stmt.value))
-    elif isinstance(stmt, Variable):
-        return Variable(stmt.name, fold_expression(stmt.value))
-    elif isinstance(stmt, Declaration):
-        return stmt
-    elif isinstance(stmt, Assignment):
-        return Assignment(stmt.name, fold_expression(stmt.value))
-    elif isinstance(stmt, If):
-        return If(
-            fold_relation(stmt.test),
-            fold_statements(stmt.consequence),
-            fold_statements(stmt.alternative),
+def evaluate_relation(relation: Relation) -> bool | None:
+    # Value of a comparison between constants, None if it isn't one
+    left, right = relation.left, relation.right
+    if isinstance(left, Number) and isinstance(right, Number):
+        return RELATION_OPERATORS[type(relation)](left.value, right.value)
+    return None
+
+
+class ConstantFolder(Transformer):
+    # Besides arithmetic on constants, an `If` with a constant test is replaced
+    # by the statements of the branch taken and a `While` whose test is
+    # constantly false is dropped; `eliminated` counts the nodes removed. With
+    # an `interpreter`, calls to pure functions with a constant argument are
+    # replaced by their result.
+    memoizable = (Statement, Expression, Relation)
+
+    eliminated = 0
+    interpreter = None
+
+    def leave_math(self, node, children: list):
+        left, right = children
+        if (
+            isinstance(left, Number)
+            and isinstance(right, Number)
+            and not divides_by_zero(type(node), right.value)
+        ):
+            operator = MATH_OP_OPERATORS[type(node)]
+            self.allocations += 1
+            return type(left)(operator(left.value, right.value))
+        return self.rebuild(node, children)
+
+    leave_Add = leave_Sub = leave_Mul = leave_Div = leave_math
+
+    def leave_Call(self, node, children: list):
+        call = self.rebuild(node, children)
+        if self.interpreter is not None:
+            value = self.interpreter.evaluate_call(call)
+            if value is not None:
+                self.eliminated += count_nodes(call)
+                self.allocations += 1
+                return value
+        return call
+
+    def leave_If(self, node, children: list):
+        test, consequence, alternative = children
+        taken = evaluate_relation(test)
+        if taken is None:
+            return self.rebuild(node, children)
+        branch, dead = (
+            (consequence, alternative) if taken else (alternative, consequence)
         )
-    elif isinstance(stmt, While):
-        return While(stmt.test, fold_statements(stmt.statements))
-    elif isinstance(stmt, Func):
-        return Func(stmt.name, stmt.param, fold_statements(stmt.body))
-    elif isinstance(stmt, Return):
-        return Return(fold_expression(stmt.value))
-    else:
-        raise RuntimeError(f"Can't fold {stmt}")
-
-
-def fold_expression(expr: Expression) -> Expression:
-    if isinstance(expr, Name):
-        return expr
-    elif isinstance(expr, Number):
-        return expr
-    elif isinstance(expr, MathOp):
-        operator = MATH_OP_OPERATORS[type(expr)]
-        left = fold_expression(expr.left)
-        right = fold_expression(expr.right)
-        if isinstance(left, Number) and isinstance(right, Number):
-            new = type(left)(operator(left.value, right.value))
-            return new
-        return type(expr)(left, right)
-    elif isinstance(expr, Call):
-        arg = fold_expression(expr.arg)
-        return Call(expr.name, arg)
-    else:
-        raise RuntimeError(f"Can't fold {expr}")
-
-
-def fold_relation(relation: Relation) -> Relation:
-    return type(relation)(
-        left=fold_expression(relation.left),
-        right=fold_expression(relation.right),
-    )
+        if any(isinstance(stmt, Variable | Declaration) for stmt in branch):
+            # Splicing the branch would move its variables into the enclosing
+            # scope, so only drop the other one
+            if not dead:
+                return self.rebuild(node, children)
+            self.eliminated += count_nodes(dead)
+            self.allocations += 1
+            if taken:
+                return If(test, consequence, [])
+            return If(test, [], alternative)
+        self.eliminated += 1 + count_nodes(test) + count_nodes(dead)
+        return tuple(branch)
+
+    def leave_While(self, node, children: list):
+        test, body = children
+        if evaluate_relation(test) is False:
+            self.eliminated += 1 + count_nodes(test) + count_nodes(body)
+            return ()
+        return self.rebuild(node, children)
+
+
+def fold_program(prog: Program, memo: Memo | None = None) -> Program:
+    folder = ConstantFolder()
+    folder.interpreter = Interpreter(pure_functions(prog))
+    return walk(prog, folder, memo)
+
+
+def fold_statements(stmts: Statements) -> Statements:
+    new_stmts = []
+    for stmt in stmts:
+        new_stmt = fold_statement(stmt)
+        if isinstance(new_stmt, tuple):
+            new_stmts.extend(new_stmt)
+        else:
+            new_stmts.append(new_stmt)
+    return new_stmts
+
+
+def fold_statement(
+    stmt: Statement, memo: Memo | None = None
+) -> Statement | tuple[Statement, ...]:
+    return walk(stmt, ConstantFolder(), memo)
+
+
+def fold_expression(expr: Expression, memo: Memo | None = None) -> Expression:
+    return walk(expr, ConstantFolder(), memo)
+
+
+def fold_relation(relation: Relation, memo: Memo | None = None) -> Relation:
+    return walk(relation, ConstantFolder(), memo)
+
+
+def fold_flat(flat: FlatTree) -> FlatTree:
+    # The arithmetic of `ConstantFolder` over a flat tree; constant branches and
+    # loops are left alone. Operands come before the nodes using them, so a
+    # single loop in id order folds bottom-up; folded nodes are rewritten in
+    # place into constants.
+    flat = flat.copy()
+    kinds, a, b, constants = flat.kinds, flat.a, flat.b, flat.constants
+    for i, kind in enumerate(kinds):
+        operator = MATH_OP_KIND_OPERATORS.get(kind)
+        if operator is None:
+            continue
+        left, right = a[i], b[i]
+        if (
+            kinds[left] in NUMBER_KINDS
+            and kinds[right] in NUMBER_KINDS
+            and not divides_by_zero(NODE_KINDS[kind], constants[a[right]])
+        ):
+            constants.append(operator(constants[a[left]], constants[a[right]]))
+            kinds[i] = kinds[left]
+            a[i] = len(constants) - 1
+    return flat
@@ -1,4 +1,7 @@
+from wabbit.intern import Memo
 from wabbit.model import *
+from wabbit.parse import BINARY_PRECEDENCE, MATH_NODES
+from wabbit.traverse import *
 
 INDENTATION = ' ' * 4
 EXPLICIT_TYPE = True
@@ -8,6 +11,10 @@ MATH_OP_SIGNS = {
     Mul: '*',
     Div: '/',
 }
+# Same binding powers as the parser, keyed by node type
+MATH_OP_PRECEDENCE = {
+    node_type: BINARY_PRECEDENCE[toktype] for toktype, node_type in MATH_NODES.items()
+}
 RELATION_SIGNS = {
     Lt: '<',
     Gt: '>',
@@ -15,83 +22,143 @@ RELATION_SIGNS = {
 }
 
 
-def format_program(program: Program) -> str:
-    # Format an entire program
-    return format_statements(program.statements, level=0)
+class Formatter(Visitor):
+    # Statements are indented by their nesting level, expressions never are
+    memoizable = (Expression, Relation)
 
+    def __init__(self, level: int = 0):
+        self.level = level
 
-def format_statements(stmts: Statements, level: int) -> str:
-    # Format a list of statements
-    return '\n'.join(format_statement(stmt, level) for stmt in stmts)
+    def enter_block(self, node, field: str) -> None:
+        if not isinstance(node, Program):
+            self.level += 1
 
+    def leave_block(self, node, field: str) -> None:
+        if not isinstance(node, Program):
+            self.level -= 1
 
-def format_statement(stmt: Statement, level: int) -> str:
-    indentation = INDENTATION * level
-    if isinstance(stmt, Print):
-        return f'{indentation}print {format_expression(stmt.value)};'
-    elif isinstance(stmt, Variable):
-        return f'{indentation}var {format_expression(stmt.name)} = {format_expression(stmt.value)};'
-    elif isinstance(stmt, Declaration):
+    @property
+    def indentation(self) -> str:
+        return INDENTATION * self.level
+
+    def leave_Program(self, node, children: list) -> str:
+        return '\n'.join(children[0])
+
+    def leave_Print(self, node, children: list) -> str:
+        return f'{self.indentation}print {children[0]};'
+
+    def leave_Variable(self, node, children: list) -> str:
+        return f'{self.indentation}var {children[0]} = {children[1]};'
+
+    def leave_Declaration(self, node, children: list) -> str:
+        return f'{self.indentation}var {children[0]};'
+
+    def leave_GlobalVar(self, node, children: list) -> str:
         if EXPLICIT_TYPE:
-            if isinstance(stmt, GlobalVar):
-                return f'{indentation}global {stmt.name.identifier};'
-            elif isinstance(stmt, LocalVar):
-                return f'{indentation}local {stmt.name.identifier};'
-            else:
-                f'{indentation}var {format_expression(stmt.name)};'
-        return f'{indentation}var {format_expression(stmt.name)};'
-    elif isinstance(stmt, Assignment):
-        return f'{indentation}{format_expression(stmt.name)} = {format_expression(stmt.value)};'
-    elif isinstance(stmt, If):
-        code = f'{indentation}if {format_relation(stmt.test)} {{\n'
-        code += f'{format_statements(stmt.consequence, level + 1)}\n'
+            return f'{self.indentation}global {node.name.identifier};'
+        return self.leave_Declaration(node, children)
+
+    def leave_LocalVar(self, node, children: list) -> str:
+        if EXPLICIT_TYPE:
+            return f'{self.indentation}local {node.name.identifier};'
+        return self.leave_Declaration(node, children)
+
+    def leave_Assignment(self, node, children: list) -> str:
+        return f'{self.indentation}{children[0]} = {children[1]};'
+
+    def leave_If(self, node, children: list) -> str:
+        indentation = self.indentation
+        test, consequence, alternative = children
+        code = f'{indentation}if {test} {{\n'
+        code += '\n'.join(consequence) + '\n'
         code += indentation + '} else {\n'
-        code += f'{format_statements(stmt.alternative, level + 1)}\n'
+        code += '\n'.join(alternative) + '\n'
         code += indentation + '}'
         return code
-    elif isinstance(stmt, While):
-        code = f'{indentation}while {format_relation(stmt.test)} {{\n'
-        code += f'{format_statements(stmt.statements, level + 1)}\n'
+
+    def leave_While(self, node, children: list) -> str:
+        indentation = self.indentation
+        test, body = children
+        code = f'{indentation}while {test} {{\n'
+        code += '\n'.join(body) + '\n'
         code += indentation + '}'
         return code
-    elif isinstance(stmt, Func):
+
+    def leave_Func(self, node, children: list) -> str:
+        indentation = self.indentation
+        name, param, body = children
         if EXPLICIT_TYPE:
-            code = f'func {stmt.name.identifier}({stmt.param.identifier}) {{\n'
+            code = f'func {node.name.identifier}({node.param.identifier}) {{\n'
         else:
-            code = f'func {format_expression(stmt.name)}({format_expression(stmt.param)}) {{\n'
-        code += f'{indentation}{format_statements(stmt.body, level + 1)}\n'
+            code = f'func {name}({param}) {{\n'
+        code += indentation + '\n'.join(body) + '\n'
         code += f'{indentation}}}'
         return code
-    elif isinstance(stmt, Return):
-        return f'{indentation}return {format_expression(stmt.value)};'
-    else:
-        raise RuntimeError(f"Can't format {stmt}")
 
+    def leave_Return(self, node, children: list) -> str:
+        return f'{self.indentation}return {children[0]};'
+
+    def leave_Name(self, node, children: list) -> str:
+        return node.identifier
 
-def format_expression(expr: Expression) -> str:
-    if isinstance(expr, Name):
+    def leave_GlobalName(self, node, children: list) -> str:
         if EXPLICIT_TYPE:
-            if isinstance(expr, GlobalName):
-                return f'global[{expr.identifier}]'
-            elif isinstance(expr, LocalName):
-                return f'local[{expr.identifier}]'
-            else:
-                return expr.identifier
-        return expr.identifier
-    elif isinstance(expr, Number):
-        return str(expr.value)
-    elif isinstance(expr, MathOp):
-        sign = MATH_OP_SIGNS[type(expr)]
-        return f'{format_expression(expr.left)} {sign} {format_expression(expr.right)}'
-    elif isinstance(expr, Call):
-        # return f'{format_expression(expr.name)}({format_expression(expr.arg)})'
-        return f'{expr.name.identifier}({format_expression(expr.arg)})'
-    else:
-        raise RuntimeError(f"Can't format {expr}")
-
-
-def format_relation(relation: Relation) -> str:
-    sign = RELATION_SIGNS[type(relation)]
-    return (
-        f'{format_expression(relation.left)} {sign} {format_expression(relation.right)}'
-    )
+            return f'global[{node.identifier}]'
+        return node.identifier
+
+    def leave_LocalName(self, node, children: list) -> str:
+        if EXPLICIT_TYPE:
+            return f'local[{node.identifier}]'
+        return node.identifier
+
+    def leave_number(self, node, children: list) -> str:
+        return str(node.value)
+
+    leave_Integer = leave_Float = leave_number
+
+    def leave_math(self, node, children: list) -> str:
+        sign = MATH_OP_SIGNS[type(node)]
+        precedence = MATH_OP_PRECEDENCE[type(node)]
+        left, right = children
+        # Parenthesize operands that would otherwise parse differently
+        if isinstance(node.left, MathOp):
+            if MATH_OP_PRECEDENCE[type(node.left)] < precedence:
+                left = f'({left})'
+        if isinstance(node.right, MathOp):
+            if MATH_OP_PRECEDENCE[type(node.right)] <= precedence:
+                right = f'({right})'
+        return f'{left} {sign} {right}'
+
+    leave_Add = leave_Sub = leave_Mul = leave_Div = leave_math
+
+    def leave_Call(self, node, children: list) -> str:
+        return f'{node.name.identifier}({children[1]})'
+
+    def leave_Relation(self, node, children: list) -> str:
+        sign = RELATION_SIGNS[type(node)]
+        return f'{children[0]} {sign} {children[1]}'
+
+    def leave_object(self, node, children: list) -> str:
+        raise RuntimeError(f"Can't format {node}")
+
+
+def format_program(program: Program, memo: Memo | None = None) -> str:
+    # Format an entire program
+    return walk(program, Formatter(), memo)
+
+
+def format_statements(stmts: Statements, level: int) -> str:
+    # Format a list of statements
+    return '\n'.join(format_statement(stmt, level) for stmt in stmts)
+
+
+def format_statement(stmt: Statement, level: int) -> str:
+    return walk(stmt, Formatter(level))
+
+
+def format_expression(expr: Expression, memo: Memo | None = None) -> str:
+    return walk(expr, Formatter(), memo)
+
+
+def format_relation(relation: Relation, memo: Memo | None = None) -> str:
+    return walk(relation, Formatter(), memo)
@@ -0,0 +1,38 @@
+from wabbit.foldconstants import *
+from wabbit.model import *
+from wabbit.resolve import *
+from wabbit.traverse import *
+from wabbit.unscript import *
+
+
+class MiddleEnd(ScopeResolver, ConstantFolder):
+    """Constant folding, deinit, scope resolution and unscript in one walk.
+
+    Gives the same program as running `fold_program`, `deinit_program`,
+    `resolve_scopes` and `unscript_toplevel` in turn.
+    """
+
+    fields = {Declaration: (), Func: ('param', 'body')}
+    # Scope resolution depends on what has been declared so far
+    memoizable = ()
+
+    def enter_Variable(self, node) -> None:
+        # deinit puts the declaration before the assignment, so the name is in
+        # scope for the value
+        self.scope.declare(node.name.identifier)
+
+    def leave_Variable(self, node, children: list) -> tuple[Declaration, Assignment]:
+        name, value = children
+        where = self.scope.lookup(node.name.identifier)
+        declaration = LocalVar(node.name) if where == 'local' else GlobalVar(node.name)
+        self.allocations += 2
+        return (declaration, Assignment(name, value))
+
+    def leave_Program(self, node, children: list) -> Program:
+        return unscript_toplevel(self.rebuild(node, children))
+
+
+def fused_middle_end(prog: Program) -> Program:
+    middle_end = MiddleEnd(Scope())
+    middle_end.interpreter = Interpreter(pure_functions(prog))
+    return walk(prog, middle_end)
@@ -0,0 +1,128 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+
+from wabbit.model import *
+from wabbit.parse import *
+from wabbit.tokenizer import *
+
+
+@dataclass
+class ParsedSource:
+    # Everything needed to update a parse after an edit
+    source: str
+    tokens: TokenArray
+    program: Program
+    stmt_ends: array  # Token index just past the end of each top-level statement
+
+
+def parse_incremental(source: str) -> ParsedSource:
+    # Full parse that also records where each top-level statement ends
+    tokens = tokenize_compact(source)
+    stmts, stmt_ends = parse_toplevel(tokens, 0)
+    return ParsedSource(source, tokens, Program(stmts), stmt_ends)
+
+
+def parse_toplevel(tokens: TokenArray, start: int, stop=None) -> tuple[list, array]:
+    # Parse top-level statements from token `start` until `stop(n)` is true for
+    # the index `n` just past a statement, or where `Parser.parse_statements`
+    # would stop
+    p = Parser(tokens.iter_from(start))
+    stmts = []
+    stmt_ends = array('I')
+    while not (p.eof() or p.peek('RBRACE')):
+        stmts.append(p.parse_statement())
+        stmt_ends.append(start + p.n)
+        if stop is not None and stop(start + p.n):
+            break
+    return stmts, stmt_ends
+
+
+def relex(
+    old: TokenArray, source: str, offset: int, removed: int, inserted: int
+) -> tuple[TokenArray, int, int, int]:
+    """Re-tokenize `source` after an edit until the token stream resynchronises.
+
+    Returns the new tokens along with the damaged range: old tokens [first, stop)
+    were replaced by `count` new ones starting at index `first`.
+    """
+    delta = inserted - removed
+    # Tokens ending strictly before the edit can't change; lex from the end of
+    # the last of them, where the lexer is between tokens
+    first = bisect_left(old.ends, offset)
+    pos = old.ends[first - 1] if first else 0
+
+    types = array('B')
+    starts = array('I')
+    ends = array('I')
+    stop = len(old)
+    j = bisect_left(old.starts, offset + removed)
+    for toktype, start, end in scan_compact(source, pos):
+        if start >= offset + inserted:
+            # Past the edit the text is unchanged, so once a new token lines up
+            # with an old one the rest of the stream is the same
+            while j < len(old) and old.starts[j] < start - delta:
+                j += 1
+            if (
+                j < len(old)
+                and old.starts[j] == start - delta
+                and old.ends[j] == end - delta
+                and old.types[j] == toktype
+            ):
+                stop = j
+                break
+        types.append(toktype)
+        starts.append(start)
+        ends.append(end)
+
+    tokens = TokenArray(source)
+    tokens.types = old.types[:first] + types + old.types[stop:]
+    tail_starts = old.starts[stop:]
+    tail_ends = old.ends[stop:]
+    if delta:
+        tail_starts = array('I', [x + delta for x in tail_starts])
+        tail_ends = array('I', [x + delta for x in tail_ends])
+    tokens.starts = old.starts[:first] + starts + tail_starts
+    tokens.ends = old.ends[:first] + ends + tail_ends
+    return tokens, first, stop, len(types)
+
+
+def apply_edit(
+    parsed: ParsedSource, offset: int, removed: int, inserted: str
+) -> ParsedSource:
+    """Update a parse after replacing `removed` characters at `offset`.
+
+    Only the damaged tokens are re-lexed and only the top-level statements that
+    overlap them are re-parsed; all other statement nodes are reused as is.
+    """
+    source = parsed.source[:offset] + inserted + parsed.source[offset + removed :]
+    tokens, first, stop, count = relex(
+        parsed.tokens, source, offset, removed, len(inserted)
+    )
+    tdelta = count - (stop - first)
+
+    # Re-parse from the start of the first statement touching the damage, until
+    # a statement ends on an old statement boundary past the damage
+    old_ends = parsed.stmt_ends
+    a = bisect_right(old_ends, first)
+    start = old_ends[a - 1] if a else 0
+    damage_end = first + count
+
+    def resynced(n: int) -> bool:
+        if n < damage_end:
+            return False
+        b = bisect_left(old_ends, n - tdelta)
+        return b < len(old_ends) and old_ends[b] == n - tdelta
+
+    stmts, stmt_ends = parse_toplevel(tokens, start, resynced)
+    if stmt_ends and resynced(stmt_ends[-1]):
+        b = bisect_left(old_ends, stmt_ends[-1] - tdelta) + 1
+    else:
+        b = len(old_ends)
+    tail_ends = old_ends[b:]
+    if tdelta:
+        tail_ends = array('I', [x + tdelta for x in tail_ends])
+
+    old_stmts = parsed.program.statements
+    program = Program(old_stmts[:a] + stmts + old_stmts[b:])
+    return ParsedSource(source, tokens, program, old_ends[:a] + stmt_ends + tail_ends)
@@ -0,0 +1,166 @@
+from wabbit.model import *
+from wabbit.propagate import DECLARED_NAME_TYPES
+from wabbit.traverse import *
+
+NUMBER_TYPES = {Integer: Type.INTEGER, Float: Type.FLOAT}
+
+
+class TypeInferrer(Transformer):
+    """Gives every variable, expression and function a type.
+
+    A variable's type is the one it's declared with, or else that of the
+    values assigned to it; a function's return type is likewise the declared
+    one or that of the values it returns. Types learnt from one statement may
+    be needed by an earlier one, e.g. a global assigned in `main` and read in
+    a function before it, so `infer_types` repeats the walk until nothing new
+    is learnt, recording facts in `var_types` and `return_types`. With
+    `check`, variables and functions still without a type are integers, the
+    result has the types filled in and mixing integers and floats raises a
+    `TypeError`. Expects a program after scope resolution.
+    """
+
+    fields = {Func: ('param', 'body'), Call: ('arg',)}
+    # Types depend on what has been learnt about the whole program
+    memoizable = ()
+
+    def __init__(
+        self, params: dict, var_types: dict, return_types: dict, check: bool = False
+    ):
+        self.params = params  # Function name -> its parameter's identifier
+        self.var_types = var_types  # Variable key -> Type
+        self.return_types = return_types  # Function name -> Type
+        self.check = check
+        self.func = None  # Name of the enclosing function
+        self.changed = False
+        self.expression_types = {}  # id of a result -> (result, Type)
+
+    def key(self, name: Name) -> tuple:
+        # Locals are told apart by their function
+        if isinstance(name, LocalName):
+            return (self.func, name.identifier)
+        return (None, name.identifier)
+
+    def learn(self, table: dict, key, value_type: Type, what: str) -> None:
+        known = table.get(key, Type.UNSPECIFIED)
+        if value_type is Type.UNSPECIFIED:
+            return
+        if known is Type.UNSPECIFIED:
+            table[key] = value_type
+            self.changed = True
+        elif known is not value_type and self.check:
+            raise TypeError(
+                f'{what} is {known.name.lower()}, not {value_type.name.lower()}'
+            )
+
+    def lookup(self, table: dict, key) -> Type:
+        found = table.get(key, Type.UNSPECIFIED)
+        if found is Type.UNSPECIFIED and self.check:
+            return Type.INTEGER
+        return found
+
+    def typed(self, expr: Expression, expr_type: Type) -> Expression:
+        self.expression_types[id(expr)] = (expr, expr_type)
+        return expr
+
+    def type_of(self, expr: Expression) -> Type:
+        entry = self.expression_types.get(id(expr))
+        if entry is None or entry[0] is not expr:
+            return Type.UNSPECIFIED
+        return entry[1]
+
+    def same_type(self, node, left: Expression, right: Expression) -> Type:
+        # Type of the operands of `node`, which must agree
+        left_type, right_type = self.type_of(left), self.type_of(right)
+        if left_type is Type.UNSPECIFIED:
+            return right_type
+        if right_type not in (Type.UNSPECIFIED, left_type) and self.check:
+            raise TypeError(
+                f'{type(node).__name__} of {left_type.name.lower()} and '
+                f'{right_type.name.lower()}'
+            )
+        return left_type
+
+    def enter_Func(self, node) -> None:
+        self.func = node.name.identifier
+        key = (self.func, node.param.identifier)
+        self.learn(self.var_types, key, node.param.type, f'{self.func}() parameter')
+        what = f'{self.func}() return value'
+        self.learn(self.return_types, self.func, node.return_type, what)
+
+    def leave_Func(self, node, children: list):
+        func = self.rebuild(node, children)
+        return_type = self.lookup(self.return_types, self.func)
+        self.func = None
+        if func.return_type is not return_type:
+            self.allocations += 1
+            return Func(func.name, func.param, func.body, return_type)
+        return func
+
+    def leave_Declaration(self, node, children: list):
+        key = self.key(DECLARED_NAME_TYPES[type(node)](node.name.identifier))
+        self.learn(self.var_types, key, node.name.type, repr(node.name.identifier))
+        var_type = self.lookup(self.var_types, key)
+        if node.name.type is not var_type:
+            self.allocations += 2
+            return type(node)(Name(node.name.identifier, var_type))
+        return node
+
+    def leave_Name(self, node, children: list):
+        var_type = self.lookup(self.var_types, self.key(node))
+        if node.type is not var_type:
+            self.allocations += 1
+            node = type(node)(node.identifier, var_type)
+        return self.typed(node, var_type)
+
+    def leave_number(self, node, children: list):
+        return self.typed(node, NUMBER_TYPES[type(node)])
+
+    leave_Integer = leave_Float = leave_number
+
+    def leave_math(self, node, children: list):
+        left, right = children
+        expr_type = self.same_type(node, left, right)
+        return self.typed(self.rebuild(node, children), expr_type)
+
+    leave_Add = leave_Sub = leave_Mul = leave_Div = leave_math
+
+    def leave_Relation(self, node, children: list):
+        self.same_type(node, *children)
+        return self.rebuild(node, children)
+
+    def leave_Call(self, node, children: list):
+        # Arguments give the parameter its type
+        fname = node.name.identifier
+        if fname in self.params:
+            key = (fname, self.params[fname])
+            what = f'{fname}() parameter'
+            self.learn(self.var_types, key, self.type_of(children[0]), what)
+        return_type = self.lookup(self.return_types, fname)
+        return self.typed(self.rebuild(node, children), return_type)
+
+    def leave_Assignment(self, node, children: list):
+        _, value = children
+        what = repr(node.name.identifier)
+        self.learn(self.var_types, self.key(node.name), self.type_of(value), what)
+        return self.rebuild(node, children)
+
+    def leave_Return(self, node, children: list):
+        what = f'{self.func}() return value'
+        self.learn(self.return_types, self.func, self.type_of(children[0]), what)
+        return self.rebuild(node, children)
+
+
+def infer_types(prog: Program) -> Program:
+    params = {
+        stmt.name.identifier: stmt.param.identifier
+        for stmt in prog.statements
+        if isinstance(stmt, Func)
+    }
+    var_types = {}
+    return_types = {}
+    while True:
+        inferrer = TypeInferrer(params, var_types, return_types)
+        walk(prog, inferrer)
+        if not inferrer.changed:
+            break
+    return walk(prog, TypeInferrer(params, var_types, return_types, check=True))
@@ -0,0 +1,225 @@
+from wabbit.model import *
+from wabbit.traverse import *
+
+
+def subtree_nodes(node):
+    # Every node under `node`, including names and those in blocks
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        for field in child_fields(type(node)):
+            value = getattr(node, field)
+            if isinstance(value, list):
+                stack.extend(value)
+            else:
+                stack.append(value)
+
+
+def is_pure_leaf(func: Func) -> bool:
+    # Whether `func` only computes a value from its parameter: it makes no
+    # calls, prints nothing and doesn't use any global
+    return not any(
+        isinstance(node, Call | Print | GlobalName)
+        for stmt in func.body
+        for node in subtree_nodes(stmt)
+    )
+
+
+def always_returns(stmts: Statements) -> bool:
+    for stmt in stmts:
+        if isinstance(stmt, Return):
+            return True
+        if (
+            isinstance(stmt, If)
+            and always_returns(stmt.consequence)
+            and always_returns(stmt.alternative)
+        ):
+            return True
+    return False
+
+
+def contains_return(stmt: Statement) -> bool:
+    return any(isinstance(node, Return) for node in subtree_nodes(stmt))
+
+
+def replace_returns(stmts: Statements, replace) -> Statements | None:
+    """`stmts` with each `return value;` replaced by the statements
+    `replace(value)` returns.
+
+    Wabbit has no way to jump out of a block, so this only works for returns
+    in tail position, after which nothing else runs; None if there's another.
+    """
+    replaced = []
+    for i, stmt in enumerate(stmts):
+        if isinstance(stmt, Return):
+            # Anything after it is unreachable
+            replaced.extend(replace(stmt.value))
+            return replaced
+        if isinstance(stmt, If) and contains_return(stmt):
+            rest = stmts[i + 1 :]
+            if rest and not always_returns([stmt]):
+                # The rest only runs after a branch that may not return, so it
+                # can move to the end of that branch if the other one returns
+                if always_returns(stmt.consequence):
+                    stmt = If(stmt.test, stmt.consequence, stmt.alternative + rest)
+                elif always_returns(stmt.alternative):
+                    stmt = If(stmt.test, stmt.consequence + rest, stmt.alternative)
+                else:
+                    return None
+            consequence = replace_returns(stmt.consequence, replace)
+            alternative = replace_returns(stmt.alternative, replace)
+            if consequence is None or alternative is None:
+                return None
+            replaced.append(If(stmt.test, consequence, alternative))
+            # Whatever followed is now unreachable or in a branch
+            return replaced
+        elif isinstance(stmt, While) and contains_return(stmt):
+            return None
+        else:
+            replaced.append(stmt)
+    return replaced
+
+
+def lower_returns(stmts: Statements, result: Name) -> Statements | None:
+    # `stmts` with each `return value;` turned into `result = value;`
+    return replace_returns(stmts, lambda value: [Assignment(result, value)])
+
+
+# Stands for the result in a lowered body, until a call site names it
+RESULT = '.result'
+
+
+class Renamer(Transformer):
+    # Renames the locals of an inlined body, and drops their declarations
+    memoizable = ()
+
+    def __init__(self, names: dict[str, str]):
+        self.names = names
+
+    def leave_LocalName(self, node, children: list):
+        return LocalName(self.names[node.identifier])
+
+    def leave_LocalVar(self, node, children: list):
+        return ()
+
+
+class Inliner(Transformer):
+    """Replaces calls to small functions with the functions' bodies.
+
+    A call is inlined if its function is a pure leaf (see `is_pure_leaf`), has
+    at most `threshold` nodes and only returns in tail position. Inlining
+    moves the call and its argument in front of the statement it's in, so
+    that must not change what they compute: nothing before the call in the
+    statement may make a call, and the argument may neither make one nor
+    read a global. The argument is assigned to a fresh local standing for the parameter, the
+    body follows with fresh names for its locals and each `return` assigning
+    the result, and the call is replaced by the result. Calls in loop tests
+    are kept, as they run on every iteration, and so are calls outside
+    functions, which have no locals to hold the values. Functions are visited
+    in order and inlined into as they are, so a function that only calls
+    inlinable functions may become a leaf itself. Expects a program after
+    scope resolution; `inlined` counts the calls replaced.
+    """
+
+    fields = {
+        Assignment: ('value',),
+        Declaration: (),
+        Func: ('body',),
+        Call: ('arg',),
+        While: ('statements',),
+    }
+    # Inlining depends on which functions have been visited
+    memoizable = ()
+
+    inlined = 0
+
+    def __init__(self, funcs: dict[str, Func], threshold: int = 40):
+        self.funcs = funcs  # Name -> the function, once inlined into
+        self.threshold = threshold
+        self.bodies = {}  # id of a function -> its lowered body, or None
+        self.temps = []  # Fresh locals of each enclosing function
+        self.pending = [[]]  # Statements to insert before each statement
+        self.called = [False]  # Whether each statement has a call left so far
+
+    def lowered_body(self, func: Func) -> Statements | None:
+        # Body of `func` returning into `RESULT`, None if it can't be inlined
+        try:
+            return self.bodies[id(func)][1]
+        except KeyError:
+            pass
+        body = None
+        if is_pure_leaf(func) and count_nodes(func.body) <= self.threshold:
+            body = lower_returns(func.body, LocalName(RESULT))
+            if body is not None and not always_returns(func.body):
+                # Falling off the end returns 0
+                body = [Assignment(LocalName(RESULT), Integer(0)), *body]
+        self.bodies[id(func)] = (func, body)
+        return body
+
+    def enter_Func(self, node) -> None:
+        self.temps.append([])
+
+    def leave_Func(self, node, children: list):
+        temps = self.temps.pop()
+        if temps:
+            children = [[LocalVar(Name(temp)) for temp in temps] + children[0]]
+        func = self.rebuild(node, children)
+        self.funcs[func.name.identifier] = func
+        return func
+
+    def enter_Statement(self, node) -> None:
+        self.pending.append([])
+        self.called.append(False)
+
+    def leave_Statement(self, node, children: list):
+        stmt = self.rebuild(node, children)
+        self.called.pop()
+        pending = self.pending.pop()
+        if pending:
+            return (*pending, stmt)
+        return stmt
+
+    def leave_Call(self, node, children: list):
+        call = self.rebuild(node, children)
+        func = self.funcs.get(call.name.identifier)
+        body = None
+        if func is not None and self.temps and not self.called[-1]:
+            if not any(
+                isinstance(child, Call | GlobalName)
+                for child in subtree_nodes(call.arg)
+            ):
+                body = self.lowered_body(func)
+        if body is None:
+            # Calls after this one in the statement have to stay after it
+            self.called[-1] = True
+            return call
+        # Fresh names for the result, the parameter and the locals
+        self.inlined += 1
+        prefix = f'{func.name.identifier}.{self.inlined}'
+        names = {RESULT: f'{func.name.identifier}.ret.{self.inlined}'}
+        names[func.param.identifier] = f'{prefix}.{func.param.identifier}'
+        for stmt in func.body:
+            for child in subtree_nodes(stmt):
+                if isinstance(child, LocalVar):
+                    identifier = child.name.identifier
+                    names[identifier] = f'{prefix}.{identifier}'
+        self.temps[-1].extend(names.values())
+        pending = self.pending[-1]
+        pending.append(Assignment(LocalName(names[func.param.identifier]), call.arg))
+        renamer = Renamer(names)
+        for stmt in body:
+            renamed = walk(stmt, renamer)
+            if isinstance(renamed, tuple):
+                pending.extend(renamed)
+            else:
+                pending.append(renamed)
+        self.allocations += 2 + renamer.allocations
+        return LocalName(names[RESULT])
+
+
+def inline_calls(prog: Program, threshold: int = 40) -> Program:
+    funcs = {
+        stmt.name.identifier: stmt for stmt in prog.statements if isinstance(stmt, Func)
+    }
+    return walk(prog, Inliner(funcs, threshold))
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from dataclasses import fields as dataclass_fields
+
+from wabbit.model import *
+from wabbit.traverse import *
+
+
+class Interner(Transformer):
+    """Hash-conses trees: structurally identical subtrees become one object.
+
+    Children are interned before their parents, so a node's key only needs the
+    identities of its children rather than hashing whole subtrees. Keep the
+    interner alive for as long as its nodes are used to look up a `Memo`.
+    """
+
+    def __init__(self):
+        # Key -> the shared node with that structure
+        self.table = {}
+
+    def leave(self, node, children: list):
+        node = self.rebuild(node, children)
+        key = (type(node),)
+        for field in dataclass_fields(node):
+            value = getattr(node, field.name)
+            if isinstance(value, list):
+                key += (tuple(map(id, value)),)
+            elif isinstance(value, Expression | Statement | Relation):
+                key += (id(value),)
+            else:
+                key += (value,)
+        return self.table.setdefault(key, node)
+
+
+def intern_tree(node, interner: Interner | None = None):
+    """Share structurally identical subtrees of `node`."""
+    return walk(node, interner or Interner())
+
+
+class Memo:
+    """Bounded cache of a pure pass's results, keyed by node identity.
+
+    Use one `Memo` per pass; passed to `walk`, it skips any subtree whose result
+    is already known, so on an interned tree each distinct subtree is computed
+    once. The least recently used results are dropped beyond `maxsize`.
+    """
+
+    def __init__(self, maxsize: int = 65536):
+        self.maxsize = maxsize
+        self.results = OrderedDict()  # id(node) -> (node, result)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.results)
+
+    def get(self, node):
+        entry = self.results.get(id(node))
+        # Entries hold on to their node, so a matching id is the same node
+        if entry is None or entry[0] is not node:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        self.results.move_to_end(id(node))
+        return entry[1]
+
+    def put(self, node, result) -> None:
+        self.results[id(node)] = (node, result)
+        if len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -0,0 +1,179 @@
+from wabbit.intern import Interner, intern_tree
+from wabbit.model import *
+from wabbit.propagate import Effects, modified_globals, storage
+from wabbit.simplify import is_pure
+from wabbit.traverse import *
+
+
+def may_trap(expr: Expression) -> bool:
+    # Whether evaluating `expr` may divide by zero
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Div) and not (
+            isinstance(node.right, Number) and node.right.value
+        ):
+            return True
+        stack.extend(getattr(node, field) for field in child_fields(type(node)))
+    return False
+
+
+class Hoister(Transformer):
+    # Replaces the largest loop-invariant arithmetic in a loop with temporaries;
+    # `hoisted` lists each temporary with the expression it holds. Divisions by
+    # variables are only hoisted from the loop's test and the statements of
+    # its body that run on every iteration: not those in a branch or an inner
+    # loop, or after a return.
+    fields = {Assignment: ('value',), Declaration: (), Func: ('body',), Call: ('arg',)}
+    memoizable = ()
+
+    def __init__(self, effects: Effects, speculate: bool, new_temp, own_temps: set):
+        self.effects = effects
+        # Whether divisions by variables may be hoisted, which is only safe
+        # when the loop is known to run
+        self.speculate = speculate
+        self.new_temp = new_temp
+        self.own_temps = own_temps  # Identifiers of the temporaries made so far
+        self.invariant = set()  # ids of invariant results
+        self.interner = Interner()
+        self.temps = {}  # id of an interned expression -> its temporary
+        self.hoisted = []  # (temporary, expression)
+        self.depth = 0  # Number of enclosing blocks, 1 in the loop's body
+        self.returned = False  # Whether a return has been seen
+
+    def enter_block(self, node, field: str) -> None:
+        self.depth += 1
+
+    def leave_block(self, node, field: str) -> None:
+        self.depth -= 1
+
+    def may_speculate(self) -> bool:
+        return self.speculate and self.depth <= 1 and not self.returned
+
+    def leave_Return(self, node, children: list):
+        self.returned = True
+        return self.leave_object(node, children)
+
+    def leave_Name(self, node, children: list):
+        if storage(node) not in self.effects.keys and not (
+            isinstance(node, GlobalName) and self.effects.all_globals
+        ):
+            self.invariant.add(id(node))
+        return node
+
+    def leave_number(self, node, children: list):
+        self.invariant.add(id(node))
+        return node
+
+    leave_Integer = leave_Float = leave_number
+
+    def leave_math(self, node, children: list):
+        left, right = children
+        if (
+            id(left) in self.invariant
+            and id(right) in self.invariant
+            and (self.may_speculate() or not may_trap(node))
+        ):
+            node = self.rebuild(node, children)
+            self.invariant.add(id(node))
+            return node
+        return self.leave_object(node, children)
+
+    leave_Add = leave_Sub = leave_Mul = leave_Div = leave_math
+
+    def leave_Assignment(self, node, children: list):
+        # An inner loop's temporary is only assigned once, in front of that
+        # loop, so an invariant value can move further out as it is
+        value = children[0]
+        if (
+            node.name.identifier in self.own_temps
+            and id(value) in self.invariant
+            and not may_trap(value)
+        ):
+            self.hoisted.append((node.name, value))
+            return ()
+        return self.leave_object(node, children)
+
+    def leave_object(self, node, children: list):
+        # Variant nodes keep their invariant children out of the loop
+        return self.rebuild(node, [self.hoist(child) for child in children])
+
+    def hoist(self, child):
+        if not isinstance(child, MathOp) or id(child) not in self.invariant:
+            return child
+        expr = intern_tree(child, self.interner)
+        temp = self.temps.get(id(expr))
+        if temp is None:
+            temp = self.temps[id(expr)] = self.new_temp()
+            self.hoisted.append((temp, expr))
+        return temp
+
+
+class LoopInvariantMover(Transformer):
+    """Moves arithmetic that gives the same value on every iteration out of loops.
+
+    The largest invariant subexpressions of a `While` are computed once, into
+    temporaries assigned right before the loop. A variable is invariant if
+    nothing in the loop assigns or declares it, including the functions it
+    calls. Inner loops are handled first, so their hoisted values may move
+    further out. As the loop may not run at all, a division by a variable is
+    only hoisted when the loop test makes no calls, under an `If` with the same
+    test, and when it runs on every iteration (see `Hoister`). Temporaries are declared at the start of their function, since a
+    declaration inside a loop would allocate on every iteration. Expects a
+    program after scope resolution; `moved` counts the expressions hoisted.
+    """
+
+    fields = {Assignment: ('value',), Declaration: (), Func: ('body',), Call: ('arg',)}
+    # Whether an expression is invariant depends on the enclosing loop
+    memoizable = ()
+
+    moved = 0
+
+    def __init__(self, modified: dict[str, set[str]]):
+        self.modified = modified
+        self.count = 0
+        self.temps = [[]]  # Temporaries of each enclosing function
+        self.all_temps = set()
+
+    def new_temp(self) -> Name:
+        # Temporaries are named `inv.<n>`, which no Wabbit variable can be
+        self.count += 1
+        identifier = f'inv.{self.count}'
+        self.temps[-1].append(identifier)
+        self.all_temps.add(identifier)
+        return GlobalName(identifier) if len(self.temps) == 1 else LocalName(identifier)
+
+    def enter_Func(self, node) -> None:
+        self.temps.append([])
+
+    def leave_Func(self, node, children: list):
+        temps = self.temps.pop()
+        if temps:
+            children = [[LocalVar(Name(temp)) for temp in temps] + children[0]]
+        return self.rebuild(node, children)
+
+    def leave_Program(self, node, children: list):
+        temps = self.temps[0]
+        if temps:
+            children = [[GlobalVar(Name(temp)) for temp in temps] + children[0]]
+        return self.rebuild(node, children)
+
+    def leave_While(self, node, children: list):
+        loop = self.rebuild(node, children)
+        effects = Effects(self.modified)
+        walk(loop, effects)
+        speculate = is_pure(loop.test)
+        hoister = Hoister(effects, speculate, self.new_temp, self.all_temps)
+        new_loop = walk(loop, hoister)
+        if not hoister.hoisted:
+            return loop
+        self.moved += len(hoister.hoisted)
+        self.allocations += hoister.allocations
+        assignments = [Assignment(temp, expr) for temp, expr in hoister.hoisted]
+        if any(may_trap(expr) for _, expr in hoister.hoisted):
+            return (If(loop.test, assignments, []), new_loop)
+        return (*assignments, new_loop)
+
+
+def move_loop_invariants(prog: Program) -> Program:
+    return walk(prog, LoopInvariantMover(modified_globals(prog)))
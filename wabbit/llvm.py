@@ -1,6 +1,12 @@
+import struct
+
+from wabbit.evaluate import FunctionEffects, pure_functions
+from wabbit.flat import *
 from wabbit.model import *
+from wabbit.traverse import *
 
 _needs_print = False
+_needs_print_float = False
 
 # Generate a unique name like ".1", ".2", ".3", etc.
 _n = 0
@@ -23,76 +29,305 @@ LLVM_COMPARISON_INSTRUCTIONS = {
     Lt: 'slt',
     Gt: 'sgt',
 }
+LLVM_FLOAT_MATH_INSTRUCTIONS = {
+    Add: 'fadd',
+    Sub: 'fsub',
+    Mul: 'fmul',
+    Div: 'fdiv',
+}
+# Ordered comparisons, false if either operand is NaN
+LLVM_FLOAT_COMPARISON_INSTRUCTIONS = {
+    Eq: 'oeq',
+    Lt: 'olt',
+    Gt: 'ogt',
+}
+# Variables and values without a type are integers
+LLVM_TYPES = {Type.INTEGER: 'i32', Type.FLOAT: 'double', Type.UNSPECIFIED: 'i32'}
+NUMBER_TYPES = {Integer: Type.INTEGER, Float: Type.FLOAT}
+# Flags allowing LLVM to optimize float arithmetic as if it were exact
+FAST_MATH_FLAGS = 'fast'
 
 
-def generate_llvm(prog: Program) -> str:
-    code = '\n'.join(generate_statements(prog.statements))
-    if _needs_print:
-        code += '\n\ndeclare i32 @_print_int(i32 %x)'
-    return code
+def llvm_constant(node: Number) -> str:
+    # Doubles are written as the hexadecimal of their bits, which is exact
+    if isinstance(node, Float):
+        (bits,) = struct.unpack('<Q', struct.pack('<d', node.value))
+        return f'0x{bits:016X}'
+    return str(node.value)
 
 
-def generate_statements(stmts: Statements) -> list[str]:
-    return [generate_statement(stmt) for stmt in stmts]
+def left_shift(node_type: type, value) -> int | None:
+    # Bits to shift by instead of multiplying an i32 by the constant `value`,
+    # None unless it's a power of two
+    if (
+        node_type is Mul
+        and isinstance(value, int)
+        and 1 < value < 2**31
+        and value & (value - 1) == 0
+    ):
+        return value.bit_length() - 1
+    return None
 
 
-def generate_statement(stmt: Statement) -> str:
-    if isinstance(stmt, Print):
+# Instructions whose operands can be swapped
+COMMUTATIVE_INSTRUCTIONS = {
+    'add',
+    'mul',
+    'icmp eq',
+    'fadd',
+    'fmul',
+    'fcmp oeq',
+    f'fadd {FAST_MATH_FLAGS}',
+    f'fmul {FAST_MATH_FLAGS}',
+    f'fcmp {FAST_MATH_FLAGS} oeq',
+}
+
+
+class ValueTable:
+    """Emits the instructions of a basic block, reusing values already computed.
+
+    An instruction with the same opcode and operands as one earlier in the block
+    gives the same value, so with `cse` its result is reused rather than
+    emitted again (local value numbering). Loads are reused until the variable
+    is stored to, which forwards the stored value, or, for globals, until a call.
+    Values don't carry over into other blocks, which `clear` starts.
+    """
+
+    def __init__(self, cse: bool = True):
+        self.cse = cse
+        self.values = {}  # Instruction key -> SSA name of its result
+
+    def clear(self) -> None:
+        self.values = {}
+
+    def emit(self, key: tuple | None, instruction: str) -> tuple[str, str]:
+        # %{gensym} = {instruction}, unless the block already computed `key`;
+        # instructions with side effects have no key
+        if self.cse and key is not None:
+            var = self.values.get(key)
+            if var is not None:
+                return '', var
+        var = f'%{gensym()}'
+        if self.cse and key is not None:
+            self.values[key] = var
+        return f'{var} = {instruction}\n', var
+
+    def load(self, pointer: str, llvm_type: str = 'i32') -> tuple[str, str]:
+        return self.emit(('load', pointer), f'load {llvm_type}, {llvm_type}* {pointer}')
+
+    def store(self, pointer: str, value: str) -> None:
+        if self.cse:
+            self.values[('load', pointer)] = value
+
+    def operation(
+        self, instr: str, left: str, right: str, llvm_type: str = 'i32'
+    ) -> tuple[str, str]:
+        key = (instr, left, right)
+        if instr in COMMUTATIVE_INSTRUCTIONS and right < left:
+            key = (instr, right, left)
+        return self.emit(key, f'{instr} {llvm_type} {left}, {right}')
+
+    def call(
+        self, fname: str, arg: str, return_type: str = 'i32', arg_type: str = 'i32'
+    ) -> tuple[str, str]:
+        # Functions may assign any global
+        self.values = {
+            key: var
+            for key, var in self.values.items()
+            if not (key[0] == 'load' and key[1].startswith('@'))
+        }
+        return self.emit(
+            None, f'call {return_type} ({arg_type}) @{fname}({arg_type} {arg})'
+        )
+
+
+# Entries in the table of results of each memoized function; a power of two,
+# so that the low bits of the argument pick the entry
+MEMO_SIZE = 4096
+
+
+def recursive_pure_functions(prog: Program) -> set[str]:
+    # Names of the pure integer functions that call themselves
+    names = set()
+    for fname, func in pure_functions(prog).items():
+        if Type.FLOAT in (func.param.type, func.return_type):
+            continue
+        effects = FunctionEffects(func.param.identifier)
+        walk(func, effects)
+        if fname in effects.calls:
+            names.add(fname)
+    return names
+
+
+def memo_wrapper(fname: str) -> str:
+    """Definition of `@fname` returning the results of `@fname.body` from a table.
+
+    The table is direct-mapped: an argument's entry is picked by its low bits
+    and holds the last argument seen there along with its result. Arguments
+    from 0 up to `MEMO_SIZE` thus each have an entry of their own, while others
+    share entries like in a hash table, replacing each other's results.
+    """
+    table = f'[{MEMO_SIZE} x i32]'
+    flags = f'[{MEMO_SIZE} x i8]'
+    return f"""
+@{fname}.memo.filled = global {flags} zeroinitializer
+@{fname}.memo.keys = global {table} zeroinitializer
+@{fname}.memo.values = global {table} zeroinitializer
+
+define i32 @{fname}(i32 %arg) {{
+%slot = and i32 %arg, {MEMO_SIZE - 1}
+%index = zext i32 %slot to i64
+%filled.ptr = getelementptr {flags}, {flags}* @{fname}.memo.filled, i64 0, i64 %index
+%key.ptr = getelementptr {table}, {table}* @{fname}.memo.keys, i64 0, i64 %index
+%value.ptr = getelementptr {table}, {table}* @{fname}.memo.values, i64 0, i64 %index
+%filled = load i8, i8* %filled.ptr
+%key = load i32, i32* %key.ptr
+%is.filled = icmp ne i8 %filled, 0
+%same = icmp eq i32 %key, %arg
+%found = and i1 %is.filled, %same
+br i1 %found, label %hit, label %miss
+
+hit:
+%cached = load i32, i32* %value.ptr
+ret i32 %cached
+
+miss:
+%value = call i32 (i32) @{fname}.body(i32 %arg)
+store i8 1, i8* %filled.ptr
+store i32 %arg, i32* %key.ptr
+store i32 %value, i32* %value.ptr
+ret i32 %value
+}}"""
+
+
+class LLVMGenerator(Visitor):
+    # Values are i32 unless their type (see `wabbit.infer`) is float, which
+    # makes them doubles
+    def __init__(
+        self,
+        cse: bool = True,
+        memoized: set[str] = frozenset(),
+        return_types: dict[str, Type] | None = None,
+        fast_math: bool = False,
+    ):
+        # Labels of the enclosing If/While statements and parameter signatures of
+        # the enclosing functions, allocated on the way down
+        self.labels = []
+        self.values = ValueTable(cse)
+        self.memoized = memoized  # Names of the functions to memoize
+        self.return_types = return_types or {}  # Function name -> Type
+        self.fast_math = fast_math
+        self.math_types = {}  # id of a math node -> (node, Type)
+
+    def type_of(self, expr: Expression) -> Type:
+        if isinstance(expr, Number):
+            return NUMBER_TYPES[type(expr)]
+        elif isinstance(expr, Name):
+            return expr.type
+        elif isinstance(expr, Call):
+            return self.return_types.get(expr.name.identifier, Type.UNSPECIFIED)
+        entry = self.math_types.get(id(expr))
+        if entry is None or entry[0] is not expr:
+            return Type.UNSPECIFIED
+        return entry[1]
+
+    def float_instruction(self, instr: str) -> str:
+        if self.fast_math:
+            return f'{instr} {FAST_MATH_FLAGS}'
+        return instr
+
+    fields = {Assignment: ('value',), Declaration: (), Func: ('body',), Call: ('arg',)}
+
+    def enter_If(self, node) -> None:
+        self.labels.append((gensym(), gensym(), gensym()))
+
+    def enter_While(self, node) -> None:
+        self.labels.append((gensym(), gensym(), gensym()))
+        # The test has a block of its own
+        self.values.clear()
+
+    def enter_Func(self, node) -> None:
+        param_name_signature = gensym()
+        self.labels.append(param_name_signature)
+        self.values.clear()
+        self.values.store(f'%{node.param.identifier}', f'%{param_name_signature}')
+
+    def enter_block(self, node, field: str) -> None:
+        if isinstance(node, If | While):
+            self.values.clear()
+
+    def leave_block(self, node, field: str) -> None:
+        # Statements after an If or While go in a new block
+        if isinstance(node, If | While):
+            self.values.clear()
+
+    def leave_Program(self, node, children: list) -> str:
+        return '\n'.join(children[0])
+
+    def leave_Print(self, node, children: list) -> str:
         # print val -> call i32 (i32) @_print_int(i32 {val})
-        global _needs_print
+        global _needs_print, _needs_print_float
+        value_instr, value_var = children[0]
+        if self.type_of(node.value) is Type.FLOAT:
+            _needs_print_float = True
+            return (
+                value_instr + f'call i32 (double) @_print_float(double {value_var})\n'
+            )
         _needs_print = True
-        value_instr, value_var = generate_expression(stmt.value)
         return value_instr + f'call i32 (i32) @_print_int(i32 {value_var})\n'
-    elif isinstance(stmt, Declaration):
-        name = stmt.name.identifier
-        if isinstance(stmt, GlobalVar):
-            # global name -> @name = global i32 0
-            return f'@{name} = global i32 0'
-        elif isinstance(stmt, LocalVar):
-            # local name -> %name = alloca i32
-            return f'%{name} = alloca i32'
-        else:
-            raise RuntimeError(f"Can't generate {stmt}")
-    elif isinstance(stmt, Assignment):
-        name = stmt.name.identifier
-        value_instr, value_var = generate_expression(stmt.value)
-        if isinstance(stmt.name, GlobalName):
-            return value_instr + f'store i32 {value_var}, i32* @{name}'
-        elif isinstance(stmt.name, LocalName):
-            return value_instr + f'store i32 {value_var}, i32* %{name}'
+
+    def leave_GlobalVar(self, node, children: list) -> str:
+        # global name -> @name = global i32 0
+        if node.name.type is Type.FLOAT:
+            return f'@{node.name.identifier} = global double 0.0'
+        return f'@{node.name.identifier} = global i32 0'
+
+    def leave_LocalVar(self, node, children: list) -> str:
+        # local name -> %name = alloca i32
+        return f'%{node.name.identifier} = alloca {LLVM_TYPES[node.name.type]}'
+
+    def leave_Assignment(self, node, children: list) -> str:
+        name = node.name.identifier
+        value_instr, value_var = children[0]
+        if isinstance(node.name, GlobalName):
+            pointer = f'@{name}'
+        elif isinstance(node.name, LocalName):
+            pointer = f'%{name}'
         else:
-            raise RuntimeError(f"Can't generate {stmt}")
-    elif isinstance(stmt, If):
-        L_consequence = gensym()
-        L_alternative = gensym()
-        L_out = gensym()
-        code, test_var = generate_relation(stmt.test)
+            raise RuntimeError(f"Can't generate {node}")
+        self.values.store(pointer, value_var)
+        llvm_type = LLVM_TYPES[node.name.type]
+        return value_instr + f'store {llvm_type} {value_var}, {llvm_type}* {pointer}'
+
+    def leave_If(self, node, children: list) -> str:
+        L_consequence, L_alternative, L_out = self.labels.pop()
+        (code, test_var), consequence, alternative = children
         code += f'br i1 {test_var}, label %{L_consequence}, label %{L_alternative}\n'
         code += f'\n{L_consequence}:\n'
-        code += '\n'.join(generate_statements(stmt.consequence))
+        code += '\n'.join(consequence) + '\n'
         code += f'br label %{L_out}\n'
         code += f'\n{L_alternative}:\n'
-        code += '\n'.join(generate_statements(stmt.alternative))
+        code += '\n'.join(alternative) + '\n'
         code += f'br label %{L_out}\n'
         # L_out has no content so subsequent statements after while loop can execute
         code += f'\n{L_out}:\n'
         return code
-    elif isinstance(stmt, While):
-        L_test = gensym()
-        L_body = gensym()
-        L_out = gensym()
+
+    def leave_While(self, node, children: list) -> str:
+        L_test, L_body, L_out = self.labels.pop()
+        (test_instr, test_var), body = children
         code = f'br label %{L_test}\n'
-        test_instr, test_var = generate_relation(stmt.test)
         code += f'\n{L_test}:\n'
         code += test_instr
         code += f'br i1 {test_var}, label %{L_body}, label %{L_out}\n'
         code += f'\n{L_body}:\n'
-        code += '\n'.join(generate_statements(stmt.statements)) + '\n'
+        code += '\n'.join(body) + '\n'
         code += f'br label %{L_test}\n'
         # L_out has no content so subsequent statements after while loop can execute
         code += f'\n{L_out}:'
         return code
-    elif isinstance(stmt, Func):
+
+    def leave_Func(self, node, children: list) -> str:
         # func fname(arg) {body} ->
         # define i32 @fname(i32 %.0) {
         #     %arg = alloca i32
@@ -100,68 +335,197 @@ def generate_statement(stmt: Statement) -> str:
         #     {body}
         #     ret i32 0
         # }
-        func_name = stmt.name.identifier
-        param_name = stmt.param.identifier
-        param_name_signature = gensym()
-        code = f'\ndefine i32 @{func_name}(i32 %{param_name_signature}) {{\n'
-        code += f'%{param_name} = alloca i32\n'
-        code += f'store i32 %{param_name_signature}, i32* %{param_name}\n'
-        code += '\n'.join(generate_statements(stmt.body))
+        func_name = node.name.identifier
+        param_name = node.param.identifier
+        param_name_signature = self.labels.pop()
+        memoized = func_name in self.memoized
+        if memoized:
+            # Calls, including recursive ones, go through the memo table
+            func_name += '.body'
+        param_type = LLVM_TYPES[node.param.type]
+        return_type = LLVM_TYPES[node.return_type]
+        code = (
+            f'\ndefine {return_type} @{func_name}'
+            f'({param_type} %{param_name_signature}) {{\n'
+        )
+        code += f'%{param_name} = alloca {param_type}\n'
+        code += (
+            f'store {param_type} %{param_name_signature}, {param_type}* %{param_name}\n'
+        )
+        code += '\n'.join(children[0]) + '\n'
         # Functions must return something
-        code += 'ret i32 0\n'
+        if node.return_type is Type.FLOAT:
+            code += 'ret double 0.0\n'
+        else:
+            code += 'ret i32 0\n'
         code += '}'
+        if memoized:
+            code += '\n' + memo_wrapper(node.name.identifier)
         return code
-    elif isinstance(stmt, Return):
+
+    def leave_Return(self, node, children: list) -> str:
         # return val; -> ret i32 {val}
-        value_instr, value_var = generate_expression(stmt.value)
-        return value_instr + f'ret i32 {value_var}\n'
-    else:
-        raise RuntimeError(f"Can't generate {stmt}")
+        value_instr, value_var = children[0]
+        # Anything after the return is unreachable
+        self.values.clear()
+        llvm_type = LLVM_TYPES[self.type_of(node.value)]
+        return value_instr + f'ret {llvm_type} {value_var}\n'
 
+    def leave_GlobalName(self, node, children: list) -> tuple[str, str]:
+        # global[name] -> %{gensym} = load i32, i32* @name
+        return self.values.load(f'@{node.identifier}', LLVM_TYPES[node.type])
 
-def generate_expression(expr: Expression) -> tuple[str, str]:
-    if isinstance(expr, Name):
-        name = expr.identifier
-        var_name = gensym()
-        if isinstance(expr, GlobalName):
-            # global[name] -> %{gensym} = load i32, i32* @name
-            return f'%{var_name} = load i32, i32* @{name}\n', f'%{var_name}'
-        elif isinstance(expr, LocalName):
-            # local[name] -> %{gensym} = load i32, i32* %name
-            return f'%{var_name} = load i32, i32* %{name}\n', f'%{var_name}'
+    def leave_LocalName(self, node, children: list) -> tuple[str, str]:
+        # local[name] -> %{gensym} = load i32, i32* %name
+        return self.values.load(f'%{node.identifier}', LLVM_TYPES[node.type])
+
+    def leave_number(self, node, children: list) -> tuple[str, str]:
+        return '', llvm_constant(node)
+
+    leave_Integer = leave_Float = leave_number
+
+    def leave_math(self, node, children: list) -> tuple[str, str]:
+        (left_instr, left_var), (right_instr, right_var) = children
+        expr_type = self.type_of(node.left)
+        self.math_types[id(node)] = (node, expr_type)
+        shift = None
+        if isinstance(node.right, Integer):
+            shift = left_shift(type(node), node.right.value)
+        if expr_type is Type.FLOAT:
+            math_instr = self.float_instruction(
+                LLVM_FLOAT_MATH_INSTRUCTIONS[type(node)]
+            )
+            instr, var = self.values.operation(
+                math_instr, left_var, right_var, 'double'
+            )
+        elif shift is not None:
+            instr, var = self.values.operation('shl', left_var, str(shift))
         else:
-            raise RuntimeError(f"Can't generate {expr}")
-    elif isinstance(expr, Number):
-        # return str(expr.value), str(expr.value)
-        return '', str(expr.value)
-    elif isinstance(expr, MathOp):
-        left_instr, left_var = generate_expression(expr.left)
-        right_instr, right_var = generate_expression(expr.right)
-        final_var = gensym()
-        code = left_instr + right_instr
-        math_instr = LLVM_MATH_INSTRUCTIONS[type(expr)]
-        code += f'%{final_var} = {math_instr} i32 {left_var}, {right_var}\n'
-        return code, f'%{final_var}'
-    elif isinstance(expr, Call):
+            math_instr = LLVM_MATH_INSTRUCTIONS[type(node)]
+            instr, var = self.values.operation(math_instr, left_var, right_var)
+        return left_instr + right_instr + instr, var
+
+    leave_Add = leave_Sub = leave_Mul = leave_Div = leave_math
+
+    def leave_Call(self, node, children: list) -> tuple[str, str]:
         # fname(arg) -> %{gensym} = call i32 (i32) @fname(i32 {arg})
-        fname = expr.name.identifier
-        arg_instr, arg_var = generate_expression(expr.arg)
-        return_var = gensym()
-        return (
-            arg_instr + f'%{return_var} = call i32 (i32) @{fname}(i32 {arg_var})\n',
-            f'%{return_var}',
+        arg_instr, arg_var = children[0]
+        instr, var = self.values.call(
+            node.name.identifier,
+            arg_var,
+            LLVM_TYPES[self.type_of(node)],
+            LLVM_TYPES[self.type_of(node.arg)],
+        )
+        return arg_instr + instr, var
+
+    def leave_Relation(self, node, children: list) -> tuple[str, str]:
+        (left_instr, left_var), (right_instr, right_var) = children
+        if self.type_of(node.left) is Type.FLOAT:
+            condition = LLVM_FLOAT_COMPARISON_INSTRUCTIONS[type(node)]
+            instr, var = self.values.operation(
+                f'{self.float_instruction("fcmp")} {condition}',
+                left_var,
+                right_var,
+                'double',
+            )
+            return left_instr + right_instr + instr, var
+        comparison_sign = LLVM_COMPARISON_INSTRUCTIONS[type(node)]
+        instr, var = self.values.operation(
+            f'icmp {comparison_sign}', left_var, right_var
         )
-    else:
-        raise RuntimeError(f"Can't generate {expr}")
-
-
-def generate_relation(relation: Relation) -> str:
-    left_instr, left_var = generate_expression(relation.left)
-    right_instr, right_var = generate_expression(relation.right)
-    final_var = gensym()
-    code = left_instr + right_instr
-    comparison_sign = LLVM_COMPARISON_INSTRUCTIONS[type(relation)]
-    return (
-        code + f'%{final_var} = icmp {comparison_sign} i32 {left_var}, {right_var}\n',
-        f'%{final_var}',
-    )
+        return left_instr + right_instr + instr, var
+
+    def leave_object(self, node, children: list):
+        raise RuntimeError(f"Can't generate {node}")
+
+
+def generate_llvm(
+    prog: Program, cse: bool = True, memo: bool = False, fast_math: bool = False
+) -> str:
+    # Without `cse`, every load and operation is emitted where it occurs. With
+    # `memo`, pure recursive functions keep their results in a table. With
+    # `fast_math`, float arithmetic and comparisons carry LLVM's fast-math flags.
+    memoized = recursive_pure_functions(prog) if memo else frozenset()
+    return_types = {
+        stmt.name.identifier: stmt.return_type
+        for stmt in prog.statements
+        if isinstance(stmt, Func)
+    }
+    code = walk(prog, LLVMGenerator(cse, memoized, return_types, fast_math))
+    if _needs_print:
+        code += '\n\ndeclare i32 @_print_int(i32 %x)'
+    if _needs_print_float:
+        code += '\n\ndeclare i32 @_print_float(double %x)'
+    return code
+
+
+def generate_statements(stmts: Statements) -> list[str]:
+    return [generate_statement(stmt) for stmt in stmts]
+
+
+def generate_statement(stmt: Statement) -> str:
+    return walk(stmt, LLVMGenerator())
+
+
+def generate_expression(expr: Expression) -> tuple[str, str]:
+    return walk(expr, LLVMGenerator())
+
+
+def generate_relation(relation: Relation) -> tuple[str, str]:
+    return walk(relation, LLVMGenerator())
+
+
+def generate_flat_expression(flat: FlatTree, cse: bool = True) -> tuple[str, str]:
+    # `generate_expression` for the expression stored in a flat tree. Node ids
+    # are in post-order, the same order `LLVMGenerator` allocates names in, so a
+    # single loop in id order gives identical code.
+    live = flat.live()
+    kinds, a, b = flat.kinds, flat.a, flat.b
+    call_kind = KIND_IDS[Call]
+    integer_kind = KIND_IDS[Integer]
+    for i, kind in enumerate(kinds):
+        # Function names aren't loaded
+        if kind == call_kind:
+            live[a[i]] = 0
+    values = ValueTable(cse)
+    results = [None] * len(kinds)
+    for i, kind in enumerate(kinds):
+        if not live[i]:
+            continue
+        node_type = NODE_KINDS[kind]
+        if kind in NUMBER_KINDS:
+            results[i] = '', str(flat.constants[a[i]])
+        elif node_type is GlobalName or node_type is LocalName:
+            sigil = '@' if node_type is GlobalName else '%'
+            results[i] = values.load(f'{sigil}{flat.identifiers[a[i]]}')
+        elif node_type in LLVM_MATH_INSTRUCTIONS:
+            (left_instr, left_var), (right_instr, right_var) = (
+                results[a[i]],
+                results[b[i]],
+            )
+            shift = None
+            if kinds[b[i]] == integer_kind:
+                shift = left_shift(node_type, flat.constants[a[b[i]]])
+            if shift is not None:
+                instr, var = values.operation('shl', left_var, str(shift))
+            else:
+                math_instr = LLVM_MATH_INSTRUCTIONS[node_type]
+                instr, var = values.operation(math_instr, left_var, right_var)
+            results[i] = left_instr + right_instr + instr, var
+        elif node_type is Call:
+            arg_instr, arg_var = results[b[i]]
+            instr, var = values.call(flat.identifiers[a[a[i]]], arg_var)
+            results[i] = arg_instr + instr, var
+        elif node_type in LLVM_COMPARISON_INSTRUCTIONS:
+            (left_instr, left_var), (right_instr, right_var) = (
+                results[a[i]],
+                results[b[i]],
+            )
+            comparison_sign = LLVM_COMPARISON_INSTRUCTIONS[node_type]
+            instr, var = values.operation(
+                f'icmp {comparison_sign}', left_var, right_var
+            )
+            results[i] = left_instr + right_instr + instr, var
+        else:
+            raise RuntimeError(f"Can't generate {node_type.__name__} node")
+    return results[-1]
@@ -1,11 +1,14 @@
 import argparse
+import sys
 
 from wabbit.deinit import *
 from wabbit.foldconstants import *
 from wabbit.format import *
+from wabbit.fused import *
 from wabbit.llvm import *
 from wabbit.model import *
 from wabbit.parse import *
+from wabbit.passes import *
 from wabbit.resolve import *
 from wabbit.tokenizer import *
 from wabbit.unscript import *
@@ -51,12 +54,89 @@ def cli() -> argparse.Namespace:
         const=True,
         default=False,
     )
+    parser.add_argument(
+        '--tailcall',
+        action='store_const',
+        const=True,
+        default=False,
+    )
+    parser.add_argument(
+        '--inline',
+        action='store_const',
+        const=True,
+        default=False,
+    )
+    parser.add_argument(
+        '--propagate',
+        action='store_const',
+        const=True,
+        default=False,
+    )
+    parser.add_argument(
+        '--simplify',
+        action='store_const',
+        const=True,
+        default=False,
+    )
+    parser.add_argument(
+        '--licm',
+        action='store_const',
+        const=True,
+        default=False,
+    )
+    parser.add_argument(
+        '--infer',
+        action='store_const',
+        const=True,
+        default=False,
+    )
     parser.add_argument(
         '--llvm',
         action='store_const',
         const=True,
         default=False,
     )
+    parser.add_argument(
+        '--fused',
+        action='store_const',
+        const=True,
+        default=False,
+        help='run the middle-end passes in a single traversal',
+    )
+    parser.add_argument(
+        '--auto-memo',
+        action='store_const',
+        const=True,
+        default=False,
+        help='cache the results of pure recursive functions in the generated code',
+    )
+    parser.add_argument(
+        '--fast-math',
+        action='store_const',
+        const=True,
+        default=False,
+        help='let LLVM reorder float arithmetic as if it were exact',
+    )
+    parser.add_argument(
+        '--time-passes',
+        action='store_const',
+        const=True,
+        default=False,
+        help='report the time taken by each pass',
+    )
+    parser.add_argument(
+        '--mem-passes',
+        action='store_const',
+        const=True,
+        default=False,
+        help='report the peak memory of each pass (slows passes down)',
+    )
+    parser.add_argument(
+        '--pass-report',
+        choices=['table', 'json'],
+        default='table',
+        help='format of the --time-passes/--mem-passes report',
+    )
     return parser.parse_args()
 
 
@@ -68,45 +148,62 @@ def compile(
     show_deinit: bool = False,
     show_resolve: bool = False,
     show_unscript: bool = True,
+    show_tailcall: bool = False,
+    show_inline: bool = False,
+    show_propagate: bool = False,
+    show_simplify: bool = False,
+    show_licm: bool = False,
+    show_infer: bool = False,
     show_llvm: bool = True,
+    fused: bool = False,
+    time_passes: bool = False,
+    mem_passes: bool = False,
+    pass_report: str = 'table',
+    auto_memo: bool = False,
+    fast_math: bool = False,
 ) -> tuple[Program, str]:
-    with open(fname) as f:
-        source = f.read()
-    tokens = tokenize(source)
-    if show_tokenize:
-        print(tokens)
-        return
-
-    prog = parse_tokens(tokens)
-    if show_parse:
-        print(format_program(prog))
-        return
-
-    prog = fold_program(prog)
-    if show_foldconstant:
-        print(format_program(prog))
+    manager = default_pass_manager(
+        fused, trace_memory=mem_passes, auto_memo=auto_memo, fast_math=fast_math
+    )
+    shows = {
+        'tokenize': show_tokenize,
+        'parse': show_parse,
+        'fold': show_foldconstant,
+        'deinit': show_deinit,
+        'resolve': show_resolve,
+        'unscript': show_unscript,
+        'fused': show_unscript,
+        'tailcall': show_tailcall,
+        'inline': show_inline,
+        'propagate': show_propagate,
+        'simplify': show_simplify,
+        'licm': show_licm,
+        'infer': show_infer,
+        'llvm': show_llvm,
+    }
+    # Stop after the first pass whose output is shown; otherwise stop before
+    # code generation to keep the final program, then generate code
+    stop = next((name for name in manager.names if shows[name]), None)
+    prog = manager.run(fname, stop_after=stop or manager.names[-2])
+    if stop is None:
+        prog_ll = manager.run_pass(*manager.passes[-1], prog)
+
+    if time_passes or mem_passes:
+        if pass_report == 'json':
+            print(format_results_json(manager.results), file=sys.stderr)
+        else:
+            print(format_results_table(manager.results), file=sys.stderr)
+
+    if stop == 'tokenize':
+        print(list(prog))
         return
-
-    prog = deinit_program(prog)
-    if show_deinit:
-        print(format_program(prog))
+    elif stop == 'llvm':
+        print(prog)
         return
-
-    prog = resolve_scopes(prog)
-    if show_resolve:
+    elif stop is not None:
         print(format_program(prog))
         return
 
-    prog = unscript_toplevel(prog)
-    if show_unscript:
-        print(format_program(prog))
-        return
-
-    prog_ll = generate_llvm(prog)
-    if show_llvm:
-        print(prog_ll)
-        return
-
     out_name = f'{fname}.ll'
     with open(out_name, 'w') as f:
         f.write(prog_ll)
@@ -124,7 +221,19 @@ def main() -> None:
         args.deinit,
         args.resolve,
         args.unscript,
+        args.tailcall,
+        args.inline,
+        args.propagate,
+        args.simplify,
+        args.licm,
+        args.infer,
         args.llvm,
+        args.fused,
+        args.time_passes,
+        args.mem_passes,
+        args.pass_report,
+        args.auto_memo,
+        args.fast_math,
     )
 
 
@@ -10,12 +10,12 @@ class Type(Enum):
 
 # `Expression`s represent values
 class Expression:
-    pass
+    __slots__ = ()
 
 
 # `Statement`s represent actions
 class Statement:
-    pass
+    __slots__ = ()
 
 
 Statements = list[Statement]
@@ -23,30 +23,30 @@ Statements = list[Statement]
 
 # `Relation`s are used in if/while tests
 class Relation:
-    pass
+    __slots__ = ()
 
 
 # Expressions
-@dataclass
+@dataclass(slots=True)
 class Name(Expression):
     identifier: str
     type: Type = Type.UNSPECIFIED
 
 
 class GlobalName(Name):
-    pass
+    __slots__ = ()
 
 
 class LocalName(Name):
-    pass
+    __slots__ = ()
 
 
-@dataclass
+@dataclass(slots=True)
 class Integer(Expression):
     value: int
 
 
-@dataclass
+@dataclass(slots=True)
 class Float(Expression):
     value: float
 
@@ -54,25 +54,25 @@ class Float(Expression):
 Number = Integer | Float
 
 
-@dataclass
+@dataclass(slots=True)
 class Add(Expression):
     left: Expression
     right: Expression
 
 
-@dataclass
+@dataclass(slots=True)
 class Mul(Expression):
     left: Expression
     right: Expression
 
 
-@dataclass
+@dataclass(slots=True)
 class Sub(Expression):
     left: Expression
     right: Expression
 
 
-@dataclass
+@dataclass(slots=True)
 class Div(Expression):
     left: Expression
     right: Expression
@@ -82,12 +82,12 @@ MathOp = Add | Sub | Mul | Div
 
 
 # Statements
-@dataclass
+@dataclass(slots=True)
 class Print(Statement):
     value: Expression
 
 
-@dataclass
+@dataclass(slots=True)
 class Variable(Statement):
     # Declare a variable for the first time and assign a value
     # E.g., var x = 3;
@@ -95,7 +95,7 @@ class Variable(Statement):
     value: Expression
 
 
-@dataclass
+@dataclass(slots=True)
 class Declaration(Statement):
     # Declare a variable for the first time without assigning a value
     # E.g., var x;
@@ -103,14 +103,14 @@ class Declaration(Statement):
 
 
 class GlobalVar(Declaration):
-    pass
+    __slots__ = ()
 
 
 class LocalVar(Declaration):
-    pass
+    __slots__ = ()
 
 
-@dataclass
+@dataclass(slots=True)
 class Assignment(Statement):
     # Assign new value to existing variable
     # E.g., x = 4;
@@ -118,20 +118,20 @@ class Assignment(Statement):
     value: Expression
 
 
-@dataclass
+@dataclass(slots=True)
 class If(Statement):
     test: Relation
     consequence: Statements
     alternative: Statements
 
 
-@dataclass
+@dataclass(slots=True)
 class While(Statement):
     test: Relation
     statements: Statements
 
 
-@dataclass
+@dataclass(slots=True)
 class Func(Statement):
     name: Name
     param: Name
@@ -139,39 +139,39 @@ class Func(Statement):
     return_type: Type = Type.UNSPECIFIED
 
 
-@dataclass
+@dataclass(slots=True)
 class Return(Statement):
     value: Expression
 
 
-@dataclass
+@dataclass(slots=True)
 class Call(Expression):
     name: Name
     arg: Expression
 
 
 # Relations
-@dataclass
+@dataclass(slots=True)
 class Eq(Relation):
     # left == right
     left: Expression
     right: Expression
 
 
-@dataclass
+@dataclass(slots=True)
 class Lt(Relation):
     # left < right
     left: Expression
     right: Expression
 
 
-@dataclass
+@dataclass(slots=True)
 class Gt(Relation):
     # left > right
     left: Expression
     right: Expression
 
 
-@dataclass
+@dataclass(slots=True)
 class Program:
     statements: Statements
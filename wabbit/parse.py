@@ -1,3 +1,6 @@
+from collections import deque
+from collections.abc import Generator, Iterable
+
 from wabbit.model import *
 from wabbit.tokenizer import *
 
@@ -7,21 +10,57 @@ MATH_NODES = {
     'MUL': Mul,
     'DIV': Div,
 }
+# Binding power of each binary operator; operators with a higher value bind
+# more tightly, and operators with the same value associate to the left
+BINARY_PRECEDENCE = {
+    'ADD': 10,
+    'SUB': 10,
+    'MUL': 20,
+    'DIV': 20,
+}
 RELATION_NODES = {
     'LT': Lt,
     'GT': Gt,
     'EQ': Eq,
 }
 
+# Token that starts a statement -> name of the `Parser` method that parses it
+STATEMENT_PARSERS = {
+    'PRINT': 'parse_print',
+    'VAR': 'parse_var',
+    'NAME': 'parse_assignment',
+    'IF': 'parse_if',
+    'WHILE': 'parse_while',
+    'FUNC': 'parse_func',
+    'RETURN': 'parse_return',
+}
+
 
 class Parser:
-    def __init__(self, tokens: list[Token]):
-        self.tokens = tokens
-        self.n = 0
+    def __init__(self, tokens: Iterable[Token]):
+        # Tokens are pulled on demand, so only the lookahead window is held in
+        # memory; `tokens` may be a list or a generator such as `iter_tokens`
+        self.tokens = iter(tokens)
+        self.lookahead = deque()
+        self.n = 0  # Number of tokens consumed so far
+        self.statement_parsers = {
+            toktype: getattr(self, method)
+            for toktype, method in STATEMENT_PARSERS.items()
+        }
+
+    def fill(self, k: int) -> bool:
+        # Buffer at least `k` tokens; return False if the stream runs out first
+        while len(self.lookahead) < k:
+            tok = next(self.tokens, None)
+            if tok is None:
+                return False
+            self.lookahead.append(tok)
+        return True
 
     def expect(self, expected_type: str) -> Token:
-        tok = self.tokens[self.n]
+        tok = self.current_token
         if tok.toktype == expected_type:
+            self.lookahead.popleft()
             self.n += 1
             return tok
         else:
@@ -31,47 +70,56 @@ class Parser:
 
     @property
     def current_token(self) -> Token:
-        return self.tokens[self.n]
+        if not self.fill(1):
+            raise SyntaxError('Unexpected end of input')
+        return self.lookahead[0]
 
     def peek(self, toktype: str) -> bool:
         # Look at the next token without consuming it
-        return self.current_token.toktype == toktype
+        return self.fill(1) and self.lookahead[0].toktype == toktype
 
     def eof(self) -> bool:
-        return self.n == len(self.tokens)
+        return not self.fill(1)
 
-    def parse_statement(self):
-        if self.peek('PRINT'):
-            return self.parse_print()
-        elif self.peek('VAR'):
-            has_assignment = False
-            for i in range(self.n + 1, len(self.tokens)):
-                curr_token = self.tokens[i]
-                if curr_token.toktype == 'SEMI':
-                    break
-                else:
-                    if curr_token.toktype == 'ASSIGN':
-                        has_assignment = True
-                        break
-
-            # Distinguish between `Variable` and `Declaration`
-            if has_assignment:
-                return self.parse_variable()
-            return self.parse_declaration()
-        elif self.peek('NAME'):
-            return self.parse_assignment()
-        elif self.peek('IF'):
-            return self.parse_if()
-        elif self.peek('WHILE'):
-            return self.parse_while()
-        elif self.peek('FUNC'):
-            return self.parse_func()
-        elif self.peek('RETURN'):
-            return self.parse_return()
-        else:
+    def start_statement(self):
+        # Run the statement's parser; for statements with blocks this returns the
+        # generator that parses them, see `parse_statement`
+        parse = self.statement_parsers.get(self.current_token.toktype)
+        if parse is None:
             raise SyntaxError(
                 f'Expected a statement; current token is {self.current_token}'
             )
+        return parse()
+
+    def parse_statement(self):
+        stmt = self.start_statement()
+        if not isinstance(stmt, Generator):
+            return stmt
+        # Statements with blocks are parsed by generators that yield where each
+        # block goes and are sent back its statements. Driving them from this
+        # loop keeps the Python stack flat however deeply blocks are nested.
+        stack = []  # (generator, statements of the block it's waiting for)
+        gen, value = stmt, None
+        while True:
+            try:
+                gen.send(value)
+            except StopIteration as done:
+                if not stack:
+                    return done.value
+                gen, block = stack[-1]
+                block.append(done.value)
+            else:
+                block = []
+                stack.append((gen, block))
+            # Parse the innermost open block up to its end or a nested block
+            while not (self.eof() or self.peek('RBRACE')):
+                stmt = self.start_statement()
+                if isinstance(stmt, Generator):
+                    gen, value = stmt, None
+                    break
+                block.append(stmt)
+            else:
+                gen, value = stack.pop()
 
     def parse_statements(self) -> Statements:
         stmts = []
@@ -82,34 +130,78 @@ class Parser:
             stmts.append(stmt)
 
     def parse_expression(self) -> Expression:
-        term1 = self.parse_term()
-        for math_tok, math_node in MATH_NODES.items():
-            if self.peek(math_tok):
-                self.expect(math_tok)
-                term2 = self.parse_term()
-                return math_node(term1, term2)
-        return term1
+        # Operator-precedence parsing with explicit stacks, so neither long
+        # operator chains nor deeply nested parentheses recurse. `operators` holds
+        # pending binary operators along with the groups opened so far: None for
+        # (expr) and the function's `Name` for f(expr).
+        operands = []
+        operators = []
+        groups = 0  # Number of groups on `operators`
+        while True:
+            # Open any groups in front of the next term
+            while self.fill(1):
+                if self.lookahead[0].toktype == 'LPAREN':
+                    self.expect('LPAREN')
+                    operators.append(None)
+                elif (
+                    self.fill(2)
+                    and self.lookahead[0].toktype == 'NAME'
+                    and self.lookahead[1].toktype == 'LPAREN'
+                ):
+                    name = self.expect('NAME')
+                    self.expect('LPAREN')
+                    operators.append(Name(name.tokvalue))
+                else:
+                    break
+                groups += 1
+            operands.append(self.parse_term())
+
+            while True:
+                toktype = self.lookahead[0].toktype if self.fill(1) else None
+                precedence = BINARY_PRECEDENCE.get(toktype)
+                if precedence is not None:
+                    # Fold pending operators that bind at least as tightly, which
+                    # makes operators of the same precedence left associative
+                    while (
+                        operators
+                        and isinstance(operators[-1], str)
+                        and BINARY_PRECEDENCE[operators[-1]] >= precedence
+                    ):
+                        self.reduce(operands, operators)
+                    self.expect(toktype)
+                    operators.append(toktype)
+                    break
+                while operators and isinstance(operators[-1], str):
+                    self.reduce(operands, operators)
+                if toktype == 'RPAREN' and groups:
+                    # Close the innermost group
+                    self.expect('RPAREN')
+                    func = operators.pop()
+                    groups -= 1
+                    if func is not None:
+                        operands.append(Call(func, operands.pop()))
+                    continue
+                if groups:
+                    self.expect('RPAREN')
+                return operands.pop()
+
+    @staticmethod
+    def reduce(operands: list, operators: list) -> None:
+        # Replace the top two operands with the top operator applied to them
+        right = operands.pop()
+        left = operands.pop()
+        operands.append(MATH_NODES[operators.pop()](left, right))
 
     def parse_term(self) -> Expression:
-        # Parse a number, name, (value), (x + y), or f(arg)
+        # Parse a number or name; groups and calls are handled by
+        # `parse_expression`
         if self.peek('INTEGER'):
             return self.parse_integer()
         elif self.peek('FLOAT'):
             return self.parse_float()
         elif self.peek('NAME'):
             tok = self.expect('NAME')
-            if self.peek('LPAREN'):
-                # Func call
-                self.expect('LPAREN')
-                arg = self.parse_expression()
-                self.expect('RPAREN')
-                return Call(Name(tok.tokvalue), arg)
             return Name(tok.tokvalue)
-        elif self.peek('LPAREN'):
-            self.expect('LPAREN')
-            expr = self.parse_expression()
-            self.expect('RPAREN')
-            return expr
         else:
             raise SyntaxError('Expected a term')
 
@@ -123,12 +215,14 @@ class Parser:
 
     def parse_relation(self) -> Relation:
         # left relation right
-        left = self.parse_term()
-        for tok, relation in RELATION_NODES.items():
-            if self.peek(tok):
-                self.expect(tok)
-                break
-        right = self.parse_term()
+        left = self.parse_expression()
+        relation = RELATION_NODES.get(self.current_token.toktype)
+        if relation is None:
+            raise SyntaxError(
+                f'Expected a relation; current token is {self.current_token}'
+            )
+        self.expect(self.current_token.toktype)
+        right = self.parse_expression()
         return relation(left, right)
 
     def parse_print(self) -> Print:
@@ -138,6 +232,13 @@ class Parser:
         self.expect('SEMI')
         return Print(value)
 
+    def parse_var(self) -> Variable | Declaration:
+        # Distinguish between `Variable` and `Declaration` by the token after the
+        # name: var x = expr; vs. var x type;
+        if self.fill(3) and self.lookahead[2].toktype == 'ASSIGN':
+            return self.parse_variable()
+        return self.parse_declaration()
+
     def parse_variable(self) -> Variable:
         # var x = expr;
         self.expect('VAR')
@@ -185,29 +286,29 @@ class Parser:
         self.expect('SEMI')
         return Assignment(Name(name.tokvalue, type), value)
 
-    def parse_if(self) -> If:
+    def parse_if(self) -> Generator[None, Statements, If]:
         # if test { ... } else { ... }
         self.expect('IF')
         test = self.parse_relation()
         self.expect('LBRACE')
-        consequence = self.parse_statements()
+        consequence = yield
         self.expect('RBRACE')
         self.expect('ELSE')
         self.expect('LBRACE')
-        alternative = self.parse_statements()
+        alternative = yield
         self.expect('RBRACE')
         return If(test, consequence, alternative)
 
-    def parse_while(self) -> While:
+    def parse_while(self) -> Generator[None, Statements, While]:
         # while test { ... }
         self.expect('WHILE')
         test = self.parse_relation()
         self.expect('LBRACE')
-        body = self.parse_statements()
+        body = yield
         self.expect('RBRACE')
         return While(test, body)
 
-    def parse_func(self) -> Func:
+    def parse_func(self) -> Generator[None, Statements, Func]:
         # func fname(param) { ... }
         self.expect('FUNC')
         func_name = self.expect('NAME')
@@ -244,7 +345,7 @@ class Parser:
             )
 
         self.expect('LBRACE')
-        body = self.parse_statements()
+        body = yield
         self.expect('RBRACE')
         return Func(
             Name(func_name.tokvalue),
@@ -261,6 +362,16 @@ class Parser:
         return Return(value)
 
 
-def parse_tokens(tokens: Tokens) -> Program:
+def parse_tokens(tokens: Iterable[Token]) -> Program:
     p = Parser(tokens)
     return Program(p.parse_statements())
+
+
+def parse_source(text: str) -> Program:
+    # Stream tokens straight from the tokenizer into the parser
+    return parse_tokens(iter_tokens(text))
+
+
+def parse_file(fname: str) -> Program:
+    # Stream tokens from a memory-mapped file into the parser
+    return parse_tokens(iter_file_tokens(fname))
@@ -0,0 +1,158 @@
+import json
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass
+
+from wabbit.deinit import *
+from wabbit.foldconstants import *
+from wabbit.fused import *
+from wabbit.infer import *
+from wabbit.inline import *
+from wabbit.licm import *
+from wabbit.llvm import *
+from wabbit.model import *
+from wabbit.parse import *
+from wabbit.propagate import *
+from wabbit.resolve import *
+from wabbit.simplify import *
+from wabbit.tailcall import *
+from wabbit.tokenizer import *
+from wabbit.traverse import *
+from wabbit.unscript import *
+
+
+@dataclass
+class PassResult:
+    name: str
+    wall_time: float  # Seconds
+    cpu_time: float  # Seconds
+    peak_memory: int | None  # Bytes allocated at the peak, if traced
+    size: int | None  # Tokens, AST nodes or lines of LLVM produced
+
+
+def output_size(value) -> int | None:
+    if isinstance(value, Program):
+        return count_nodes(value)
+    elif isinstance(value, str):
+        return value.count('\n') + 1
+    elif isinstance(value, list):
+        return len(value)
+    return None
+
+
+class TokenStream:
+    # Tokens of a file, lexed as the next pass pulls them rather than held in a
+    # list; `count` is the number produced so far
+    def __init__(self, fname: str):
+        self.tokens = iter_file_tokens(fname)
+        self.count = 0
+
+    def __iter__(self) -> Iterator[Token]:
+        for tok in self.tokens:
+            self.count += 1
+            yield tok
+
+
+class PassManager:
+    """Runs registered passes in order, recording what each one costs.
+
+    Each pass takes the previous pass's output. With `trace_memory`, the peak
+    memory of each pass is measured with `tracemalloc`, which slows passes
+    down; times are always recorded. A `TokenStream` is only lexed as the
+    next pass reads it, so that pass's results include the tokenizing, and
+    the stream's size is recorded once it has been read.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.passes = []  # (name, function)
+        self.results = []  # `PassResult`s of the last run
+
+    @property
+    def names(self) -> list[str]:
+        return [name for name, _ in self.passes]
+
+    def register(self, name: str, func: Callable) -> None:
+        self.passes.append((name, func))
+
+    def run(self, value, stop_after: str | None = None):
+        """Run the passes on `value`, up to and including `stop_after`."""
+        self.results = []
+        for name, func in self.passes:
+            value = self.run_pass(name, func, value)
+            if name == stop_after:
+                break
+        return value
+
+    def run_pass(self, name: str, func: Callable, value):
+        peak_memory = None
+        if self.trace_memory:
+            tracemalloc.start()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            output = func(value)
+        finally:
+            cpu_time = time.process_time() - cpu_start
+            wall_time = time.perf_counter() - wall_start
+            if self.trace_memory:
+                _, peak_memory = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+        if isinstance(value, TokenStream) and self.results:
+            self.results[-1].size = value.count
+        self.results.append(
+            PassResult(name, wall_time, cpu_time, peak_memory, output_size(output))
+        )
+        return output
+
+
+def default_pass_manager(
+    fused: bool = False,
+    trace_memory: bool = False,
+    auto_memo: bool = False,
+    fast_math: bool = False,
+):
+    # The compiler pipeline, from a file name to LLVM IR; `auto_memo` memoizes
+    # pure recursive functions in the generated code and `fast_math` lets LLVM
+    # reorder float arithmetic
+    manager = PassManager(trace_memory)
+    manager.register('tokenize', TokenStream)
+    manager.register('parse', parse_tokens)
+    if fused:
+        manager.register('fused', fused_middle_end)
+    else:
+        manager.register('fold', fold_program)
+        manager.register('deinit', deinit_program)
+        manager.register('resolve', resolve_scopes)
+        manager.register('unscript', unscript_toplevel)
+    manager.register('tailcall', eliminate_tail_calls)
+    manager.register('inline', inline_calls)
+    manager.register('propagate', propagate_constants)
+    manager.register('simplify', simplify_program)
+    manager.register('licm', move_loop_invariants)
+    manager.register('infer', infer_types)
+    manager.register(
+        'llvm',
+        lambda prog: generate_llvm(prog, memo=auto_memo, fast_math=fast_math),
+    )
+    return manager
+
+
+def format_results_table(results: list[PassResult]) -> str:
+    lines = [f'{"pass":<10} {"wall ms":>9} {"cpu ms":>9} {"peak KB":>9} {"size":>9}']
+    for r in results:
+        peak = '-' if r.peak_memory is None else f'{r.peak_memory / 1024:.1f}'
+        size = '-' if r.size is None else str(r.size)
+        lines.append(
+            f'{r.name:<10} {r.wall_time * 1000:>9.2f} {r.cpu_time * 1000:>9.2f} '
+            f'{peak:>9} {size:>9}'
+        )
+    total_wall = sum(r.wall_time for r in results)
+    total_cpu = sum(r.cpu_time for r in results)
+    lines.append(f'{"total":<10} {total_wall * 1000:>9.2f} {total_cpu * 1000:>9.2f}')
+    return '\n'.join(lines)
+
+
+def format_results_json(results: list[PassResult]) -> str:
+    return json.dumps([asdict(r) for r in results], indent=2)
@@ -0,0 +1,196 @@
+from wabbit.foldconstants import *
+from wabbit.model import *
+from wabbit.traverse import *
+
+# Name type of the variables each kind of declaration introduces
+DECLARED_NAME_TYPES = {GlobalVar: GlobalName, LocalVar: LocalName}
+
+# Walks `propagate_constants` makes at most
+MAX_ROUNDS = 10
+
+
+def storage(name: Name, name_type: type | None = None) -> tuple[type, str]:
+    # Key of the variable `name` refers to; scope resolution has made globals and
+    # locals distinct name types
+    return (name_type or type(name), name.identifier)
+
+
+class CallGraph(Visitor):
+    # Globals each function assigns directly, and the functions it calls
+    fields = {Declaration: ()}
+
+    def __init__(self):
+        self.assigned = {}
+        self.calls = {}
+        self.funcs = []  # Enclosing functions
+
+    def enter_Func(self, node) -> None:
+        self.funcs.append(node.name.identifier)
+        self.assigned[node.name.identifier] = set()
+        self.calls[node.name.identifier] = set()
+
+    def leave_Func(self, node, children: list) -> None:
+        self.funcs.pop()
+
+    def leave_Assignment(self, node, children: list) -> None:
+        if self.funcs and isinstance(node.name, GlobalName):
+            self.assigned[self.funcs[-1]].add(node.name.identifier)
+
+    def leave_Call(self, node, children: list) -> None:
+        if self.funcs:
+            self.calls[self.funcs[-1]].add(node.name.identifier)
+
+    def leave_object(self, node, children: list) -> None:
+        pass
+
+
+def modified_globals(prog: Program) -> dict[str, set[str]]:
+    """Globals that calling each function may assign, directly or indirectly."""
+    graph = CallGraph()
+    walk(prog, graph)
+    modified = {fname: set(assigned) for fname, assigned in graph.assigned.items()}
+    changed = True
+    while changed:
+        changed = False
+        for fname, callees in graph.calls.items():
+            for callee in callees:
+                extra = modified.get(callee, set()) - modified[fname]
+                if extra:
+                    modified[fname] |= extra
+                    changed = True
+    return modified
+
+
+class Effects(Visitor):
+    # Variables a subtree may change: everything it assigns or declares, plus
+    # the globals of the functions it calls (all of them for unknown functions)
+    fields = {Declaration: ()}
+
+    def __init__(self, modified: dict[str, set[str]]):
+        self.modified = modified
+        self.keys = set()
+        self.all_globals = False
+
+    def leave_Assignment(self, node, children: list) -> None:
+        self.keys.add(storage(node.name))
+
+    def leave_Declaration(self, node, children: list) -> None:
+        self.keys.add(storage(node.name, DECLARED_NAME_TYPES.get(type(node))))
+
+    def leave_Call(self, node, children: list) -> None:
+        modified = self.modified.get(node.name.identifier)
+        if modified is None:
+            self.all_globals = True
+        else:
+            self.keys.update((GlobalName, name) for name in modified)
+
+    def leave_object(self, node, children: list) -> None:
+        pass
+
+
+class ConstantPropagator(ConstantFolder):
+    """Substitutes variables whose value is a known constant, and folds.
+
+    Values are tracked through each function's body in execution order: an
+    assignment of a constant makes the variable known until it's assigned again,
+    the two branches of an `If` keep what they agree on, a `While` that may run
+    forgets every variable its body may change, and a call forgets the globals
+    the function may assign.
+    """
+
+    fields = {Assignment: ('value',), Declaration: (), Func: ('body',), Call: ('arg',)}
+    # The result depends on the values known at each point
+    memoizable = ()
+
+    def __init__(self, modified: dict[str, set[str]]):
+        self.modified = modified
+        self.known = {}  # Storage key -> constant value
+        self.saved = []  # Values known before each enclosing function or block
+
+    def forget(self, keys) -> None:
+        for key in keys:
+            self.known.pop(key, None)
+
+    def forget_globals(self) -> None:
+        self.forget([key for key in self.known if key[0] is GlobalName])
+
+    def enter_Func(self, node) -> None:
+        # Nothing is known about the parameter or the globals on entry
+        self.saved.append(self.known)
+        self.known = {}
+
+    def leave_Func(self, node, children: list):
+        self.known = self.saved.pop()
+        return self.rebuild(node, children)
+
+    def enter_While(self, node) -> None:
+        # A loop whose test is false on entry never runs, and is dropped by
+        # `leave_While` once its test is substituted
+        probe = ConstantPropagator(self.modified)
+        probe.known = dict(self.known)
+        if evaluate_relation(walk(node.test, probe)) is False:
+            return
+        effects = Effects(self.modified)
+        walk(node, effects)
+        self.forget(effects.keys)
+        if effects.all_globals:
+            self.forget_globals()
+
+    def enter_block(self, node, field: str) -> None:
+        if isinstance(node, While) or field == 'consequence':
+            self.saved.append(dict(self.known))
+
+    def leave_block(self, node, field: str) -> None:
+        if isinstance(node, While):
+            # The body may run any number of times, including none
+            self.known = self.saved.pop()
+        elif field == 'consequence':
+            # Run the alternative from the same values, keeping the consequence's
+            before = self.saved.pop()
+            self.saved.append(self.known)
+            self.known = before
+        elif field == 'alternative':
+            consequence = self.saved.pop()
+            self.known = {
+                key: value
+                for key, value in self.known.items()
+                if consequence.get(key) == value
+            }
+
+    def leave_Assignment(self, node, children: list):
+        value = children[0]
+        if isinstance(value, Number):
+            self.known[storage(node.name)] = value
+        else:
+            self.known.pop(storage(node.name), None)
+        return self.rebuild(node, children)
+
+    def leave_Declaration(self, node, children: list):
+        self.known.pop(storage(node.name, DECLARED_NAME_TYPES.get(type(node))), None)
+        return node
+
+    def leave_Name(self, node, children: list):
+        return self.known.get(storage(node), node)
+
+    def leave_Call(self, node, children: list):
+        modified = self.modified.get(node.name.identifier)
+        if modified is None:
+            self.forget_globals()
+        else:
+            self.forget((GlobalName, name) for name in modified)
+        return ConstantFolder.leave_Call(self, node, children)
+
+
+def propagate_constants(prog: Program) -> Program:
+    # Substituting constants can fold a branch away, which may make more values
+    # known; repeat until nothing changes, or for at most MAX_ROUNDS walks
+    modified = modified_globals(prog)
+    interpreter = Interpreter(pure_functions(prog))
+    for _ in range(MAX_ROUNDS):
+        propagator = ConstantPropagator(modified)
+        propagator.interpreter = interpreter
+        new_prog = walk(prog, propagator)
+        if new_prog is prog:
+            break
+        prog = new_prog
+    return prog
@@ -1,6 +1,7 @@
 from typing import Self
 
 from wabbit.model import *
+from wabbit.traverse import *
 
 
 class Scope:
@@ -19,21 +20,62 @@ class Scope:
 
     def lookup(self, var_name: str) -> str:
         """Look up scope of given variable."""
-        if var_name in self.var_names:
-            return 'local' if self.parent_scope else 'global'
-        elif self.parent_scope:
-            return self.parent_scope.lookup(var_name)
-        else:
-            return 'undefined'
+        scope = self
+        while scope is not None:
+            if var_name in scope.var_names:
+                return 'local' if scope.parent_scope else 'global'
+            scope = scope.parent_scope
+        return 'undefined'
 
     def new_scope(self) -> Self:
         """Make new scope nested inside current scope."""
         return Scope(parent_scope=self)
 
 
+class ScopeResolver(Transformer):
+    def __init__(self, scope: Scope):
+        self.scope = scope
+
+    fields = {Variable: (), Declaration: (), Func: ('param', 'body')}
+
+    def enter_Func(self, node) -> None:
+        self.scope = self.scope.new_scope()
+        # Add func param to local scope
+        self.scope.var_names.add(node.param.identifier)
+
+    def enter_block(self, node, field: str) -> None:
+        if isinstance(node, If | While):
+            self.scope = self.scope.new_scope()
+
+    def leave_block(self, node, field: str) -> None:
+        if isinstance(node, If | While):
+            self.scope = self.scope.parent_scope
+
+    def leave_Name(self, node, children: list):
+        var_name = node.identifier
+        where = self.scope.lookup(var_name)
+        self.allocations += 1
+        return (
+            LocalName(var_name, node.type)
+            if where == 'local'
+            else GlobalName(var_name, node.type)
+        )
+
+    def leave_Declaration(self, node, children: list):
+        var_name = node.name.identifier
+        self.scope.declare(var_name)
+        where = self.scope.lookup(var_name)
+        self.allocations += 1
+        return LocalVar(node.name) if where == 'local' else GlobalVar(node.name)
+
+    def leave_Func(self, node, children: list):
+        self.scope = self.scope.parent_scope
+        return self.rebuild(node, children)
+
+
 def resolve_scopes(prog: Program) -> Program:
     global_scope = Scope()
-    return Program(resolve_statements(prog.statements, global_scope))
+    return walk(prog, ScopeResolver(global_scope))
 
 
 def resolve_statements(stmts: Statements, scope: Scope) -> Statements:
@@ -41,69 +83,12 @@ def resolve_statements(stmts: Statements, scope: Scope) -> Statements:
 
 
 def resolve_statement(stmt: Statement, scope: Scope) -> Statement:
-    if isinstance(stmt, Print):
-        return Print(resolve_expression(stmt.value, scope))
-    elif isinstance(stmt, Variable):
-        return stmt
-    elif isinstance(stmt, Declaration):
-        var_name = stmt.name.identifier
-        scope.declare(var_name)
-        where = scope.lookup(var_name)
-        return LocalVar(stmt.name) if where == 'local' else GlobalVar(stmt.name)
-    elif isinstance(stmt, Assignment):
-        return Assignment(
-            resolve_expression(stmt.name, scope),
-            resolve_expression(stmt.value, scope),
-        )
-    elif isinstance(stmt, If):
-        return If(
-            # stmt.test,
-            resolve_relation(stmt.test, scope),
-            resolve_statements(stmt.consequence, scope.new_scope()),
-            resolve_statements(stmt.alternative, scope.new_scope()),
-        )
-    elif isinstance(stmt, While):
-        return While(
-            # stmt.test,
-            resolve_relation(stmt.test, scope),
-            resolve_statements(stmt.statements, scope.new_scope()),
-        )
-    elif isinstance(stmt, Func):
-        func_scope = scope.new_scope()
-        func_scope.var_names.add(stmt.param.identifier)  # Add func param to local scope
-        return Func(
-            stmt.name,
-            resolve_expression(stmt.param, func_scope),
-            resolve_statements(stmt.body, func_scope),
-        )
-    elif isinstance(stmt, Return):
-        return Return(resolve_expression(stmt.value, scope))
-    else:
-        raise RuntimeError(f"Can't resolve {stmt}")
+    return walk(stmt, ScopeResolver(scope))
 
 
 def resolve_expression(expr: Expression, scope: Scope) -> Expression:
-    if isinstance(expr, Name):
-        var_name = expr.identifier
-        where = scope.lookup(var_name)
-        return LocalName(var_name) if where == 'local' else GlobalName(var_name)
-    elif isinstance(expr, Number):
-        return expr
-    elif isinstance(expr, MathOp):
-        return type(expr)(
-            resolve_expression(expr.left, scope), resolve_expression(expr.right, scope)
-        )
-    elif isinstance(expr, Call):
-        return Call(
-            resolve_expression(expr.name, scope),
-            resolve_expression(expr.arg, scope),
-        )
-    else:
-        raise RuntimeError(f"Can't resolve {expr}")
+    return walk(expr, ScopeResolver(scope))
 
 
 def resolve_relation(relation: Relation, scope: Scope) -> Relation:
-    return type(relation)(
-        left=resolve_expression(relation.left, scope),
-        right=resolve_expression(relation.right, scope),
-    )
+    return walk(relation, ScopeResolver(scope))
@@ -0,0 +1,193 @@
+from math import copysign, frexp
+
+from wabbit.foldconstants import *
+from wabbit.model import *
+from wabbit.traverse import *
+
+NUMBER_TYPES = {Integer: Type.INTEGER, Float: Type.FLOAT}
+# Operations that may have their constant operand moved to the right
+COMMUTATIVE = (Add, Mul)
+# x op identity -> x, for each type of constant. Adding zero isn't exact for
+# floats, since -0.0 + 0.0 is 0.0
+RIGHT_IDENTITIES = {
+    Type.INTEGER: {Add: 0, Sub: 0, Mul: 1, Div: 1},
+    Type.FLOAT: {Sub: 0.0, Mul: 1.0, Div: 1.0},
+}
+
+
+def is_pure(expr: Expression) -> bool:
+    # Whether evaluating `expr` can't have side effects, i.e. it makes no calls
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Call):
+            return False
+        stack.extend(getattr(node, field) for field in child_fields(type(node)))
+    return True
+
+
+def plus(expr: Expression, offset: int) -> Expression:
+    # expr + offset, written without negative constants
+    if offset == 0:
+        return expr
+    if offset > 0:
+        return Add(expr, Integer(offset))
+    return Sub(expr, Integer(-offset))
+
+
+class Simplifier(ConstantFolder):
+    """Constant folding plus algebraic identities on partially constant math.
+
+    Constants are moved to the right of `+` and `*`, then `x + 0`, `x - 0`,
+    `x * 1` and `x / 1` become `x`. Integer-only rules, which don't hold for
+    floats because of rounding, infinities and NaN: `x * 0` and `x - x` become 0
+    when `x` makes no calls, and constant chains such as `(x + 1) + 2` or
+    `(x * 2) * 3` are combined. Float division by a power of two becomes an
+    exact multiplication by its reciprocal. The type of an expression comes from
+    its constants, the declared types of its variables and the return types of
+    the functions it calls; `simplified` counts the rewrites.
+    """
+
+    # The result depends on the variables' types at each point
+    memoizable = ()
+
+    simplified = 0
+
+    def __init__(self):
+        self.types = {}  # Variable name -> Type
+        self.return_types = {}  # Function name -> Type
+        self.saved = []  # Types before each enclosing function or block
+        self.expression_types = {}  # id of a result -> (result, Type)
+
+    def typed(self, expr: Expression, expr_type: Type) -> Expression:
+        self.expression_types[id(expr)] = (expr, expr_type)
+        return expr
+
+    def type_of(self, expr: Expression) -> Type:
+        entry = self.expression_types.get(id(expr))
+        if entry is None or entry[0] is not expr:
+            return Type.UNSPECIFIED
+        return entry[1]
+
+    def enter_Func(self, node) -> None:
+        self.return_types[node.name.identifier] = node.return_type
+        self.saved.append(dict(self.types))
+        self.types[node.param.identifier] = node.param.type
+
+    def leave_Func(self, node, children: list):
+        self.types = self.saved.pop()
+        return self.rebuild(node, children)
+
+    def enter_block(self, node, field: str) -> None:
+        if not isinstance(node, Program):
+            self.saved.append(dict(self.types))
+
+    def leave_block(self, node, field: str) -> None:
+        if not isinstance(node, Program):
+            self.types = self.saved.pop()
+
+    def leave_Variable(self, node, children: list):
+        name, value = children
+        var_type = node.name.type
+        if var_type is Type.UNSPECIFIED:
+            var_type = self.type_of(value)
+        self.types[node.name.identifier] = var_type
+        return self.rebuild(node, children)
+
+    def leave_Declaration(self, node, children: list):
+        self.types[node.name.identifier] = node.name.type
+        return self.rebuild(node, children)
+
+    def leave_Name(self, node, children: list):
+        return self.typed(node, self.types.get(node.identifier, node.type))
+
+    def leave_number(self, node, children: list):
+        return self.typed(node, NUMBER_TYPES[type(node)])
+
+    leave_Integer = leave_Float = leave_number
+
+    def leave_Call(self, node, children: list):
+        return_type = self.return_types.get(node.name.identifier, Type.UNSPECIFIED)
+        return self.typed(self.rebuild(node, children), return_type)
+
+    def leave_math(self, node, children: list):
+        left, right = children
+        if isinstance(left, Number) and isinstance(right, Number):
+            folded = ConstantFolder.leave_math(self, node, children)
+            return self.typed(folded, NUMBER_TYPES[type(folded)])
+        expr_type = self.type_of(left)
+        if expr_type is Type.UNSPECIFIED:
+            expr_type = self.type_of(right)
+        node_type = type(node)
+        if isinstance(left, Number) and node_type in COMMUTATIVE:
+            left, right = right, left
+        if isinstance(right, Number):
+            result = self.simplify_constant(node_type, left, right)
+        elif (
+            node_type is Sub
+            and expr_type is Type.INTEGER
+            and left == right
+            and is_pure(left)
+        ):
+            result = Integer(0)
+        else:
+            result = None
+        if result is None:
+            result = self.rebuild(node, [left, right])
+        else:
+            self.simplified += 1
+            self.allocations += 1
+        return self.typed(result, expr_type)
+
+    leave_Add = leave_Sub = leave_Mul = leave_Div = leave_math
+
+    def simplify_constant(
+        self, node_type: type, left: Expression, right: Number
+    ) -> Expression | None:
+        # Rewrite of `left <node_type> right` for a constant `right`, None if
+        # there's none
+        value = right.value
+        constant_type = NUMBER_TYPES[type(right)]
+        identity = RIGHT_IDENTITIES[constant_type].get(node_type)
+        # x - -0.0 is x + 0.0, so the sign of a float zero matters
+        if value == identity and copysign(1, value) > 0:
+            return left
+        if constant_type is Type.FLOAT:
+            if node_type is Div and value and frexp(value)[0] in (0.5, -0.5):
+                reciprocal = 1 / value
+                if frexp(reciprocal)[0] in (0.5, -0.5):
+                    return Mul(left, self.typed(Float(reciprocal), Type.FLOAT))
+            return None
+        if node_type is Mul and value == 0 and is_pure(left):
+            return Integer(0)
+        if (
+            node_type in (Add, Sub)
+            and isinstance(left, Add | Sub)
+            and isinstance(left.right, Integer)
+        ):
+            # (x ± c1) ± c2 -> x ± (±c1 ± c2)
+            offset = left.right.value if isinstance(left, Add) else -left.right.value
+            offset += value if node_type is Add else -value
+            result = plus(left.left, offset)
+            if result is not left.left:
+                self.typed(result.right, Type.INTEGER)
+            return result
+        if (
+            node_type is Mul
+            and isinstance(left, Mul)
+            and isinstance(left.right, Integer)
+        ):
+            # (x * c1) * c2 -> x * (c1 * c2)
+            product = self.typed(Integer(left.right.value * value), Type.INTEGER)
+            return self.simplify_constant(Mul, left.left, product) or Mul(
+                left.left, product
+            )
+        return None
+
+
+def simplify_program(prog: Program) -> Program:
+    return walk(prog, Simplifier())
+
+
+def simplify_expression(expr: Expression) -> Expression:
+    return walk(expr, Simplifier())
@@ -0,0 +1,165 @@
+from wabbit.inline import always_returns, replace_returns, subtree_nodes
+from wabbit.model import *
+from wabbit.simplify import is_pure
+from wabbit.traverse import *
+
+# Operations a recursive call's result may be accumulated with, and the value
+# the accumulator starts from
+IDENTITIES = {Add: 0, Mul: 1}
+
+# Locals of a function turned into a loop, which no Wabbit variable can be named
+RESULT = 'tail.result'
+AGAIN = 'tail.again'
+ACC = 'tail.acc'
+
+
+def is_call_to(expr: Expression, fname: str) -> bool:
+    return isinstance(expr, Call) and expr.name.identifier == fname
+
+
+def calls(expr: Expression, fname: str) -> bool:
+    return any(is_call_to(node, fname) for node in subtree_nodes(expr))
+
+
+def only_locals(expr: Expression) -> bool:
+    # Whether no call can change the value of `expr`
+    return is_pure(expr) and not any(
+        isinstance(node, GlobalName) for node in subtree_nodes(expr)
+    )
+
+
+def recursive_step(value: Expression, fname: str):
+    """`(operation, operand, call)` if `value` is a call to `fname`, with the
+    operation None, or such a call added to or multiplied by an operand that
+    doesn't call `fname`; None otherwise.
+
+    When the call comes first, the operand would be evaluated after it, so it
+    must not depend on anything the call may change.
+    """
+    if is_call_to(value, fname):
+        return None, None, value
+    if isinstance(value, Add | Mul):
+        left, right = value.left, value.right
+        if is_call_to(right, fname) and not calls(left, fname):
+            return type(value), left, right
+        if is_call_to(left, fname) and only_locals(right):
+            return type(value), right, left
+    return None
+
+
+class DeclarationMover(Transformer):
+    # Drops local declarations, collecting them in `declarations`
+    memoizable = ()
+
+    def __init__(self):
+        self.declarations = {}  # Identifier -> declaration
+
+    def leave_LocalVar(self, node, children: list):
+        self.declarations.setdefault(node.name.identifier, node)
+        return ()
+
+
+def loop_function(func: Func) -> Func | None:
+    """`func` with its recursive calls in tail position turned into a loop.
+
+    `return f(a);` assigns `a` to the parameter and goes round the loop again,
+    while any other return sets the result and ends the loop. For an integer
+    function whose recursive returns are all `e + f(a)` (or all `e * f(a)`),
+    `e` is added to (multiplied into) an accumulator instead, which the other
+    returns combine their value with. None if there's nothing to turn into a
+    loop, or a return isn't in tail position.
+    """
+    fname = func.name.identifier
+    body = func.body
+    if not always_returns(body):
+        # Falling off the end returns 0
+        body = [*body, Return(Integer(0))]
+    steps = [
+        recursive_step(node.value, fname)
+        for stmt in body
+        for node in subtree_nodes(stmt)
+        if isinstance(node, Return)
+    ]
+    operations = {step[0] for step in steps if step is not None}
+    accumulated = operations - {None}
+    if len(accumulated) == 1 and func.return_type == Type.INTEGER:
+        (operation,) = accumulated
+    elif None in operations:
+        # Only plain recursive calls become iterations
+        operation = None
+    else:
+        return None
+
+    def replace(value: Expression) -> Statements:
+        step = recursive_step(value, fname)
+        if step is not None and step[0] in (None, operation):
+            step_operation, operand, call = step
+            stmts = [Assignment(LocalName(func.param.identifier), call.arg)]
+            if step_operation is not None:
+                accumulated = operation(LocalName(ACC), operand)
+                stmts.insert(0, Assignment(LocalName(ACC), accumulated))
+            return stmts
+        if operation is not None:
+            value = operation(LocalName(ACC), value)
+        return [
+            Assignment(LocalName(RESULT), value),
+            Assignment(LocalName(AGAIN), Integer(0)),
+        ]
+
+    loop_body = replace_returns(body, replace)
+    if loop_body is None:
+        return None
+    # Locals are declared once, as a declaration in the loop would allocate on
+    # every iteration
+    mover = DeclarationMover()
+    stmts = []
+    for stmt in loop_body:
+        result = walk(stmt, mover)
+        stmts.extend(result if isinstance(result, tuple) else [result])
+    declarations = [
+        LocalVar(Name(RESULT, func.return_type)),
+        LocalVar(Name(AGAIN, Type.INTEGER)),
+    ]
+    start = [Assignment(LocalName(AGAIN), Integer(1))]
+    if operation is not None:
+        declarations.append(LocalVar(Name(ACC, Type.INTEGER)))
+        start.append(Assignment(LocalName(ACC), Integer(IDENTITIES[operation])))
+    return Func(
+        func.name,
+        func.param,
+        [
+            *declarations,
+            *mover.declarations.values(),
+            *start,
+            While(Eq(LocalName(AGAIN), Integer(1)), stmts),
+            Return(LocalName(RESULT)),
+        ],
+        func.return_type,
+    )
+
+
+class TailCallEliminator(Transformer):
+    """Turns functions that call themselves in tail position into loops.
+
+    Each call made that way runs as another iteration of a `while` loop
+    instead of a new frame, so deep recursion doesn't grow the stack; see
+    `loop_function`. Expects a program after scope resolution; `eliminated`
+    counts the functions rewritten.
+    """
+
+    fields = {Statement: ()}
+    memoizable = ()
+
+    eliminated = 0
+
+    def leave_Func(self, node, children: list):
+        func = loop_function(node)
+        if func is None:
+            return node
+        self.eliminated += 1
+        self.allocations += 1
+        return func
+
+
+def eliminate_tail_calls(prog: Program) -> Program:
+    return walk(prog, TailCallEliminator())
@@ -1,3 +1,9 @@
+import mmap
+import os
+import re
+from array import array
+from bisect import bisect_right
+from collections.abc import Iterator
 from dataclasses import dataclass
 
 SINGLE_CHAR_TOKENS = {
@@ -132,8 +138,237 @@ def identify_keywords(tokens: Tokens) -> Tokens:
     return new_tokens
 
 
-def tokenize(text: str) -> list[Token]:
+def tokenize_legacy(text: str) -> list[Token]:
+    # Original three-pass tokenizer, kept as a reference for tests and benchmarks
     tokens = verbose(text)
     tokens = remove_whitespace(tokens)
     tokens = identify_keywords(tokens)
     return tokens
+
+
+# Single master pattern: skip any run of whitespace (including the `\r` of
+# Windows line endings) and comments, then classify the next token. Every match
+# consumes at least one character except at the end of the input, where
+# `lastgroup` is None.
+MASTER_PATTERN = re.compile(
+    r"""
+    (?:[ \t\r\n]+|//[^\n]*\n?)*
+    (?:
+        (?P<BADNUMBER>\d+(?:\.\d*)?[^\W\d_])
+      | (?P<FLOAT>\d+\.\d*)
+      | (?P<INTEGER>\d+)
+      | (?P<NAME>[^\W\d_][^\W_]*)
+      | (?P<EQ>==)
+      | (?P<SINGLE>[-+*/<>=;(){}])
+      | (?P<MISMATCH>.)
+      | \Z
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def raise_invalid(kind: str, value: str, pos: int) -> None:
+    if kind == 'BADNUMBER':
+        raise SyntaxError(f"Can't have letter {value[-1]!r} follow number immediately")
+    elif value == '.':
+        raise SyntaxError("Invalid syntax with '.'; it must follow a number")
+    raise SyntaxError(f'Unrecognized {value!r} at position {pos}')
+
+
+def iter_tokens(text: str, pos: int = 0) -> Iterator[Token]:
+    # Lazily produce tokens so that a consumer can start before lexing is done
+    for m in MASTER_PATTERN.finditer(text, pos):
+        kind = m.lastgroup
+        if kind is None:
+            break
+        value = m.group(kind)
+        if kind == 'NAME':
+            yield Token(MULTI_CHAR_TOKENS.get(value, 'NAME'), value)
+        elif kind == 'SINGLE':
+            yield Token(SINGLE_CHAR_TOKENS[value], value)
+        elif kind == 'MISMATCH' or kind == 'BADNUMBER':
+            raise_invalid(kind, value, m.start(kind))
+        else:
+            yield Token(kind, value)
+
+
+def tokenize(text: str) -> list[Token]:
+    return list(iter_tokens(text))
+
+
+# ASCII-only variant of `MASTER_PATTERN` for lexing raw bytes. Names and numbers
+# must not run into a non-ASCII byte; that case is reported as NONASCII and the
+# lexer falls back to decoding the source (see `iter_buffer_tokens`).
+BYTES_PATTERN = re.compile(
+    rb"""
+    (?:[ \t\r\n]+|//[^\n]*\n?)*
+    (?:
+        (?P<BADNUMBER>[0-9]+(?:\.[0-9]*)?[A-Za-z])
+      | (?P<FLOAT>[0-9]+\.[0-9]*)(?![0-9\x80-\xff])
+      | (?P<INTEGER>[0-9]+)(?![0-9.\x80-\xff])
+      | (?P<NAME>[A-Za-z][A-Za-z0-9]*)(?![A-Za-z0-9\x80-\xff])
+      | (?P<EQ>==)
+      | (?P<SINGLE>[-+*/<>=;(){}])
+      | (?P<NONASCII>[A-Za-z0-9.]*[\x80-\xff])
+      | (?P<MISMATCH>.)
+      | \Z
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+BYTES_SINGLE_CHAR_TOKENS = {
+    char.encode(): (toktype, char) for char, toktype in SINGLE_CHAR_TOKENS.items()
+}
+
+
+def iter_buffer_tokens(buffer: bytes | mmap.mmap) -> Iterator[Token]:
+    # Lex a bytes-like buffer in place, decoding only the values of tokens.
+    # Non-ASCII bytes are fine inside comments; anywhere else the whole buffer
+    # is decoded as UTF-8 and lexing resumes at the same point in the text.
+    for m in BYTES_PATTERN.finditer(buffer):
+        kind = m.lastgroup
+        if kind is None:
+            break
+        value = m.group(kind)
+        if kind == 'NAME':
+            value = value.decode('ascii')
+            yield Token(MULTI_CHAR_TOKENS.get(value, 'NAME'), value)
+        elif kind == 'SINGLE':
+            yield Token(*BYTES_SINGLE_CHAR_TOKENS[value])
+        elif kind == 'NONASCII':
+            pos = len(str(buffer[: m.start(kind)], 'utf-8'))
+            yield from iter_tokens(str(buffer, 'utf-8'), pos)
+            return
+        elif kind == 'MISMATCH' or kind == 'BADNUMBER':
+            pos = len(str(buffer[: m.start(kind)], 'utf-8'))
+            raise_invalid(kind, value.decode('ascii'), pos)
+        else:
+            yield Token(kind, value.decode('ascii'))
+
+
+def iter_file_tokens(fname: str) -> Iterator[Token]:
+    # Memory-map the file and lex it without reading it into a string first
+    with open(fname, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield from iter_buffer_tokens(buffer)
+
+
+# Compact token store. Token types are small integer ids and values are kept as
+# (start, end) offsets into the source, so a token costs 9 bytes instead of a
+# `Token` object plus a copied string.
+TOKEN_TYPES = (
+    'NAME',
+    'INTEGER',
+    'FLOAT',
+    'EQ',
+    *SINGLE_CHAR_TOKENS.values(),
+    *MULTI_CHAR_TOKENS.values(),
+)
+TOKEN_TYPE_IDS = {toktype: i for i, toktype in enumerate(TOKEN_TYPES)}
+
+# Text of every token whose value is determined by its type
+FIXED_VALUES = {
+    'EQ': '==',
+    **{toktype: char for char, toktype in SINGLE_CHAR_TOKENS.items()},
+    **{toktype: word for word, toktype in MULTI_CHAR_TOKENS.items()},
+}
+FIXED_VALUE_BY_ID = [FIXED_VALUES.get(toktype) for toktype in TOKEN_TYPES]
+
+# `MASTER_PATTERN` group name -> token type id
+NAME_ID = TOKEN_TYPE_IDS['NAME']
+SINGLE_IDS = {char: TOKEN_TYPE_IDS[t] for char, t in SINGLE_CHAR_TOKENS.items()}
+KEYWORD_IDS = {word: TOKEN_TYPE_IDS[t] for word, t in MULTI_CHAR_TOKENS.items()}
+KIND_IDS = {kind: TOKEN_TYPE_IDS[kind] for kind in ('INTEGER', 'FLOAT', 'EQ')}
+
+
+class TokenArray:
+    """Token stream backed by parallel arrays of type ids and source offsets.
+
+    Values are only sliced out of the source when asked for, and line/column
+    positions are computed on demand from a lazily built index of line starts.
+    Iterating yields `Token`s, so a `TokenArray` can be handed to `Parser`.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.types = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self._line_starts = None
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __repr__(self):
+        return f'TokenArray({len(self)} tokens)'
+
+    def toktype(self, i: int) -> str:
+        return TOKEN_TYPES[self.types[i]]
+
+    def value(self, i: int) -> str:
+        fixed = FIXED_VALUE_BY_ID[self.types[i]]
+        if fixed is not None:
+            return fixed
+        return self.source[self.starts[i] : self.ends[i]]
+
+    def __getitem__(self, i: int) -> Token:
+        return Token(self.toktype(i), self.value(i))
+
+    def __iter__(self) -> Iterator[Token]:
+        return self.iter_from(0)
+
+    def iter_from(self, start: int) -> Iterator[Token]:
+        return (self[i] for i in range(start, len(self)))
+
+    def line_col(self, offset: int) -> tuple[int, int]:
+        """Return the 1-based (line, column) of a source offset."""
+        if self._line_starts is None:
+            self._line_starts = line_starts(self.source)
+        line = bisect_right(self._line_starts, offset)
+        return line, offset - self._line_starts[line - 1] + 1
+
+    def position(self, i: int) -> tuple[int, int]:
+        """Return the 1-based (line, column) where token `i` starts."""
+        return self.line_col(self.starts[i])
+
+
+def line_starts(source: str) -> array:
+    starts = array('I', [0])
+    pos = source.find('\n')
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = source.find('\n', pos + 1)
+    return starts
+
+
+def scan_compact(text: str, pos: int = 0) -> Iterator[tuple[int, int, int]]:
+    # Yield (type id, start, end) for each token from `pos` onwards
+    for m in MASTER_PATTERN.finditer(text, pos):
+        kind = m.lastgroup
+        if kind is None:
+            break
+        start, end = m.span(kind)
+        if kind == 'NAME':
+            yield KEYWORD_IDS.get(text[start:end], NAME_ID), start, end
+        elif kind == 'SINGLE':
+            yield SINGLE_IDS[text[start]], start, end
+        elif kind == 'MISMATCH' or kind == 'BADNUMBER':
+            raise_invalid(kind, text[start:end], start)
+        else:
+            yield KIND_IDS[kind], start, end
+
+
+def tokenize_compact(text: str) -> TokenArray:
+    tokens = TokenArray(text)
+    types = tokens.types.append
+    starts = tokens.starts.append
+    ends = tokens.ends.append
+    for toktype, start, end in scan_compact(text):
+        types(toktype)
+        starts(start)
+        ends(end)
+    return tokens
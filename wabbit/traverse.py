@@ -0,0 +1,292 @@
+from dataclasses import fields as dataclass_fields
+from operator import is_
+
+from wabbit.model import *
+
+# Fields of each node type that hold child nodes, in evaluation order. A field
+# holding a list of statements is a "block".
+CHILD_FIELDS = {
+    Program: ('statements',),
+    Print: ('value',),
+    Variable: ('name', 'value'),
+    Declaration: ('name',),
+    Assignment: ('name', 'value'),
+    If: ('test', 'consequence', 'alternative'),
+    While: ('test', 'statements'),
+    Func: ('name', 'param', 'body'),
+    Return: ('value',),
+    Call: ('name', 'arg'),
+    Name: (),
+    Integer: (),
+    Float: (),
+    Add: ('left', 'right'),
+    Sub: ('left', 'right'),
+    Mul: ('left', 'right'),
+    Div: ('left', 'right'),
+    Eq: ('left', 'right'),
+    Lt: ('left', 'right'),
+    Gt: ('left', 'right'),
+}
+
+
+def lookup_fields(table: dict, node_type: type) -> tuple[str, ...]:
+    # Subclasses such as `GlobalVar` or `LocalName` share their parent's fields
+    for base in node_type.__mro__:
+        if base in table:
+            return table[base]
+    raise RuntimeError(f"Can't traverse {node_type.__name__}")
+
+
+def child_fields(node_type: type) -> tuple[str, ...]:
+    return lookup_fields(CHILD_FIELDS, node_type)
+
+
+# (node type, child fields) -> how to call the node type's constructor: either
+# None when the children are its leading arguments and no other field is set,
+# or a list of (field name, index among the children or None)
+_constructor_args = {}
+
+
+def rebuild_node(node, fields: tuple[str, ...], children: list):
+    """Copy of `node` with `fields` set to `children`."""
+    node_type = type(node)
+    key = (node_type, fields)
+    try:
+        args = _constructor_args[key]
+    except KeyError:
+        names = [f.name for f in dataclass_fields(node_type)]
+        if tuple(names) == fields:
+            args = None
+        else:
+            args = [
+                (name, fields.index(name) if name in fields else None) for name in names
+            ]
+        _constructor_args[key] = args
+    if args is None:
+        return node_type(*children)
+    return node_type(
+        *[
+            getattr(node, name) if index is None else children[index]
+            for name, index in args
+        ]
+    )
+
+
+def find_handler(cls: type, prefix: str, node_type: type):
+    # First `{prefix}_{name}` method of `cls` along the node type's MRO; every
+    # MRO ends in `object`, so `{prefix}_object` is the fallback
+    for base in node_type.__mro__:
+        handler = getattr(cls, f'{prefix}_{base.__name__}', None)
+        if handler is not None:
+            return handler
+    raise RuntimeError(f'{cls.__name__} has no {prefix}_object')
+
+
+class Visitor:
+    """Base class for passes run by `walk`.
+
+    `leave` is called for every node once all of its children have been visited,
+    and gets the results for those children in field order; a block's result is
+    the list of its statements' results. It calls the pass's `leave_<Class>`
+    method for the node's class or its closest base class, e.g. `leave_Name` for
+    a `GlobalName` unless there's a `leave_GlobalName`. `enter` likewise calls
+    `enter_<Class>`. Handlers are looked up once per node type.
+    """
+
+    # Overrides of `CHILD_FIELDS` for this pass, e.g. to skip subtrees it
+    # doesn't need to see
+    fields = {}
+    # Node types whose results only depend on the subtree, which `walk` may then
+    # take from a memo
+    memoizable = ()
+    _fields_cache = {}
+    _enter_handlers = {}
+    _leave_handlers = {}
+
+    def __init_subclass__(cls, **kwargs):
+        # Each pass resolves its `fields` and handlers per node type once
+        super().__init_subclass__(**kwargs)
+        cls._fields_cache = {}
+        cls._enter_handlers = {}
+        cls._leave_handlers = {}
+
+    def children(self, node) -> tuple[str, ...]:
+        # Names of the fields to descend into
+        node_type = type(node)
+        fields = self._fields_cache.get(node_type)
+        if fields is None:
+            try:
+                fields = lookup_fields(self.fields, node_type)
+            except RuntimeError:
+                fields = child_fields(node_type)
+            self._fields_cache[node_type] = fields
+        return fields
+
+    def enter(self, node) -> None:
+        # Called before any of the node's children are visited
+        node_type = type(node)
+        try:
+            handler = self._enter_handlers[node_type]
+        except KeyError:
+            handler = find_handler(type(self), 'enter', node_type)
+            self._enter_handlers[node_type] = handler
+        handler(self, node)
+
+    def enter_object(self, node) -> None:
+        pass
+
+    def enter_block(self, node, field: str) -> None:
+        pass
+
+    def leave_block(self, node, field: str) -> None:
+        pass
+
+    def leave(self, node, children: list):
+        node_type = type(node)
+        try:
+            handler = self._leave_handlers[node_type]
+        except KeyError:
+            handler = find_handler(type(self), 'leave', node_type)
+            self._leave_handlers[node_type] = handler
+        return handler(self, node, children)
+
+    def leave_object(self, node, children: list):
+        raise RuntimeError(f"{type(self).__name__} can't handle {node}")
+
+
+class Transformer(Visitor):
+    # A visitor whose results are nodes; returning a tuple from `leave` splices
+    # several statements into the enclosing block. Nodes without a handler are
+    # rebuilt from their new children. Nodes whose children all come back
+    # unchanged are reused rather than copied, so a pass only allocates along
+    # the paths it rewrites; `allocations` counts the nodes it built.
+
+    allocations = 0
+
+    def leave_object(self, node, children: list):
+        return self.rebuild(node, children)
+
+    def rebuild(self, node, children: list):
+        fields = self.children(node)
+        for field, child in zip(fields, children):
+            old = getattr(node, field)
+            if child is old:
+                continue
+            if (
+                isinstance(child, list)
+                and len(child) == len(old)
+                and all(map(is_, child, old))
+            ):
+                continue
+            break
+        else:
+            return node
+        self.allocations += 1
+        return rebuild_node(node, fields, children)
+
+
+# Returned by a memo's `get` for unknown nodes
+MISSING = object()
+
+
+def walk(root, visitor: Visitor, memo=None):
+    """Run `visitor` over the tree under `root` and return the root's result.
+
+    The traversal keeps its own stack instead of recursing, so it handles trees
+    of any depth. With a `memo` (see `wabbit.intern.Memo`), results of the
+    visitor's `memoizable` nodes are recorded and their subtrees are skipped
+    when seen again.
+    """
+    enter = visitor.enter
+    children = visitor.children
+    leave = visitor.leave
+    memoizable = visitor.memoizable if memo is not None else ()
+    if isinstance(root, memoizable):
+        result = memo.get(root)
+        if result is not MISSING:
+            return result
+    enter(root)
+    # Frame: [node, fields, field index, block or None, block index, results]
+    stack = [[root, children(root), 0, None, 0, []]]
+    push = stack.append
+    while True:
+        frame = stack[-1]
+        node, fields, f, block, i, results = frame
+        if block is not None:
+            if i == len(block):
+                visitor.leave_block(node, fields[f])
+                frame[2] = f + 1
+                frame[3] = None
+                continue
+            # Next statement in the current block
+            frame[4] = i + 1
+            child = block[i]
+            result = MISSING
+            if isinstance(child, memoizable):
+                result = memo.get(child)
+            if result is MISSING:
+                enter(child)
+                child_fields = children(child)
+                if child_fields:
+                    push([child, child_fields, 0, None, 0, []])
+                    continue
+                result = leave(child, [])
+                if isinstance(child, memoizable):
+                    memo.put(child, result)
+            if isinstance(result, tuple):
+                results[-1].extend(result)
+            else:
+                results[-1].append(result)
+            continue
+        if f < len(fields):
+            value = getattr(node, fields[f])
+            if isinstance(value, list):
+                visitor.enter_block(node, fields[f])
+                frame[3] = value
+                frame[4] = 0
+                results.append([])
+                continue
+            frame[2] = f + 1
+            if isinstance(value, memoizable):
+                result = memo.get(value)
+                if result is not MISSING:
+                    results.append(result)
+                    continue
+            enter(value)
+            child_fields = children(value)
+            if child_fields:
+                push([value, child_fields, 0, None, 0, []])
+            else:
+                result = leave(value, [])
+                if isinstance(value, memoizable):
+                    memo.put(value, result)
+                results.append(result)
+            continue
+
+        # All children done
+        result = leave(node, results)
+        if isinstance(node, memoizable):
+            memo.put(node, result)
+        stack.pop()
+        if not stack:
+            return result
+        parent = stack[-1]
+        if parent[3] is not None:
+            if isinstance(result, tuple):
+                parent[5][-1].extend(result)
+            else:
+                parent[5][-1].append(result)
+        else:
+            parent[5].append(result)
+
+
+class NodeCounter(Visitor):
+    def leave_object(self, node, children: list) -> int:
+        return 1 + sum(sum(c) if isinstance(c, list) else c for c in children)
+
+
+def count_nodes(node) -> int:
+    """Number of nodes in the tree under `node`, or in a list of statements."""
+    if isinstance(node, list):
+        return sum(walk(stmt, NodeCounter()) for stmt in node)
+    return walk(node, NodeCounter())